@@ -0,0 +1,334 @@
+"""
+Header-only parsers for common audio containers.
+
+These read just the container headers (plus, for Ogg, the granule position
+of the last page) straight from a bytes/memoryview, so uploads can be
+inspected on every request without spawning ffprobe.
+"""
+import struct
+from typing import NamedTuple, Optional, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# WAVE format tags (WAVE_FORMAT_EXTENSIBLE carries the real tag in its sub-format GUID)
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# How far into the payload container headers are searched for
+HEADER_SCAN_BYTES = 64 * 1024
+
+# Matroska/WebM element IDs
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+MKV_SEGMENT = 0x18538067
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_AUDIO = 0xE1
+MKV_SAMPLING_FREQUENCY = 0xB5
+MKV_CHANNELS = 0x9F
+MKV_CLUSTER = 0x1F43B675
+MKV_CLUSTER_TIMECODE = 0xE7
+MKV_SIMPLE_BLOCK = 0xA3
+MKV_BLOCK_GROUP = 0xA0
+MKV_BLOCK = 0xA1
+
+# Master elements whose children we walk into instead of skipping
+MKV_MASTER_ELEMENTS = {MKV_SEGMENT, MKV_INFO, MKV_TRACKS, MKV_TRACK_ENTRY, MKV_AUDIO, MKV_CLUSTER, MKV_BLOCK_GROUP}
+
+_MKV_CODECS = {
+    "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "A_AAC": "aac",
+    "A_FLAC": "flac",
+    "A_MPEG/L3": "mp3",
+    "A_PCM/INT/LIT": "pcm",
+}
+
+
+class WavInfo(NamedTuple):
+    """Layout of a RIFF/WAVE file as read from its header."""
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+    byte_rate: int
+
+
+class AudioHeader(NamedTuple):
+    """Stream properties read from a container header."""
+    container: str
+    codec: str
+    channels: int
+    sample_rate: int
+    duration_seconds: Optional[float]  # None when a WebM header does not carry it (MediaRecorder output)
+
+
+def parse_wav_header(audio_data: Buffer) -> Optional[WavInfo]:
+    """
+    Parse the RIFF header of a WAV file without copying the payload.
+
+    Args:
+        audio_data: Raw bytes that may contain a WAV file
+
+    Returns:
+        WavInfo, or None if the data is not a readable WAV file
+    """
+    if len(audio_data) < 12 or bytes(audio_data[:4]) != b"RIFF" or bytes(audio_data[8:12]) != b"WAVE":
+        return None
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(audio_data):
+        chunk_id = bytes(audio_data[offset:offset + 4])
+        chunk_size = struct.unpack_from("<I", audio_data, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id == b"fmt " and chunk_size >= 16 and body + 16 <= len(audio_data):
+            format_tag, channels, sample_rate, byte_rate, _, bits = struct.unpack_from("<HHIIHH", audio_data, body)
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40 and body + 26 <= len(audio_data):
+                format_tag = struct.unpack_from("<H", audio_data, body + 24)[0]
+            fmt = (format_tag, channels, sample_rate, bits, byte_rate)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, channels, sample_rate, bits, byte_rate = fmt
+            # Streamed WAVs leave the size unset (0 or 0xFFFFFFFF); trust the buffer
+            data_size = chunk_size if 0 < chunk_size <= len(audio_data) - body else len(audio_data) - body
+            return WavInfo(format_tag, channels, sample_rate, bits, body, data_size, byte_rate)
+
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def declared_wav_data_size(audio_data: Buffer, info: WavInfo) -> Optional[int]:
+    """
+    Size of the data chunk as declared in the WAV header.
+
+    Unlike WavInfo.data_size, this is not bounded by the bytes at hand, so it
+    tells the length of a WAV whose header alone has been received.
+
+    Args:
+        audio_data: Bytes the WavInfo was parsed from
+        info: Parsed header
+
+    Returns:
+        Declared size in bytes, or None for streamed WAVs that leave it unset
+    """
+    size = struct.unpack_from("<I", audio_data, info.data_offset - 4)[0]
+    return size if 0 < size < 0xFFFFFFFF else None
+
+
+def _parse_wav(audio_data: Buffer) -> Optional[AudioHeader]:
+    """Parse WAV stream properties."""
+    info = parse_wav_header(audio_data)
+    if info is None:
+        return None
+    duration = info.data_size / info.byte_rate if info.byte_rate else 0.0
+    codec = {WAVE_FORMAT_PCM: "pcm", WAVE_FORMAT_IEEE_FLOAT: "pcm_float"}.get(info.format_tag, f"wav_0x{info.format_tag:04x}")
+    return AudioHeader("wav", codec, info.channels, info.sample_rate, duration)
+
+
+def _parse_flac(audio_data: Buffer) -> Optional[AudioHeader]:
+    """Parse the FLAC STREAMINFO block (skipping a leading ID3v2 tag)."""
+    offset = 0
+    if bytes(audio_data[:3]) == b"ID3" and len(audio_data) >= 10:
+        size = audio_data[6] << 21 | audio_data[7] << 14 | audio_data[8] << 7 | audio_data[9]
+        offset = 10 + size
+
+    if bytes(audio_data[offset:offset + 4]) != b"fLaC" or len(audio_data) < offset + 8 + 18:
+        return None
+
+    block_type = audio_data[offset + 4] & 0x7F
+    if block_type != 0:  # STREAMINFO must come first
+        return None
+
+    # Bytes 10..17 of STREAMINFO: 20-bit rate, 3-bit channels-1, 5-bit bps-1, 36-bit total samples
+    packed = int.from_bytes(audio_data[offset + 18:offset + 26], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    duration = total_samples / sample_rate if sample_rate else 0.0
+    return AudioHeader("flac", "flac", channels, sample_rate, duration)
+
+
+def _parse_ogg(audio_data: Buffer) -> Optional[AudioHeader]:
+    """Parse the first Ogg packet (OpusHead / Vorbis identification) and the last granule position."""
+    if bytes(audio_data[:4]) != b"OggS" or len(audio_data) < 28:
+        return None
+
+    segments = audio_data[26]
+    packet = 27 + segments
+    head = bytes(audio_data[packet:packet + 19])
+
+    if head[:8] == b"OpusHead" and len(head) >= 19:
+        channels = head[9]
+        pre_skip = struct.unpack_from("<H", head, 10)[0]
+        codec, sample_rate, granule_rate, granule_offset = "opus", 48000, 48000, pre_skip
+    elif head[:7] == b"\x01vorbis" and len(head) >= 16:
+        channels = head[11]
+        sample_rate = struct.unpack_from("<I", head, 12)[0]
+        codec, granule_rate, granule_offset = "vorbis", sample_rate, 0
+    else:
+        return None
+
+    # The granule position of the last page is the stream length in samples
+    duration = 0.0
+    tail_start = max(0, len(audio_data) - HEADER_SCAN_BYTES)
+    last_page = bytes(audio_data[tail_start:]).rfind(b"OggS")
+    if last_page >= 0 and tail_start + last_page + 14 <= len(audio_data):
+        granule = struct.unpack_from("<q", audio_data, tail_start + last_page + 6)[0]
+        if granule > 0 and granule_rate:
+            duration = max(0, granule - granule_offset) / granule_rate
+
+    return AudioHeader("ogg", codec, channels, sample_rate, duration)
+
+
+def read_vint(audio_data: Buffer, offset: int, keep_marker: bool):
+    """
+    Read an EBML variable-length integer.
+
+    Returns:
+        Tuple of (value, length); value is None for the reserved "unknown size"
+    """
+    first = audio_data[offset]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or offset + length > len(audio_data):
+        raise ValueError("Invalid EBML variable-length integer")
+
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | audio_data[offset + i]
+
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+
+def read_uint(audio_data: Buffer, offset: int, size: int) -> int:
+    return int.from_bytes(audio_data[offset:offset + size], "big")
+
+
+def _read_float(audio_data: Buffer, offset: int, size: int) -> float:
+    if size == 4:
+        return struct.unpack_from(">f", audio_data, offset)[0]
+    if size == 8:
+        return struct.unpack_from(">d", audio_data, offset)[0]
+    return 0.0
+
+
+def _parse_matroska(audio_data: Buffer) -> Optional[AudioHeader]:
+    """
+    Parse the EBML header, Info and the first audio TrackEntry of a WebM/Matroska file.
+
+    Only the elements ahead of the first Cluster are read, and at most
+    HEADER_SCAN_BYTES of them. MediaRecorder output has no Duration element,
+    so its duration is None: working it out means walking every block.
+    """
+    if len(audio_data) < 4 or read_uint(audio_data, 0, 4) != EBML_HEADER:
+        return None
+
+    container = "webm"
+    timecode_scale = 1_000_000
+    duration_ticks = 0.0
+    codec = ""
+    channels = 1
+    sample_rate = 0
+    entry_codec = ""
+    entry_is_audio = False
+
+    offset = 0
+    end = min(len(audio_data), HEADER_SCAN_BYTES)
+    while offset < end:
+        try:
+            element_id, id_length = read_vint(audio_data, offset, keep_marker=True)
+            size, size_length = read_vint(audio_data, offset + id_length, keep_marker=False)
+        except (ValueError, IndexError):
+            break
+        if element_id == MKV_CLUSTER:
+            break
+        body = offset + id_length + size_length
+        if size is not None and body + size > len(audio_data) and element_id not in MKV_MASTER_ELEMENTS:
+            break
+
+        if element_id == EBML_HEADER:
+            doc_offset = body
+            while doc_offset < body + size:
+                child_id, child_id_length = read_vint(audio_data, doc_offset, keep_marker=True)
+                child_size, child_size_length = read_vint(audio_data, doc_offset + child_id_length, keep_marker=False)
+                child_body = doc_offset + child_id_length + child_size_length
+                if child_id == EBML_DOCTYPE:
+                    container = bytes(audio_data[child_body:child_body + child_size]).decode("ascii", "ignore")
+                doc_offset = child_body + (child_size or 0)
+            offset = body + size
+            continue
+
+        if element_id in MKV_MASTER_ELEMENTS:
+            if element_id == MKV_TRACK_ENTRY:
+                entry_codec, entry_is_audio = "", False
+            offset = body
+            continue
+
+        if element_id == MKV_TIMECODE_SCALE:
+            timecode_scale = read_uint(audio_data, body, size)
+        elif element_id == MKV_DURATION:
+            duration_ticks = _read_float(audio_data, body, size)
+        elif element_id in (MKV_TRACK_TYPE, MKV_CODEC_ID):
+            # TrackType and CodecID may come in either order within a TrackEntry
+            if element_id == MKV_TRACK_TYPE:
+                entry_is_audio = read_uint(audio_data, body, size) == 2
+            else:
+                codec_id = bytes(audio_data[body:body + size]).rstrip(b"\x00").decode("ascii", "ignore")
+                entry_codec = _MKV_CODECS.get(codec_id, codec_id.lower())
+            if entry_is_audio and entry_codec and not codec:
+                codec = entry_codec
+        elif element_id == MKV_SAMPLING_FREQUENCY and not sample_rate:
+            sample_rate = int(_read_float(audio_data, body, size))
+        elif element_id == MKV_CHANNELS:
+            channels = read_uint(audio_data, body, size)
+
+        offset = body + (size or 0)
+
+    if not sample_rate:
+        return None
+
+    duration = duration_ticks * timecode_scale / 1e9 if duration_ticks else None
+    return AudioHeader(container or "webm", codec, channels, sample_rate, duration)
+
+
+def parse_audio_header(audio_data: Buffer) -> Optional[AudioHeader]:
+    """
+    Read stream properties from the container header of WAV, FLAC, Ogg or WebM data.
+
+    Args:
+        audio_data: Binary audio data (bytes or memoryview)
+
+    Returns:
+        AudioHeader, or None if the container is not recognised or the header
+        is incomplete (callers should fall back to ffprobe)
+    """
+    magic = bytes(audio_data[:4])
+    try:
+        if magic == b"RIFF":
+            return _parse_wav(audio_data)
+        if magic == b"fLaC" or magic[:3] == b"ID3":
+            return _parse_flac(audio_data)
+        if magic == b"OggS":
+            return _parse_ogg(audio_data)
+        if magic == b"\x1a\x45\xdf\xa3":
+            return _parse_matroska(audio_data)
+    except (struct.error, IndexError, ValueError):
+        return None
+    return None
@@ -1,165 +1,817 @@
 """
 Audio utility functions for format conversion and validation.
 """
+import asyncio
 import io
+import json
 import logging
+import struct
 import subprocess
 import tempfile
 import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.audio_headers import (
+    WAVE_FORMAT_IEEE_FLOAT,
+    WAVE_FORMAT_PCM,
+    WavInfo,
+    parse_audio_header,
+    parse_wav_header,
+)
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Detect format from common MIME types
+FORMAT_MAP = {
+    "audio/webm": "webm",
+    "audio/mp3": "mp3",
+    "audio/mpeg": "mp3",
+    "audio/m4a": "m4a",
+    "audio/mp4": "mp4",
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/flac": "flac",
+    "audio/ogg": "ogg",
+}
+
+# MP4/M4A files usually keep the moov atom at the end, which ffmpeg
+# cannot reach on a non-seekable stdin pipe. These still go through a temp file.
+SEEKABLE_INPUT_FORMATS = {"mp4", "m4a"}
+
+# Lazily created so the semaphore binds to the running event loop
+_ffmpeg_semaphore: Optional[asyncio.Semaphore] = None
+
+# Target format for speech recognition and emotion analysis
+TARGET_SAMPLE_RATE = 16000
+
+
+def normalize_format(source_format: str) -> str:
+    """Map a MIME type or extension to the short format name used by ffmpeg."""
+    # Use provided source format or default to webm
+    if source_format.startswith("audio/"):
+        return FORMAT_MAP.get(source_format.split(";")[0].strip(), "webm")
+    return source_format.lstrip(".").lower() or "webm"
+
+
+# Encoder settings for each format audio can be prepared in (all 16kHz mono)
+OUTPUT_FORMATS = {
+    "wav": {
+        "mimetype": "audio/wav",
+        "ffmpeg_args": ["-sample_fmt", "s16", "-f", "wav"],  # 16-bit PCM
+    },
+    "flac": {
+        "mimetype": "audio/flac",
+        "ffmpeg_args": ["-sample_fmt", "s16", "-c:a", "flac", "-compression_level", "5", "-f", "flac"],
+    },
+    "opus": {
+        "mimetype": "audio/ogg",
+        "ffmpeg_args": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"],
+    },
+}
+
+# Opus input going out as Opus is remuxed into Ogg without re-encoding
+OPUS_REMUX_ARGS = ["-vn", "-c:a", "copy", "-f", "ogg"]
+
+
+def _build_ffmpeg_command(input_path: str = "pipe:0", output_format: str = "wav", remux: bool = False) -> List[str]:
+    """
+    Build the ffmpeg command that converts the input to speech-ready audio on stdout.
+
+    16kHz sample rate, mono channel, encoded as `output_format`. Metadata is
+    stripped so WAV output always carries a canonical 44-byte header.
+    """
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", input_path,
+        "-map_metadata", "-1",
+        "-fflags", "+bitexact",
+        "-flags:a", "+bitexact",
+    ]
+    if remux:
+        return cmd + OPUS_REMUX_ARGS + ["pipe:1"]
+    return cmd + [
+        "-ar", str(TARGET_SAMPLE_RATE),  # Sample rate: 16kHz
+        "-ac", "1",      # Channels: mono
+    ] + OUTPUT_FORMATS[output_format]["ffmpeg_args"] + ["pipe:1"]
+
+
+def _prepare_ffmpeg_input(audio_data: bytes, source_format: str):
+    """
+    Decide how the input reaches ffmpeg.
+
+    Returns:
+        Tuple of (temp input path or None, bytes to write to stdin or None)
+    """
+    if source_format not in SEEKABLE_INPUT_FORMATS:
+        return None, audio_data
+
+    with tempfile.NamedTemporaryFile(suffix=f".{source_format}", delete=False) as input_file:
+        input_file.write(audio_data)
+    return input_file.name, None
+
+
+def _finalize_wav_header(wav_data: bytes) -> bytes:
+    """
+    Patch the RIFF and data chunk sizes of a WAV written to a pipe.
+
+    ffmpeg cannot seek back on stdout, so it leaves both sizes at 0xFFFFFFFF.
+    Some decoders reject that, so fill in the real values. Files whose data
+    chunk size is already valid are returned unchanged.
+    """
+    if len(wav_data) < 12 or wav_data[:4] != b"RIFF" or wav_data[8:12] != b"WAVE":
+        return wav_data
+
+    offset = 12
+    while offset + 8 <= len(wav_data):
+        chunk_id = wav_data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", wav_data, offset + 4)[0]
+        if chunk_id == b"data":
+            data_size = len(wav_data) - offset - 8
+            if 0 < chunk_size <= data_size:
+                return wav_data
+            patched = bytearray(wav_data)
+            struct.pack_into("<I", patched, 4, len(wav_data) - 8)
+            struct.pack_into("<I", patched, offset + 4, data_size)
+            return bytes(patched)
+        offset += 8 + chunk_size + (chunk_size & 1)
+
+    return wav_data
+
+
+def _log_conversion(audio_data: bytes, converted_data: bytes, output_format: str = "wav") -> None:
+    """Log conversion size statistics."""
+    original_size_mb = len(audio_data) / (1024 * 1024)
+    converted_size_mb = len(converted_data) / (1024 * 1024)
+
+    logger.info(f"[AUDIO_CONVERT] Conversion successful")
+    logger.info(f"[AUDIO_CONVERT] Original: {original_size_mb:.2f}MB → {output_format.upper()}: {converted_size_mb:.2f}MB")
+    logger.info(f"[AUDIO_CONVERT] Settings: 16kHz, mono")
+
+
+def _get_ffmpeg_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore that bounds concurrent ffmpeg processes."""
+    global _ffmpeg_semaphore
+    if _ffmpeg_semaphore is None:
+        _ffmpeg_semaphore = asyncio.Semaphore(max(1, settings.FFMPEG_MAX_CONCURRENCY))
+    return _ffmpeg_semaphore
+
 
 def convert_to_wav(audio_data: bytes, source_format: str = "webm") -> bytes:
     """
     Convert audio data to WAV format for Deepgram compatibility using ffmpeg.
-    
+
+    Blocking variant kept for scripts and sync callers; request handlers
+    should use convert_to_wav_async so the event loop is never blocked.
+
     Args:
         audio_data: Binary audio data in any format
         source_format: Source audio format (webm, mp3, m4a, etc.)
-    
+
     Returns:
         WAV format audio data as bytes
-    
+
     Raises:
         Exception: If conversion fails
     """
+    wav_data = wav_fast_path(audio_data)
+    if wav_data is not None:
+        return wav_data
+
+    input_path = None
     try:
-        # Detect format from common MIME types
-        format_map = {
-            "audio/webm": "webm",
-            "audio/mp3": "mp3",
-            "audio/mpeg": "mp3",
-            "audio/m4a": "m4a",
-            "audio/mp4": "mp4",
-            "audio/wav": "wav",
-            "audio/wave": "wav",
-            "audio/flac": "flac",
-            "audio/ogg": "ogg",
-        }
-        
-        # Use provided source format or default to webm
-        if source_format.startswith("audio/"):
-            source_format = format_map.get(source_format, "webm")
-        
+        source_format = normalize_format(source_format)
         logger.info(f"[AUDIO_CONVERT] Converting {source_format} to WAV")
-        
-        # Create temporary files for input and output
-        with tempfile.NamedTemporaryFile(suffix=f".{source_format}", delete=False) as input_file:
-            input_path = input_file.name
-            input_file.write(audio_data)
-        
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as output_file:
-            output_path = output_file.name
-        
-        try:
-            # Use ffmpeg to convert to WAV with optimal settings for speech recognition
-            # 16kHz sample rate, mono channel, 16-bit PCM
-            cmd = [
-                "ffmpeg",
-                "-i", input_path,
-                "-ar", "16000",  # Sample rate: 16kHz
-                "-ac", "1",      # Channels: mono
-                "-sample_fmt", "s16",  # Sample format: 16-bit signed integer
-                "-f", "wav",     # Output format: WAV
-                "-y",            # Overwrite output file
-                output_path
-            ]
-            
-            # Run ffmpeg
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            
-            # Read converted WAV data
-            with open(output_path, "rb") as f:
-                wav_data = f.read()
-            
-            original_size_mb = len(audio_data) / (1024 * 1024)
-            converted_size_mb = len(wav_data) / (1024 * 1024)
-            
-            logger.info(f"[AUDIO_CONVERT] Conversion successful")
-            logger.info(f"[AUDIO_CONVERT] Original: {original_size_mb:.2f}MB → WAV: {converted_size_mb:.2f}MB")
-            logger.info(f"[AUDIO_CONVERT] Settings: 16kHz, mono, 16-bit PCM")
-            
-            return wav_data
-            
-        finally:
-            # Clean up temporary files
-            try:
-                os.unlink(input_path)
-                os.unlink(output_path)
-            except:
-                pass
-        
+
+        input_path, stdin_data = _prepare_ffmpeg_input(audio_data, source_format)
+        cmd = _build_ffmpeg_command(input_path or "pipe:0")
+
+        result = subprocess.run(
+            cmd,
+            input=stdin_data,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=settings.FFMPEG_TIMEOUT_SECONDS,
+            check=True
+        )
+
+        wav_data = _finalize_wav_header(result.stdout)
+        _log_conversion(audio_data, wav_data)
+        return wav_data
+
     except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.decode() if e.stderr else str(e)
+        error_msg = e.stderr.decode(errors="replace") if e.stderr else str(e)
         logger.error(f"[AUDIO_CONVERT] FFmpeg conversion failed: {error_msg}")
         raise Exception(f"Audio format conversion failed: {error_msg}")
     except Exception as e:
         logger.error(f"[AUDIO_CONVERT] Conversion failed: {str(e)}")
         raise Exception(f"Audio format conversion failed: {str(e)}")
+    finally:
+        if input_path:
+            try:
+                os.unlink(input_path)
+            except OSError:
+                pass
+
+
+async def _ffmpeg_convert(
+    audio_data: bytes,
+    source_format: str = "webm",
+    output_format: str = "wav",
+    remux: bool = False,
+) -> bytes:
+    """
+    Convert audio data with an ffmpeg subprocess without blocking the event loop.
+
+    The input is streamed to ffmpeg over stdin and the result is read back from
+    stdout, so no temporary files are involved. The number of simultaneous
+    ffmpeg processes is bounded by FFMPEG_MAX_CONCURRENCY.
+
+    Args:
+        audio_data: Binary audio data in any format
+        source_format: Source audio format or MIME type (webm, audio/mpeg, etc.)
+        output_format: Key of OUTPUT_FORMATS (wav, flac, opus)
+        remux: Copy the Opus stream into Ogg instead of re-encoding
+
+    Returns:
+        Converted audio data as bytes (16kHz, mono unless remuxed)
+
+    Raises:
+        Exception: If conversion fails or times out
+    """
+    source_format = normalize_format(source_format)
+    logger.info(f"[AUDIO_CONVERT] Converting {source_format} to {output_format.upper()} (async{', remux' if remux else ''})")
+
+    input_path = None
+    process = None
+    try:
+        input_path, stdin_data = _prepare_ffmpeg_input(audio_data, source_format)
+        cmd = _build_ffmpeg_command(input_path or "pipe:0", output_format, remux=remux)
+
+        async with _get_ffmpeg_semaphore():
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if stdin_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(input=stdin_data),
+                timeout=settings.FFMPEG_TIMEOUT_SECONDS,
+            )
+
+        if process.returncode != 0:
+            error_msg = stderr.decode(errors="replace").strip() or f"ffmpeg exited with code {process.returncode}"
+            logger.error(f"[AUDIO_CONVERT] FFmpeg conversion failed: {error_msg}")
+            raise Exception(f"Audio format conversion failed: {error_msg}")
+
+        converted_data = _finalize_wav_header(stdout) if output_format == "wav" else stdout
+        _log_conversion(audio_data, converted_data, output_format)
+        return converted_data
+
+    except asyncio.TimeoutError:
+        logger.error(f"[AUDIO_CONVERT] FFmpeg timed out after {settings.FFMPEG_TIMEOUT_SECONDS}s")
+        raise Exception(f"Audio format conversion timed out after {settings.FFMPEG_TIMEOUT_SECONDS}s")
+    except FileNotFoundError:
+        logger.error("[AUDIO_CONVERT] ffmpeg executable not found")
+        raise Exception("Audio format conversion failed: ffmpeg is not installed")
+    except Exception as e:
+        if str(e).startswith("Audio format conversion failed"):
+            raise
+        logger.error(f"[AUDIO_CONVERT] Conversion failed: {str(e)}")
+        raise Exception(f"Audio format conversion failed: {str(e)}")
+    finally:
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+        if input_path:
+            try:
+                os.unlink(input_path)
+            except OSError:
+                pass
+
+
+def resample_audio(samples: np.ndarray, source_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample a mono float signal with NumPy.
+
+    Downsampling applies a windowed-sinc low-pass first to avoid aliasing.
+    Integer ratios (48k -> 16k) decimate directly, other ratios interpolate.
+
+    Args:
+        samples: 1-D float32 signal
+        source_rate: Sample rate of the input
+        target_rate: Desired sample rate
+
+    Returns:
+        Resampled float32 signal
+    """
+    if source_rate == target_rate or samples.size == 0:
+        return samples.astype(np.float32, copy=False)
+
+    if target_rate < source_rate:
+        # 63-tap Hann-windowed sinc, cutoff slightly below the new Nyquist
+        cutoff = 0.45 * target_rate / source_rate
+        taps = np.arange(-31, 32)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hanning(63)
+        kernel /= kernel.sum()
+        samples = np.convolve(samples, kernel.astype(np.float32), mode="same")
+
+    if source_rate % target_rate == 0:
+        return samples[:: source_rate // target_rate].astype(np.float32, copy=False)
+
+    num_output = int(round(samples.size * target_rate / source_rate))
+    positions = np.arange(num_output) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def encode_wav(pcm: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE) -> bytes:
+    """
+    Wrap mono PCM samples in a canonical 44-byte WAV header.
+
+    Args:
+        pcm: int16 samples, or float samples in [-1, 1]
+        sample_rate: Sample rate of the samples
+
+    Returns:
+        WAV format audio data as bytes (mono, 16-bit PCM)
+    """
+    if pcm.dtype != np.int16:
+        pcm = (np.clip(pcm, -1.0, 1.0) * 32767.0).astype("<i2")
+    data = pcm.astype("<i2", copy=False).tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(data), b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", len(data),
+    )
+    return header + data
+
+
+def _wav_samples_to_float(audio_data: Union[bytes, memoryview], info: WavInfo) -> Optional[np.ndarray]:
+    """Decode the PCM/float payload of a WAV to a (frames, channels) float32 array."""
+    bytes_per_sample = info.bits_per_sample // 8
+    frame_size = bytes_per_sample * info.channels
+    if frame_size == 0:
+        return None
+
+    usable = info.data_size - info.data_size % frame_size
+    payload = memoryview(audio_data)[info.data_offset:info.data_offset + usable]
+
+    if info.format_tag == WAVE_FORMAT_PCM:
+        if info.bits_per_sample == 8:
+            samples = (np.frombuffer(payload, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif info.bits_per_sample == 16:
+            samples = np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32768.0
+        elif info.bits_per_sample == 24:
+            raw = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            packed = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+            samples = ((packed ^ 0x800000) - 0x800000).astype(np.float32) / 8388608.0
+        elif info.bits_per_sample == 32:
+            samples = np.frombuffer(payload, dtype="<i4").astype(np.float32) / 2147483648.0
+        else:
+            return None
+    elif info.format_tag == WAVE_FORMAT_IEEE_FLOAT and info.bits_per_sample in (32, 64):
+        samples = np.frombuffer(payload, dtype="<f4" if info.bits_per_sample == 32 else "<f8").astype(np.float32)
+    else:
+        return None
+
+    return samples.reshape(-1, info.channels)
+
+
+def is_target_wav(info: Optional[WavInfo]) -> bool:
+    """Check whether a WAV header already describes 16kHz mono 16-bit PCM (nothing to convert)."""
+    return (
+        info is not None
+        and info.format_tag == WAVE_FORMAT_PCM
+        and info.channels == 1
+        and info.sample_rate == TARGET_SAMPLE_RATE
+        and info.bits_per_sample == 16
+    )
+
+
+def wav_fast_path(audio_data: bytes) -> Optional[bytes]:
+    """
+    Convert PCM WAV input to 16kHz mono 16-bit WAV without a subprocess.
+
+    Input that is already 16kHz mono s16 is returned as-is (zero-copy).
+    Other PCM/float WAVs are down-mixed and resampled in NumPy.
+
+    Args:
+        audio_data: Binary audio data
+
+    Returns:
+        WAV bytes, or None if the data is not a WAV this path can handle
+        (compressed WAV codecs such as ADPCM or mu-law go through ffmpeg)
+    """
+    info = parse_wav_header(audio_data)
+    if info is None:
+        return None
+
+    if is_target_wav(info):
+        logger.info("[AUDIO_CONVERT] WAV already 16kHz mono 16-bit, passing through")
+        return _finalize_wav_header(audio_data)
+
+    samples = _wav_samples_to_float(audio_data, info)
+    if samples is None:
+        return None
+
+    mono = samples[:, 0] if info.channels == 1 else samples.mean(axis=1)
+    wav_data = encode_wav(resample_audio(mono, info.sample_rate))
+    logger.info(
+        f"[AUDIO_CONVERT] WAV fast path: {info.sample_rate}Hz/{info.channels}ch/{info.bits_per_sample}bit "
+        f"-> 16kHz mono 16-bit PCM"
+    )
+    return wav_data
+
+
+class AudioDecoder(ABC):
+    """Base class for engines that turn uploaded audio into 16kHz mono WAV."""
+
+    name = "base"
+    formats: frozenset = frozenset()
+
+    def supports(self, source_format: str) -> bool:
+        """Check whether this engine can decode the given format."""
+        return source_format in self.formats
+
+    @abstractmethod
+    async def to_wav(self, audio_data: bytes, source_format: str) -> bytes:
+        """Decode audio data and return 16kHz mono 16-bit WAV."""
+
+
+class FFmpegDecoder(AudioDecoder):
+    """Decoder that spawns an ffmpeg subprocess per conversion."""
+
+    name = "ffmpeg"
+
+    def supports(self, source_format: str) -> bool:
+        return True
+
+    async def to_wav(self, audio_data: bytes, source_format: str) -> bytes:
+        return await _ffmpeg_convert(audio_data, source_format)
+
+
+class InProcessDecoder(AudioDecoder):
+    """Base for decoders running inside the worker process (in a thread)."""
+
+    async def to_wav(self, audio_data: bytes, source_format: str) -> bytes:
+        samples, sample_rate = await asyncio.to_thread(self.decode, audio_data)
+        return encode_wav(resample_audio(samples, sample_rate))
+
+    @abstractmethod
+    def decode(self, audio_data: bytes):
+        """
+        Decode audio data to a mono float32 signal.
+
+        Returns:
+            Tuple of (samples, sample_rate)
+        """
+
+
+class SoundFileDecoder(InProcessDecoder):
+    """In-process decoder backed by libsndfile (soundfile package)."""
+
+    name = "soundfile"
+    formats = frozenset({"wav", "flac", "ogg", "mp3"})
+
+    def __init__(self):
+        import soundfile
+        self._soundfile = soundfile
+
+    def decode(self, audio_data: bytes):
+        samples, sample_rate = self._soundfile.read(io.BytesIO(audio_data), dtype="float32", always_2d=True)
+        return samples.mean(axis=1), sample_rate
+
+
+class PyAVDecoder(AudioDecoder):
+    """In-process decoder backed by the libav libraries (PyAV package)."""
+
+    name = "pyav"
+    formats = frozenset({"webm", "ogg", "mp3", "m4a", "mp4", "wav", "flac"})
+
+    def __init__(self):
+        import av
+        self._av = av
+
+    async def to_wav(self, audio_data: bytes, source_format: str) -> bytes:
+        # libav resamples and down-mixes itself, so this skips InProcessDecoder's NumPy pass
+        return await asyncio.to_thread(self._decode_to_wav, audio_data)
+
+    def _decode_to_wav(self, audio_data: bytes) -> bytes:
+        resampler = self._av.AudioResampler(format="s16", layout="mono", rate=TARGET_SAMPLE_RATE)
+        pcm_parts = []
+        with self._av.open(io.BytesIO(audio_data), mode="r") as container:
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    pcm_parts.append(resampled.to_ndarray().reshape(-1))
+            for resampled in resampler.resample(None):
+                pcm_parts.append(resampled.to_ndarray().reshape(-1))
+
+        pcm = np.concatenate(pcm_parts) if pcm_parts else np.zeros(0, dtype=np.int16)
+        return encode_wav(pcm)
+
+
+DECODER_ENGINES = {
+    "ffmpeg": FFmpegDecoder,
+    "soundfile": SoundFileDecoder,
+    "pyav": PyAVDecoder,
+}
+
+_decoders: Dict[str, AudioDecoder] = {}
+
+
+def get_audio_decoder(engine: Optional[str] = None) -> AudioDecoder:
+    """
+    Get the decoder engine selected in settings (or by name).
+
+    Engines whose library is not installed fall back to ffmpeg.
+
+    Args:
+        engine: Engine name (ffmpeg, soundfile, pyav); defaults to AUDIO_DECODER_ENGINE
+
+    Returns:
+        Cached AudioDecoder instance
+    """
+    engine = (engine or settings.AUDIO_DECODER_ENGINE).lower()
+    if engine not in _decoders:
+        decoder_class = DECODER_ENGINES.get(engine)
+        if decoder_class is None:
+            logger.warning(f"[AUDIO_DECODER] Unknown engine '{engine}', using ffmpeg")
+            decoder_class = FFmpegDecoder
+        try:
+            _decoders[engine] = decoder_class()
+        except ImportError as e:
+            logger.warning(f"[AUDIO_DECODER] Engine '{engine}' not available ({e}), using ffmpeg")
+            _decoders[engine] = FFmpegDecoder()
+        logger.info(f"[AUDIO_DECODER] Using engine: {_decoders[engine].name}")
+    return _decoders[engine]
+
+
+async def convert_to_wav_async(audio_data: bytes, source_format: str = "webm") -> bytes:
+    """
+    Convert audio data to WAV without blocking the event loop.
+
+    PCM WAV input (detected from the bytes, not the MIME type) is handled
+    natively by wav_fast_path. Everything else uses the decoder engine
+    selected by AUDIO_DECODER_ENGINE. Formats the engine cannot handle, and
+    in-process decode failures, fall back to the ffmpeg subprocess.
+
+    Args:
+        audio_data: Binary audio data in any format
+        source_format: Source audio format or MIME type (webm, audio/mpeg, etc.)
+
+    Returns:
+        WAV format audio data as bytes (16kHz, mono, 16-bit PCM)
+
+    Raises:
+        Exception: If conversion fails
+    """
+    if audio_data[:4] == b"RIFF":
+        # NumPy resampling of a long WAV is CPU-bound, keep it off the event loop
+        wav_data = await asyncio.to_thread(wav_fast_path, audio_data)
+        if wav_data is not None:
+            return wav_data
+
+    source_format = normalize_format(source_format)
+    decoder = get_audio_decoder()
+
+    if decoder.name != "ffmpeg" and decoder.supports(source_format):
+        try:
+            wav_data = await decoder.to_wav(audio_data, source_format)
+            logger.info(f"[AUDIO_DECODER] Decoded {source_format} in-process with {decoder.name}")
+            return wav_data
+        except Exception as e:
+            logger.warning(f"[AUDIO_DECODER] {decoder.name} failed on {source_format} ({e}), falling back to ffmpeg")
+
+    return await _ffmpeg_convert(audio_data, source_format)
+
+
+async def decode_to_float32(audio_data: bytes, source_format: str = "webm") -> Tuple[np.ndarray, int]:
+    """
+    Decode audio to a mono float32 signal for in-memory feature extraction.
+
+    Args:
+        audio_data: Binary audio data in any format
+        source_format: Source audio format or MIME type
+
+    Returns:
+        Tuple of (float32 samples in [-1, 1], sample rate)
+
+    Raises:
+        Exception: If the audio cannot be decoded
+    """
+    wav_data = await convert_to_wav_async(audio_data, source_format)
+    info = parse_wav_header(wav_data)
+    samples = _wav_samples_to_float(wav_data, info) if info is not None else None
+    if samples is None or samples.size == 0:
+        raise Exception("Decoded audio contains no PCM samples")
+    return np.ascontiguousarray(samples.mean(axis=1) if info.channels > 1 else samples[:, 0]), info.sample_rate
+
+
+def _soundfile_encode(wav_data: bytes, output_format: str) -> Optional[bytes]:
+    """Encode 16kHz mono WAV to FLAC or Ogg/Opus in-process with libsndfile, if available."""
+    try:
+        import soundfile
+    except ImportError:
+        return None
+
+    info = parse_wav_header(wav_data)
+    pcm = np.frombuffer(memoryview(wav_data)[info.data_offset:info.data_offset + info.data_size], dtype="<i2")
+    buffer = io.BytesIO()
+    if output_format == "flac":
+        soundfile.write(buffer, pcm, info.sample_rate, format="FLAC", subtype="PCM_16")
+    else:
+        soundfile.write(buffer, pcm.astype(np.float32) / 32768.0, info.sample_rate, format="OGG", subtype="OPUS")
+    return buffer.getvalue()
+
+
+async def convert_audio(audio_data: bytes, source_format: str = "webm", output_format: str = "wav") -> bytes:
+    """
+    Convert audio data to 16kHz mono audio in the requested format.
+
+    - wav: same as convert_to_wav_async
+    - opus: Opus input (WebM/Ogg) is remuxed into Ogg without re-encoding
+    - flac/opus from WAV, or with an in-process decoder engine: decode to
+      WAV first, then encode in-process with libsndfile (ffmpeg fallback)
+    - flac/opus from anything else with the ffmpeg engine: one ffmpeg pass
+
+    Args:
+        audio_data: Binary audio data in any format
+        source_format: Source audio format or MIME type
+        output_format: Key of OUTPUT_FORMATS (wav, flac, opus)
+
+    Returns:
+        Converted audio data as bytes
+
+    Raises:
+        Exception: If conversion fails
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise Exception(f"Unsupported output format: {output_format}")
+
+    if output_format == "wav":
+        return await convert_to_wav_async(audio_data, source_format)
+
+    header = parse_audio_header(audio_data)
+    if output_format == "opus" and header is not None and header.codec == "opus":
+        return await _ffmpeg_convert(audio_data, source_format, output_format, remux=True)
+
+    if audio_data[:4] != b"RIFF" and get_audio_decoder().name == "ffmpeg":
+        return await _ffmpeg_convert(audio_data, source_format, output_format)
+
+    wav_data = await convert_to_wav_async(audio_data, source_format)
+    try:
+        encoded = await asyncio.to_thread(_soundfile_encode, wav_data, output_format)
+    except Exception as e:
+        logger.warning(f"[AUDIO_CONVERT] In-process {output_format} encoding failed ({e}), using ffmpeg")
+        encoded = None
+    if encoded is None:
+        return await _ffmpeg_convert(wav_data, "wav", output_format)
+
+    _log_conversion(audio_data, encoded, output_format)
+    return encoded
+
+
+def _build_ffprobe_command(input_path: str = "pipe:0") -> List[str]:
+    """Build the ffprobe command that prints stream info as JSON."""
+    return [
+        "ffprobe",
+        "-v", "quiet",
+        "-print_format", "json",
+        "-show_format",
+        "-show_streams",
+        input_path,
+    ]
+
+
+def _audio_info_from_header(audio_data: bytes) -> Optional[dict]:
+    """Build the audio info dict from a native container header parse (None when ffprobe is needed)."""
+    header = parse_audio_header(audio_data)
+    if header is None or header.duration_seconds is None:
+        return None
+    return {
+        "duration_seconds": header.duration_seconds,
+        "channels": header.channels,
+        "sample_rate": header.sample_rate,
+        "size_bytes": len(audio_data),
+        "container": header.container,
+        "codec": header.codec,
+    }
+
+
+def _audio_info_from_ffprobe(stdout: bytes, audio_data: bytes) -> dict:
+    """Build the audio info dict from ffprobe JSON output."""
+    info = json.loads(stdout.decode())
+
+    # Extract relevant information
+    format_info = info.get("format", {})
+    stream_info = info.get("streams", [{}])[0]
+
+    return {
+        "duration_seconds": float(format_info.get("duration", 0)),
+        "channels": int(stream_info.get("channels", 0)),
+        "sample_rate": int(stream_info.get("sample_rate", 0)),
+        "size_bytes": len(audio_data),
+        "container": format_info.get("format_name", ""),
+        "codec": stream_info.get("codec_name", ""),
+    }
 
 
 def get_audio_info(audio_data: bytes, source_format: str = "webm") -> dict:
     """
-    Get information about audio data using ffprobe.
-    
+    Get information about audio data.
+
+    WAV, FLAC, Ogg and WebM/Matroska are read from their container headers
+    in-process. Other formats (MP3, M4A, ...) and WebM without a Duration
+    element (MediaRecorder output) fall back to ffprobe.
+
     Args:
         audio_data: Binary audio data
         source_format: Source audio format
-    
+
     Returns:
         Dictionary with audio information (duration, channels, sample_rate, etc.)
     """
+    info = _audio_info_from_header(audio_data)
+    if info is not None:
+        return info
+
+    input_path = None
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(suffix=f".{source_format}", delete=False) as temp_file:
-            temp_path = temp_file.name
-            temp_file.write(audio_data)
-        
-        try:
-            # Use ffprobe to get audio info
-            cmd = [
-                "ffprobe",
-                "-v", "quiet",
-                "-print_format", "json",
-                "-show_format",
-                "-show_streams",
-                temp_path
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            
-            import json
-            info = json.loads(result.stdout.decode())
-            
-            # Extract relevant information
-            format_info = info.get("format", {})
-            stream_info = info.get("streams", [{}])[0]
-            
-            return {
-                "duration_seconds": float(format_info.get("duration", 0)),
-                "channels": int(stream_info.get("channels", 0)),
-                "sample_rate": int(stream_info.get("sample_rate", 0)),
-                "size_bytes": len(audio_data),
-            }
-            
-        finally:
-            # Clean up temporary file
+        input_path, stdin_data = _prepare_ffmpeg_input(audio_data, normalize_format(source_format))
+        result = subprocess.run(
+            _build_ffprobe_command(input_path or "pipe:0"),
+            input=stdin_data,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=settings.FFMPEG_TIMEOUT_SECONDS,
+            check=True
+        )
+        return _audio_info_from_ffprobe(result.stdout, audio_data)
+
+    except Exception as e:
+        logger.error(f"Failed to get audio info: {str(e)}")
+        return {}
+    finally:
+        if input_path:
             try:
-                os.unlink(temp_path)
-            except:
+                os.unlink(input_path)
+            except OSError:
                 pass
-                
+
+
+async def get_audio_info_async(audio_data: bytes, source_format: str = "webm") -> dict:
+    """
+    Get information about audio data without blocking the event loop.
+
+    Same as get_audio_info, but the ffprobe fallback runs as an async
+    subprocess bounded by FFMPEG_MAX_CONCURRENCY.
+
+    Args:
+        audio_data: Binary audio data
+        source_format: Source audio format
+
+    Returns:
+        Dictionary with audio information (duration, channels, sample_rate, etc.)
+    """
+    info = _audio_info_from_header(audio_data)
+    if info is not None:
+        return info
+
+    input_path = None
+    process = None
+    try:
+        input_path, stdin_data = _prepare_ffmpeg_input(audio_data, normalize_format(source_format))
+        async with _get_ffmpeg_semaphore():
+            process = await asyncio.create_subprocess_exec(
+                *_build_ffprobe_command(input_path or "pipe:0"),
+                stdin=asyncio.subprocess.PIPE if stdin_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, _ = await asyncio.wait_for(
+                process.communicate(input=stdin_data),
+                timeout=settings.FFMPEG_TIMEOUT_SECONDS,
+            )
+        if process.returncode != 0:
+            raise Exception(f"ffprobe exited with code {process.returncode}")
+        return _audio_info_from_ffprobe(stdout, audio_data)
+
     except Exception as e:
-        logger.error(f"Failed to get audio info: {str(e)}")
+        logger.error(f"Failed to get audio info: {str(e) or type(e).__name__}")
         return {}
+    finally:
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+        if input_path:
+            try:
+                os.unlink(input_path)
+            except OSError:
+                pass
@@ -26,6 +26,7 @@ class Settings(BaseSettings):
     
     # API Endpoints
     DEEPGRAM_API_URL: str = "https://api.deepgram.com/v1/listen"
+    DEEPGRAM_LIVE_URL: str = "wss://api.deepgram.com/v1/listen"  # Live-streaming websocket endpoint
     DEEPL_API_URL: str = "https://api-free.deepl.com/v2/translate"
     ELEVENLABS_API_URL: str = "https://api.elevenlabs.io/v1"
     
@@ -40,6 +41,72 @@ class Settings(BaseSettings):
     MAX_AUDIO_SIZE_MB: int = 50  # Increased for long recordings (10+ minutes)
     MAX_CHUNK_SIZE_MB: int = 10  # Maximum size per chunk
     SUPPORTED_AUDIO_FORMATS: list = [".mp3", ".wav", ".m4a", ".flac", ".ogg", ".webm"]
+    FFMPEG_MAX_CONCURRENCY: int = 4  # Max simultaneous ffmpeg conversions per worker
+    FFMPEG_TIMEOUT_SECONDS: float = 60.0  # Kill ffmpeg if a conversion takes longer
+    AUDIO_DECODER_ENGINE: str = "ffmpeg"  # ffmpeg (subprocess), soundfile (libsndfile) or pyav (libav)
+    DEEPGRAM_UPLOAD_FORMAT: str = "wav"  # Audio sent to Deepgram: wav, flac (lossless) or opus (Ogg, 24kbps)
+    
+    # Streaming decoder (one long-lived ffmpeg per chunked session)
+    STREAM_DECODER_ENABLED: bool = True
+    STREAM_DECODER_MAX_SESSIONS: int = 32  # Least recently used sessions are evicted beyond this
+    STREAM_DECODER_IDLE_TIMEOUT_SECONDS: float = 120.0
+    STREAM_DECODER_SETTLE_MS: int = 25  # Output quiet period that ends a chunk whose timestamps cannot be read
+    STREAM_DECODER_MAX_WAIT_MS: int = 2000  # Max wait for a chunk's audio to come out of the decoder
+    
+    # Deepgram live streaming (one websocket per chunked session instead of one request per chunk)
+    STT_STREAMING_ENABLED: bool = False
+    DEEPGRAM_LIVE_LANGUAGE: str = "multi"  # nova-2 "multi" transcribes English/Spanish code-switching
+    DEEPGRAM_LIVE_MAX_SESSIONS: int = 32  # Least recently used streams are closed beyond this
+    DEEPGRAM_LIVE_IDLE_TIMEOUT_SECONDS: float = 120.0
+    DEEPGRAM_LIVE_CONNECT_TIMEOUT_SECONDS: float = 5.0  # Max wait for the websocket handshake
+    DEEPGRAM_LIVE_KEEPALIVE_SECONDS: float = 5.0  # Deepgram closes streams that receive nothing for 10s
+    DEEPGRAM_LIVE_FINALIZE_TIMEOUT_MS: int = 3000  # Max wait for the final transcript of a chunk
+    
+    # Voice activity detection (silence trimming before STT and emotion detection)
+    VAD_ENABLED: bool = True
+    VAD_FRAME_MS: int = 20
+    VAD_ENERGY_THRESHOLD_DBFS: float = -45.0  # Frames louder than this count as voiced
+    VAD_MIN_SPEECH_MS: int = 100  # Less voiced audio than this means "no speech"
+    VAD_PADDING_MS: int = 200  # Silence kept around the voiced region
+    
+    # Segmented transcription of long recordings
+    STT_SEGMENT_SECONDS: float = 30.0  # Target segment length
+    STT_SEGMENT_SEARCH_SECONDS: float = 5.0  # Window before the target searched for the quietest split point
+    STT_SEGMENT_CONCURRENCY: int = 4  # Segments transcribed at once per recording
+    
+    # Session language stickiness (explicit language instead of detect_language once confirmed)
+    STT_LANGUAGE_LOCK_CHUNKS: int = 2  # Confident detections in a row before locking a session's language (0 disables)
+    STT_LANGUAGE_MIN_CONFIDENCE: float = 0.7  # Below this a detection does not count and a locked language is dropped
+    STT_LANGUAGE_MAX_SESSIONS: int = 1024  # Least recently used sessions are forgotten beyond this
+    STT_LANGUAGE_IDLE_TIMEOUT_SECONDS: float = 1800.0
+    
+    # Upstream guard (per-upstream concurrency limit and circuit breaker for Deepgram, DeepL and ElevenLabs)
+    UPSTREAM_MAX_IN_FLIGHT: int = 10  # Calls to one upstream at once per worker
+    UPSTREAM_MAX_QUEUE: int = 50  # Callers waiting for a slot; more are rejected with 503
+    UPSTREAM_QUEUE_TIMEOUT_SECONDS: float = 10.0  # Max wait for a slot before 503
+    UPSTREAM_FAILURE_RATE_THRESHOLD: float = 0.5  # Share of failed/slow calls in the window that opens the circuit
+    UPSTREAM_SLOW_CALL_SECONDS: float = 30.0  # Successful calls slower than this count as failures
+    UPSTREAM_WINDOW_SIZE: int = 20  # Recent calls the failure rate is computed over
+    UPSTREAM_MIN_CALLS: int = 5  # Calls needed before the circuit can open
+    UPSTREAM_OPEN_SECONDS: float = 30.0  # Fail-fast period before a probe call is let through
+    
+    # Retries of upstream calls (connection errors, timeouts, 429 and 5xx)
+    RETRY_MAX_ATTEMPTS: int = 3  # Attempts per call, the first one included
+    RETRY_BASE_DELAY_SECONDS: float = 0.5
+    RETRY_MAX_DELAY_SECONDS: float = 8.0  # Cap of the jittered backoff (Retry-After is honoured as sent)
+    RETRY_MAX_ELAPSED_SECONDS: float = 30.0  # Time one call may spend retrying
+    RETRY_BUDGET_RATIO: float = 0.2  # Retry tokens earned per call: retries stay within ~20% of traffic
+    RETRY_BUDGET_MAX_TOKENS: float = 10.0  # Burst of retries allowed after a quiet period
+    REQUEST_DEADLINE_SECONDS: float = 300.0  # No retry is started that would wait past this point of a request
+    
+    # Hedged requests (duplicate a call still running past the upstream's tail latency)
+    STT_HEDGING_ENABLED: bool = False
+    TRANSLATION_HEDGING_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 95.0  # Recent-latency percentile after which a hedge is sent
+    HEDGE_MIN_DELAY_MS: int = 100  # Never hedge sooner than this
+    HEDGE_MAX_RATE: float = 0.1  # At most this share of calls is hedged
+    HEDGE_WINDOW_SIZE: int = 200  # Recent latencies kept per upstream
+    HEDGE_MIN_SAMPLES: int = 20  # No hedging until this many latencies are known
     
     # ElevenLabs Configuration
     ELEVENLABS_VOICE_ID: str = "pNInz6obpgDQGcFmaJgB"  # Adam (Male)
@@ -47,6 +114,39 @@ class Settings(BaseSettings):
     
     # OpenSmile Configuration
     OPENSMILE_CONFIG: str = "eGeMAPSv02"  # Extended Geneva Minimalistic Acoustic Parameter Set
+    # or "emotion_minimal" (shipped reduced config, same 4 values, ~3-4x faster), or a path to a .conf file
+    EMOTION_FEATURE_ENGINE: str = "opensmile"  # opensmile (worker pool) or numpy (in-process YIN pitch + loudness); numpy if OpenSmile is missing
+    EMOTION_WORKERS: int = 0  # OpenSmile worker processes; 0 = auto (CPU count - 1, at least 1)
+    EMOTION_BATCH_MAX_FILES: int = 100  # Max clips per /api/emotion/detect-batch request
+    
+    # Approximate fast mode for long recordings (opt-in; see benchmarks/emotion_fast_mode.py)
+    EMOTION_FAST_MODE: bool = False  # Default for detect_emotion(fast=None)
+    EMOTION_FAST_MIN_SECONDS: float = 60.0  # Shorter audio is always analysed in full
+    EMOTION_FAST_WINDOW_SECONDS: float = 2.0
+    EMOTION_FAST_MAX_WINDOWS: int = 16  # Window budget: voiced windows strided over the recording
+    EMOTION_FAST_SAMPLE_RATE: int = 16000  # 8000 halves the work again at some loudness accuracy cost
+    
+    # Emotion result cache (keyed by a hash of the audio bytes, so retried uploads skip extraction)
+    EMOTION_CACHE_ENABLED: bool = True
+    EMOTION_CACHE_MAX_BYTES: int = 4 * 1024 * 1024  # In-process size bound; least recently used entries are evicted
+    EMOTION_CACHE_TTL_SECONDS: int = 900
+    EMOTION_CACHE_REDIS: bool = False  # Share cached results across workers through Redis
+    
+    # Per-session emotion timeline (running aggregates of the frame-level features of every chunk)
+    EMOTION_TIMELINE_MAX_SESSIONS: int = 256  # Least recently used sessions are dropped beyond this
+    EMOTION_TIMELINE_IDLE_TIMEOUT_SECONDS: int = 1800
+    
+    # Translation cache (keyed by normalised text, languages and formality; concurrent misses share one request)
+    TRANSLATION_CACHE_ENABLED: bool = True
+    TRANSLATION_CACHE_MAX_BYTES: int = 2 * 1024 * 1024  # In-process size bound; least recently used entries are evicted
+    TRANSLATION_CACHE_TTL_SECONDS: int = 86400
+    TRANSLATION_CACHE_REDIS: bool = False  # Share translations across workers through Redis
+    
+    # Translation micro-batching (concurrent texts of one language pair in one multi-text DeepL request)
+    TRANSLATION_BATCHING_ENABLED: bool = True
+    TRANSLATION_BATCH_WINDOW_MS: int = 5  # How long the first text of a batch waits for others
+    TRANSLATION_BATCH_MAX_TEXTS: int = 50  # DeepL accepts at most 50 texts per request
+    TRANSLATION_BATCH_MAX_BYTES: int = 32 * 1024  # UTF-8 text per request; form-encoded it stays under DeepL's 128 KiB limit
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -0,0 +1,162 @@
+"""
+Hedged requests for upstream calls with a long latency tail.
+
+Each upstream's Hedger keeps the latencies of its recent calls. When a call
+has not answered by the HEDGE_PERCENTILE of those latencies, a duplicate
+request is sent and whichever answers first wins; the other one is
+cancelled. Hedges are paid from a token bucket that earns HEDGE_MAX_RATE of
+a token per call, so at most that share of calls is ever duplicated.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.retry import RetryBudget
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """Learns one upstream's latency and duplicates calls that run past its tail percentile."""
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float,
+        min_delay_seconds: float,
+        max_rate: float,
+        window_size: int,
+        min_samples: int,
+    ):
+        """
+        Args:
+            name: Upstream name, used in logs and /health
+            percentile: Latency percentile (0-100) after which a hedge is sent
+            min_delay_seconds: Never hedge sooner than this
+            max_rate: Largest share of calls that may be hedged
+            window_size: Number of recent latencies the percentile is computed over
+            min_samples: Latencies needed before hedging starts
+        """
+        self.name = name
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.min_samples = min_samples
+        self.latencies: deque = deque(maxlen=window_size)
+        self.budget = RetryBudget(ratio=max_rate, max_tokens=1.0)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0  # Hedges that answered before the original request
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for a call before hedging it, or None while too few latencies are known."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay_seconds, ordered[index])
+
+    async def _timed(self, operation: Callable[[], Awaitable[T]], record_cancelled: bool = True) -> T:
+        """
+        Await one request and record its latency.
+
+        A request cancelled because its hedge answered first still ran for at
+        least the time it had been running, so that lower bound is recorded.
+        Leaving it out would keep only the fast calls in the window and pull
+        the percentile (and the hedge delay) down over time. Hedges pass
+        record_cancelled=False: a hedge that loses is cancelled as soon as
+        the original answers, so its elapsed time says nothing about latency.
+        """
+        start = time.monotonic()
+        try:
+            result = await operation()
+        except asyncio.CancelledError:
+            if record_cancelled:
+                self.latencies.append(time.monotonic() - start)
+            raise
+        self.latencies.append(time.monotonic() - start)
+        return result
+
+    async def run(self, operation: Callable[[], Awaitable[T]], hedge: bool = True) -> T:
+        """
+        Run an upstream call, hedging it when it is slower than usual.
+
+        Args:
+            operation: Makes one request (called a second time for the hedge)
+            hedge: Whether hedging is enabled; when not, the call is only timed
+
+        Returns:
+            The result of the first request to succeed
+
+        Raises:
+            The original request's error, if both requests fail
+        """
+        self.calls += 1
+        self.budget.deposit()
+        delay = self.hedge_delay() if hedge else None
+        if delay is None:
+            return await self._timed(operation)
+
+        primary = asyncio.ensure_future(self._timed(operation))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self.budget.withdraw():
+                return await primary
+
+            self.hedged += 1
+            logger.info(f"[HEDGE] {self.name} call still running after {delay * 1000:.0f}ms, sending a hedge request")
+            backup = asyncio.ensure_future(self._timed(operation, record_cancelled=False))
+            tasks.append(backup)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return task.result()
+            backup.exception()  # Both failed: report the original request's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_state(self) -> Dict:
+        """Current hedge delay and how often calls were hedged."""
+        delay = self.hedge_delay()
+        return {
+            "hedge_delay_ms": round(delay * 1000) if delay is not None else None,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 3) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "capped": self.budget.exhausted,  # Hedges skipped because of HEDGE_MAX_RATE
+        }
+
+
+_hedgers: Dict[str, Hedger] = {}
+
+
+def get_hedger(name: str) -> Hedger:
+    """Shared hedger for an upstream, created from the HEDGE_* settings on first use."""
+    if name not in _hedgers:
+        _hedgers[name] = Hedger(
+            name,
+            percentile=settings.HEDGE_PERCENTILE,
+            min_delay_seconds=settings.HEDGE_MIN_DELAY_MS / 1000,
+            max_rate=settings.HEDGE_MAX_RATE,
+            window_size=settings.HEDGE_WINDOW_SIZE,
+            min_samples=settings.HEDGE_MIN_SAMPLES,
+        )
+    return _hedgers[name]
+
+
+def get_hedging_states() -> Dict[str, Dict]:
+    """State of every hedger (for /health)."""
+    return {name: hedger.get_state() for name, hedger in _hedgers.items()}
@@ -1,11 +1,13 @@
 """
 Redis client for caching audio files and intermediate results.
 """
-import redis.asyncio as redis
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 import logging
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    import redis.asyncio as redis
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,23 +15,31 @@ class RedisClient:
     """Async Redis client wrapper for caching operations."""
     
     def __init__(self):
-        self.redis: Optional[redis.Redis] = None
+        self.redis: Optional["redis.Redis"] = None
     
     async def connect(self):
         """Establish connection to Redis server."""
+        # Imported on first connect: most deployments never enable Redis and
+        # should not pay for the client library at application import
+        import redis.asyncio as redis
+        
+        client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            decode_responses=False,  # Keep binary for audio files
+        )
         try:
-            self.redis = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                password=settings.REDIS_PASSWORD,
-                decode_responses=False,  # Keep binary for audio files
-            )
-            await self.redis.ping()
-            logger.info("Successfully connected to Redis")
+            await client.ping()
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e}")
+            # Left unset so callers checking `redis is not None` stay in-process
+            self.redis = None
+            await client.close()
             raise
+        self.redis = client
+        logger.info("Successfully connected to Redis")
     
     async def disconnect(self):
         """Close Redis connection."""
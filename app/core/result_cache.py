@@ -0,0 +1,169 @@
+"""
+Content-addressed result cache.
+
+In-process LRU cache with a TTL and a size bound in bytes, optionally backed
+by Redis (through the shared redis_client) so results computed by one worker
+are hits for the others. get_or_compute also de-duplicates concurrent misses
+on the same key, so one computation serves every caller waiting for it.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(data: bytes) -> str:
+    """Fast 128-bit content hash of a byte string (BLAKE2b)."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """LRU + TTL cache of JSON-serialisable results, bounded in bytes."""
+
+    def __init__(self, name: str, max_bytes: int, ttl_seconds: float, use_redis: bool = False):
+        """
+        Args:
+            name: Cache name, used as the Redis key prefix and in logs
+            max_bytes: Max total size of the cached (serialised) values and keys
+            ttl_seconds: Time to live of every entry
+            use_redis: Also read and write Redis when redis_client is connected
+        """
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (expires_at, serialised value)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.evictions = 0
+        self.coalesced = 0  # Misses that waited for a computation already in flight
+        self._in_flight: Dict[str, "asyncio.Future[str]"] = {}
+
+    def _redis_available(self) -> bool:
+        return self.use_redis and redis_client.redis is not None
+
+    def _remove(self, key: str):
+        _, serialised = self._entries.pop(key)
+        self._bytes -= len(key) + len(serialised)
+
+    def _store(self, key: str, serialised: str):
+        """Insert an entry locally, evicting least recently used entries beyond max_bytes."""
+        size = len(key) + len(serialised)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, serialised)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a result, locally first and then in Redis.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            A fresh copy of the cached value, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, serialised = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(serialised)
+            self._remove(key)
+
+        if self._redis_available():
+            serialised = await redis_client.get(f"{self.name}:{key}")
+            if serialised is not None:
+                self._store(key, serialised)
+                self.hits += 1
+                self.redis_hits += 1
+                return json.loads(serialised)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        """
+        Cache a result locally and, when enabled, in Redis.
+
+        Args:
+            key: Cache key
+            value: JSON-serialisable result
+        """
+        serialised = json.dumps(value)
+        self._store(key, serialised)
+        if self._redis_available():
+            await redis_client.set(f"{self.name}:{key}", serialised, ex=int(self.ttl_seconds))
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> str:
+        serialised = json.dumps(await compute())
+        self._store(key, serialised)
+        if self._redis_available():
+            await redis_client.set(f"{self.name}:{key}", serialised, ex=int(self.ttl_seconds))
+        return serialised
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Look up a result, computing and caching it on a miss.
+
+        Concurrent misses on the same key share one call to `compute`
+        (single-flight); if it fails, every waiting caller gets the error and
+        nothing is cached.
+
+        Args:
+            key: Cache key
+            compute: Produces the JSON-serialisable result on a miss
+
+        Returns:
+            A fresh copy of the cached or computed value
+        """
+        flight = self._in_flight.get(key)
+        if flight is None:
+            value = await self.get(key)
+            if value is not None:
+                return value
+            flight = self._in_flight.get(key)  # Started by another caller during the Redis lookup
+        if flight is None:
+            flight = asyncio.ensure_future(self._compute(key, compute))
+            self._in_flight[key] = flight
+            flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so a cancelled caller does not cancel the computation others wait for
+        return json.loads(await asyncio.shield(flight))
+
+    def clear(self):
+        """Drop every local entry."""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Entry count, size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,203 @@
+"""
+Retry policy shared by the upstream API clients.
+
+Transient failures (connection errors, timeouts, 429 and 5xx responses) are
+retried with decorrelated jitter, or after the delay an upstream asks for in
+Retry-After. A retry is only started if it can finish waiting before the
+request deadline, and only if the upstream's retry budget allows it: each
+first attempt earns RETRY_BUDGET_RATIO of a token, each retry spends a whole
+one, so during an outage retries add at most that share of extra load
+instead of multiplying it.
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpcore
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Monotonic time by which the current request should be answered (see deadline_scope)
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Set the request deadline for the code run inside the block (and the tasks it starts)."""
+    token = request_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an upstream call that raised `error` may succeed if repeated."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, httpcore.ConnectionNotAvailable, httpcore.RemoteProtocolError))
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the upstream's Retry-After header (seconds or HTTP date), if any."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """Token bucket that limits retries to a share of first attempts."""
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(max_tokens)
+        self.retries = 0
+        self.exhausted = 0  # Retries skipped because the budget was empty
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self, count: int = 1) -> bool:
+        """Take the tokens for `count` retries; False (nothing taken) if there are not enough."""
+        if self.tokens < count:
+            self.exhausted += 1
+            return False
+        self.tokens -= count
+        self.retries += count
+        return True
+
+
+class RetryPolicy:
+    """Retries transient failures of one upstream within a deadline and a retry budget."""
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        base_delay_seconds: float,
+        max_delay_seconds: float,
+        max_elapsed_seconds: float,
+        budget: RetryBudget,
+    ):
+        """
+        Args:
+            name: Upstream name, used in logs and /health
+            max_attempts: Attempts per call, the first one included
+            base_delay_seconds: Shortest backoff delay
+            max_delay_seconds: Longest backoff delay
+            max_elapsed_seconds: Time a call may spend retrying when no request deadline is set
+            budget: Retry budget shared by every call to the upstream
+        """
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_elapsed_seconds = max_elapsed_seconds
+        self.budget = budget
+
+    def _next_delay(self, error: BaseException, previous: float) -> float:
+        """Retry-After when the upstream sent one, otherwise decorrelated jitter on the previous delay."""
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            return requested
+        return min(self.max_delay_seconds, random.uniform(self.base_delay_seconds, previous * 3))
+
+    async def run(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        max_attempts: Optional[int] = None,
+        on_retry: Optional[Callable[[BaseException], Awaitable[None]]] = None,
+    ) -> T:
+        """
+        Run an upstream call, retrying transient failures.
+
+        Args:
+            operation: Makes one attempt (called again for every retry)
+            max_attempts: Overrides the policy's attempts (1 for bodies that cannot be replayed)
+            on_retry: Awaited with the error before each retry (e.g. to reset a connection pool)
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            The last attempt's error, when it is not retryable or the attempts,
+            the deadline or the retry budget are used up
+        """
+        attempts = max_attempts or self.max_attempts
+        deadline = time.monotonic() + self.max_elapsed_seconds
+        if request_deadline.get() is not None:
+            deadline = min(deadline, request_deadline.get())
+        self.budget.deposit()
+        delay = self.base_delay_seconds
+
+        for attempt in range(1, attempts + 1):
+            try:
+                return await operation()
+            except Exception as e:
+                if attempt == attempts or not is_retryable(e):
+                    raise
+                delay = self._next_delay(e, delay)
+                reason = f"{type(e).__name__}: {e}"
+                if time.monotonic() + delay > deadline:
+                    logger.warning(f"[RETRY] {self.name} not retrying, {delay:.1f}s backoff would pass the deadline ({reason})")
+                    raise
+                if not self.budget.withdraw():
+                    logger.warning(f"[RETRY] {self.name} not retrying, retry budget exhausted ({reason})")
+                    raise
+                logger.warning(f"[RETRY] {self.name} attempt {attempt}/{attempts} failed ({reason}), retrying in {delay:.2f}s")
+                if on_retry is not None:
+                    await on_retry(e)
+                await asyncio.sleep(delay)
+
+    def get_state(self) -> Dict:
+        """Retry budget level and counters."""
+        return {
+            "budget_tokens": round(self.budget.tokens, 2),
+            "retries": self.budget.retries,
+            "budget_exhausted": self.budget.exhausted,
+        }
+
+
+_policies: Dict[str, RetryPolicy] = {}
+
+
+def get_retry_policy(name: str) -> RetryPolicy:
+    """Shared retry policy for an upstream, created from the RETRY_* settings on first use."""
+    if name not in _policies:
+        _policies[name] = RetryPolicy(
+            name,
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay_seconds=settings.RETRY_BASE_DELAY_SECONDS,
+            max_delay_seconds=settings.RETRY_MAX_DELAY_SECONDS,
+            max_elapsed_seconds=settings.RETRY_MAX_ELAPSED_SECONDS,
+            budget=RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MAX_TOKENS),
+        )
+    return _policies[name]
+
+
+def get_retry_states() -> Dict[str, Dict]:
+    """State of every retry policy (for /health)."""
+    return {name: policy.get_state() for name, policy in _policies.items()}
@@ -0,0 +1,481 @@
+"""
+Session-scoped streaming decoder for consecutive MediaRecorder chunks.
+
+Each session keeps one long-lived ffmpeg process. Successive chunk bytes
+are written to its stdin and only the PCM decoded from the new bytes is
+returned, so container headers are parsed once per recording instead of
+once per chunk. ffmpeg gives no per-chunk completion signal, so the session
+also follows the container timestamps of the bytes it was fed and waits
+until that much audio has come out of the decoder.
+"""
+import asyncio
+import hashlib
+import logging
+import struct
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.audio_headers import (
+    MKV_BLOCK,
+    MKV_CLUSTER_TIMECODE,
+    MKV_MASTER_ELEMENTS,
+    MKV_SIMPLE_BLOCK,
+    MKV_TIMECODE_SCALE,
+    read_uint,
+    read_vint,
+)
+from app.core.audio_utils import TARGET_SAMPLE_RATE, encode_wav, normalize_format
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Formats whose demuxer can consume a live, growing stream
+STREAMABLE_FORMATS = {"webm", "ogg"}
+
+# EBML magic: a chunk starting with it is the beginning of a new recording
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+OGG_MAGIC = b"OggS"
+OGG_BEGINNING_OF_STREAM = 0x02
+
+# Decoded output trails the last timestamp fed by the codec delay (Opus pre-skip) and resampler latency
+DECODER_DELAY_SECONDS = 0.02
+
+# Largest element buffered whole while following timestamps; larger ones are skipped unread
+MAX_ELEMENT_BYTES = 64 * 1024
+
+# Decoded chunks kept per session so a retried upload is answered without touching ffmpeg
+REPLAY_CHUNKS = 4
+
+
+def _starts_new_stream(chunk: bytes) -> bool:
+    """Check whether a chunk begins with a container header rather than continuing a stream."""
+    if chunk[:4] == EBML_MAGIC:
+        return True
+    return chunk[:4] == OGG_MAGIC and len(chunk) > 5 and bool(chunk[5] & OGG_BEGINNING_OF_STREAM)
+
+
+class StreamClock:
+    """
+    Follows the timestamps of a growing WebM or Ogg byte stream.
+
+    Fed the same chunks as the decoder, it tells how far into the recording
+    the complete blocks (WebM) or pages (Ogg) received so far reach, which is
+    how much audio the decoder has produced once it has caught up.
+    """
+
+    def __init__(self, source_format: str):
+        self.source_format = source_format
+        self.end_seconds = 0.0
+        self._buffer = bytearray()  # Incomplete element or page carried over to the next chunk
+        self._skip = 0  # Bytes of a large element still to be skipped
+        self._failed = False
+        self._timecode_scale = 1_000_000
+        self._cluster_timecode = 0
+        self._first_timecode: Optional[int] = None
+        self._granule_rate = 0
+        self._granule_offset = 0
+
+    def feed(self, chunk: bytes) -> Optional[float]:
+        """
+        Add the next chunk of the stream.
+
+        Returns:
+            Seconds of audio up to the last complete block or page seen so far
+            (0.0 before the first one), or None if the timestamps cannot be followed
+        """
+        if self._failed:
+            return None
+        self._buffer.extend(chunk)
+        try:
+            consumed = self._parse_webm() if self.source_format == "webm" else self._parse_ogg()
+        except (ValueError, IndexError, struct.error) as e:
+            logger.warning(f"[STREAM_DECODER] Cannot follow {self.source_format} timestamps ({e}), waiting for quiet output instead")
+            self._failed = True
+            self._buffer.clear()
+            return None
+        del self._buffer[:consumed]
+        return self.end_seconds
+
+    def _parse_webm(self) -> int:
+        """Walk the buffered elements; returns how many bytes were consumed."""
+        buffer = self._buffer
+        offset = min(self._skip, len(buffer))
+        self._skip -= offset
+        while offset < len(buffer):
+            try:
+                element_id, id_length = read_vint(buffer, offset, keep_marker=True)
+                size, size_length = read_vint(buffer, offset + id_length, keep_marker=False)
+            except (ValueError, IndexError):
+                if len(buffer) - offset < 12:
+                    break  # Element header split across chunks
+                raise
+            body = offset + id_length + size_length
+
+            # Segment and Cluster have an unknown size in live WebM: walk into them
+            if element_id in MKV_MASTER_ELEMENTS:
+                offset = body
+                continue
+            if size is None:
+                raise ValueError(f"unknown size for element 0x{element_id:X}")
+            if body + size > len(buffer):
+                if size > MAX_ELEMENT_BYTES:
+                    self._skip = body + size - len(buffer)
+                    offset = len(buffer)
+                break
+
+            if element_id == MKV_TIMECODE_SCALE:
+                self._timecode_scale = read_uint(buffer, body, size)
+            elif element_id == MKV_CLUSTER_TIMECODE:
+                self._cluster_timecode = read_uint(buffer, body, size)
+            elif element_id in (MKV_SIMPLE_BLOCK, MKV_BLOCK):
+                _, track_length = read_vint(buffer, body, keep_marker=False)
+                timecode = self._cluster_timecode + struct.unpack_from(">h", buffer, body + track_length)[0]
+                if self._first_timecode is None:
+                    self._first_timecode = timecode  # ffmpeg's output starts at the first block
+                seconds = (timecode - self._first_timecode) * self._timecode_scale / 1e9
+                self.end_seconds = max(self.end_seconds, seconds)
+            offset = body + size
+        return offset
+
+    def _parse_ogg(self) -> int:
+        """Walk the buffered pages; returns how many bytes were consumed."""
+        buffer = self._buffer
+        offset = 0
+        while len(buffer) - offset >= 27:
+            if buffer[offset:offset + 4] != b"OggS":
+                raise ValueError("lost Ogg page sync")
+            segments = buffer[offset + 26]
+            if len(buffer) - offset < 27 + segments:
+                break
+            packet = offset + 27 + segments
+            page_end = packet + sum(buffer[offset + 27:packet])
+            if page_end > len(buffer):
+                break
+
+            head = bytes(buffer[packet:packet + 19])
+            if head[:8] == b"OpusHead" and len(head) >= 19:
+                self._granule_rate, self._granule_offset = 48000, struct.unpack_from("<H", head, 10)[0]
+            elif head[:7] == b"\x01vorbis" and len(head) >= 16:
+                self._granule_rate, self._granule_offset = struct.unpack_from("<I", head, 12)[0], 0
+
+            # The granule position is the sample count at the end of the page's last packet
+            granule = struct.unpack_from("<q", buffer, offset + 6)[0]
+            if granule > 0 and self._granule_rate:
+                self.end_seconds = max(0, granule - self._granule_offset) / self._granule_rate
+            offset = page_end
+        return offset
+
+
+class SessionDecoder:
+    """One long-lived ffmpeg process decoding a single recording."""
+
+    def __init__(self, session_id: str, source_format: str):
+        self.session_id = session_id
+        self.source_format = source_format
+        self.last_used = time.monotonic()
+        self.chunks_decoded = 0
+        self.last_index: Optional[int] = None  # Highest chunk index fed to ffmpeg
+        self._replay: "OrderedDict[int, Tuple[bytes, bytes]]" = OrderedDict()  # index -> (digest, PCM)
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._clock = StreamClock(source_format)
+        self._pcm = bytearray()
+        self._decoded_bytes = 0
+        self._output_event = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self):
+        """Spawn ffmpeg and the task that drains its stdout."""
+        self._process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel", "error",
+            "-f", self.source_format,
+            "-i", "pipe:0",
+            "-ar", str(TARGET_SAMPLE_RATE),
+            "-ac", "1",
+            "-f", "s16le",
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.create_task(self._read_output())
+        logger.info(f"[STREAM_DECODER] Started decoder for session {self.session_id} ({self.source_format})")
+
+    async def _read_output(self):
+        while True:
+            data = await self._process.stdout.read(65536)
+            if not data:
+                break
+            self._pcm.extend(data)
+            self._decoded_bytes += len(data)
+            self._output_event.set()
+        self._output_event.set()
+
+    def _take_pcm(self) -> bytes:
+        """Take all complete samples decoded so far."""
+        usable = len(self._pcm) - len(self._pcm) % 2
+        pcm = bytes(self._pcm[:usable])
+        del self._pcm[:usable]
+        return pcm
+
+    async def _wait_for_output(self, expected_bytes: Optional[int]):
+        """
+        Wait until the decoder has produced `expected_bytes` of PCM in total.
+
+        Without a target (timestamps unreadable), output is collected until
+        it has been quiet for STREAM_DECODER_SETTLE_MS. That fallback is
+        best-effort: on a loaded host it can stop early, and the late output
+        is then returned with the next chunk instead. Either way the wait
+        ends after STREAM_DECODER_MAX_WAIT_MS.
+        """
+        settle = settings.STREAM_DECODER_SETTLE_MS / 1000
+        deadline = time.monotonic() + settings.STREAM_DECODER_MAX_WAIT_MS / 1000
+        received = False
+        while self.is_alive:
+            if expected_bytes is not None and self._decoded_bytes >= expected_bytes:
+                return
+            self._output_event.clear()
+            timeout = settle if received and expected_bytes is None else max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self._output_event.wait(), timeout=timeout)
+                received = True
+            except asyncio.TimeoutError:
+                return
+
+    def replayed(self, chunk_index: Optional[int], chunk: bytes) -> Optional[bytes]:
+        """PCM already decoded for this exact chunk (a retried upload), if it is still kept."""
+        cached = self._replay.get(chunk_index) if chunk_index is not None else None
+        if cached is not None and cached[0] == hashlib.blake2b(chunk, digest_size=16).digest():
+            return cached[1]
+        return None
+
+    async def decode_chunk(self, chunk: bytes, chunk_index: Optional[int] = None) -> bytes:
+        """
+        Feed one chunk and collect the PCM decoded from it.
+
+        The chunk is complete once the decoder's output reaches the timestamp
+        of the last complete block/page fed so far (less DECODER_DELAY_SECONDS).
+        Audio that comes out later is returned with the next chunk.
+
+        A chunk index that was already decoded is never written to ffmpeg
+        again: a retry of one of the last REPLAY_CHUNKS chunks gets the same
+        PCM back, anything else at or below the last index is refused.
+
+        Args:
+            chunk: Next slice of the container byte stream
+            chunk_index: Index of the chunk in the session, if the client sends one
+
+        Returns:
+            Raw 16kHz mono s16le PCM
+
+        Raises:
+            Exception: If the chunk index was already decoded and its PCM is no longer kept
+        """
+        async with self._lock:
+            self.last_used = time.monotonic()
+            pcm = self.replayed(chunk_index, chunk)
+            if pcm is not None:
+                logger.info(f"[STREAM_DECODER] Session {self.session_id} chunk {chunk_index} already decoded, replaying")
+                return pcm
+            if chunk_index is not None and self.last_index is not None and chunk_index <= self.last_index:
+                raise Exception(
+                    f"chunk {chunk_index} arrived after chunk {self.last_index} and cannot be fed to the stream again"
+                )
+
+            end_seconds = self._clock.feed(chunk)
+            self._process.stdin.write(chunk)
+            await self._process.stdin.drain()
+
+            expected_bytes = None
+            if end_seconds is not None:
+                expected_bytes = 2 * int((end_seconds - DECODER_DELAY_SECONDS) * TARGET_SAMPLE_RATE)
+            await self._wait_for_output(expected_bytes)
+
+            self.chunks_decoded += 1
+            self.last_used = time.monotonic()
+            pcm = self._take_pcm()
+            if chunk_index is not None:
+                self.last_index = chunk_index
+                self.remember(chunk_index, chunk, pcm)
+            return pcm
+
+    def remember(self, chunk_index: int, chunk: bytes, pcm: bytes):
+        """Keep the PCM of a decoded chunk for replays, dropping the oldest beyond REPLAY_CHUNKS."""
+        self._replay[chunk_index] = (hashlib.blake2b(chunk, digest_size=16).digest(), pcm)
+        while len(self._replay) > REPLAY_CHUNKS:
+            self._replay.popitem(last=False)
+
+    async def finish(self) -> bytes:
+        """Close stdin, let ffmpeg flush the decoder and return the remaining PCM."""
+        async with self._lock:
+            if self.is_alive:
+                self._process.stdin.close()
+                try:
+                    await asyncio.wait_for(self._reader, timeout=settings.FFMPEG_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    logger.warning(f"[STREAM_DECODER] Flush timed out for session {self.session_id}")
+            await self.close()
+            return self._take_pcm()
+
+    async def close(self):
+        """Kill ffmpeg if it is still running."""
+        if self.is_alive:
+            self._process.kill()
+        if self._process is not None:
+            await self._process.wait()
+        if self._reader is not None and not self._reader.done():
+            self._reader.cancel()
+
+
+class StreamingDecoderPool:
+    """Keeps one SessionDecoder per session_id with idle timeout and LRU eviction."""
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, SessionDecoder]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @staticmethod
+    def supports(source_format: str) -> bool:
+        """Check whether a format can be decoded as a live stream."""
+        return normalize_format(source_format) in STREAMABLE_FORMATS
+
+    async def _evict(self, reserve: int = 0):
+        """Close idle or dead sessions, then trim LRU sessions so `reserve` new ones fit."""
+        now = time.monotonic()
+        expired = [
+            session_id for session_id, decoder in self._sessions.items()
+            if now - decoder.last_used > settings.STREAM_DECODER_IDLE_TIMEOUT_SECONDS or not decoder.is_alive
+        ]
+        remaining = [session_id for session_id in self._sessions if session_id not in expired]
+        overflow = len(remaining) + reserve - settings.STREAM_DECODER_MAX_SESSIONS
+        expired.extend(remaining[:max(0, overflow)])
+
+        for session_id in expired:
+            decoder = self._sessions.pop(session_id)
+            logger.info(f"[STREAM_DECODER] Evicting session {session_id} after {decoder.chunks_decoded} chunks")
+            await decoder.close()
+
+    async def _sweep(self):
+        """Close idle decoders while sessions exist, even if none of them is accessed again."""
+        while self._sessions:
+            await asyncio.sleep(settings.STREAM_DECODER_IDLE_TIMEOUT_SECONDS / 2)
+            async with self._lock:
+                await self._evict()
+
+    async def _get_decoder(
+        self,
+        session_id: str,
+        source_format: str,
+        chunk: bytes,
+        chunk_index: Optional[int] = None,
+    ) -> SessionDecoder:
+        async with self._lock:
+            await self._evict()
+            decoder = self._sessions.get(session_id)
+
+            # A chunk that starts with a container header begins a new recording (unless it is a retry)
+            if (
+                decoder is not None
+                and decoder.chunks_decoded
+                and _starts_new_stream(chunk)
+                and decoder.replayed(chunk_index, chunk) is None
+            ):
+                logger.info(f"[STREAM_DECODER] New stream header for session {session_id}, restarting decoder")
+                del self._sessions[session_id]
+                await decoder.close()
+                decoder = None
+
+            if decoder is None:
+                await self._evict(reserve=1)
+                decoder = SessionDecoder(session_id, source_format)
+                await decoder.start()
+                self._sessions[session_id] = decoder
+                if self._sweeper is None or self._sweeper.done():
+                    self._sweeper = asyncio.create_task(self._sweep())
+
+            self._sessions.move_to_end(session_id)
+            return decoder
+
+    async def decode_chunk(
+        self,
+        session_id: str,
+        chunk: bytes,
+        source_format: str = "webm",
+        is_final: bool = False,
+        chunk_index: Optional[int] = None,
+    ) -> bytes:
+        """
+        Decode the next chunk of a session's recording.
+
+        Args:
+            session_id: Recording/session identifier
+            chunk: Next slice of the container byte stream
+            source_format: Container format or MIME type (webm, audio/ogg, ...)
+            is_final: Flush and close the session decoder after this chunk
+            chunk_index: Index of the chunk in the session; a retried index is
+                replayed instead of being fed to ffmpeg twice
+
+        Returns:
+            WAV bytes (16kHz mono 16-bit) with only the audio decoded from this chunk
+
+        Raises:
+            Exception: If the decoder process fails, or the chunk index was
+                already decoded and can no longer be replayed
+        """
+        source_format = normalize_format(source_format)
+        decoder = await self._get_decoder(session_id, source_format, chunk, chunk_index)
+
+        try:
+            pcm = await decoder.decode_chunk(chunk, chunk_index)
+            if is_final:
+                pcm += await decoder.finish()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            await self.close_session(session_id)
+            raise Exception(f"Streaming decoder for session {session_id} failed: {e}")
+
+        if is_final or not decoder.is_alive:
+            await self.close_session(session_id)
+
+        logger.info(
+            f"[STREAM_DECODER] Session {session_id}: {len(chunk)} bytes -> "
+            f"{len(pcm) / (2 * TARGET_SAMPLE_RATE):.2f}s of new audio"
+        )
+        return encode_wav(np.frombuffer(pcm, dtype="<i2"))
+
+    async def close_session(self, session_id: str):
+        """Close and forget a session's decoder."""
+        async with self._lock:
+            decoder = self._sessions.pop(session_id, None)
+            if not self._sessions and self._sweeper is not None:
+                self._sweeper.cancel()
+        if decoder is not None:
+            await decoder.close()
+
+    async def close_all(self):
+        """Close every session decoder (application shutdown)."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        async with self._lock:
+            decoders = list(self._sessions.values())
+            self._sessions.clear()
+        for decoder in decoders:
+            await decoder.close()
+        if decoders:
+            logger.info(f"[STREAM_DECODER] Closed {len(decoders)} session decoders")
+
+
+# Global streaming decoder pool
+streaming_decoder_pool = StreamingDecoderPool()
@@ -0,0 +1,236 @@
+"""
+Admission control and circuit breaking for upstream APIs.
+
+Each upstream (Deepgram, DeepL, ElevenLabs) gets one UpstreamGuard shared by
+every request of the worker. The guard caps the calls in flight, lets a
+bounded number of callers wait for a slot, and rejects the rest at once. It
+also watches the outcome of recent calls: when too many of them fail or are
+slow, the circuit opens and calls fail fast with a 503 for
+UPSTREAM_OPEN_SECONDS, after which a single probe call decides whether the
+circuit closes again.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailableError(HTTPException):
+    """An upstream call was rejected without being attempted (circuit open or wait queue full)."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail={
+                "error": f"{upstream} unavailable",
+                "message": reason,
+                "retry_after_seconds": round(retry_after, 1),
+            },
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+        self.upstream = upstream
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"{self.upstream} unavailable: {self.reason}"
+
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error says something about the upstream's health (not a 4xx caused by the request)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return True
+
+
+class UpstreamGuard:
+    """Concurrency limit, bounded wait queue and circuit breaker for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        failure_rate_threshold: float,
+        slow_call_seconds: float,
+        window_size: int,
+        min_calls: int,
+        open_seconds: float,
+    ):
+        """
+        Args:
+            name: Upstream name, used in logs, errors and /health
+            max_in_flight: Calls allowed at once
+            max_queue: Callers allowed to wait for a free slot
+            queue_timeout_seconds: Longest wait for a slot
+            failure_rate_threshold: Share of failed or slow calls in the window that opens the circuit
+            slow_call_seconds: Calls taking longer count as bad even if they succeed
+            window_size: Number of recent calls the failure rate is computed over
+            min_calls: Calls needed in the window before the circuit can open
+            open_seconds: How long the circuit stays open before a probe call
+        """
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._outcomes: deque = deque(maxlen=window_size)  # True for a failed or slow call
+        self._opened_at = 0.0
+        self._probing = False
+
+    def _retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def _admit(self) -> bool:
+        """Check the circuit before a call; returns whether the call is the half-open probe."""
+        if self.state == OPEN:
+            if self._retry_after() > 0:
+                self.rejected += 1
+                raise UpstreamUnavailableError(self.name, "circuit open after repeated failures", self._retry_after())
+            self.state = HALF_OPEN
+            logger.info(f"[UPSTREAM] {self.name} circuit half-open, probing")
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise UpstreamUnavailableError(self.name, "circuit half-open, probe in progress", self.open_seconds)
+            self._probing = True
+            return True
+        return False
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def _record(self, bad: bool, probe: bool):
+        """Record a call outcome and move the circuit accordingly."""
+        if probe:
+            self._probing = False
+            if bad:
+                self._open()
+                logger.warning(f"[UPSTREAM] {self.name} probe failed, circuit open for {self.open_seconds:.0f}s")
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+                logger.info(f"[UPSTREAM] {self.name} probe succeeded, circuit closed")
+            return
+
+        self._outcomes.append(bad)
+        if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+            failure_rate = sum(self._outcomes) / len(self._outcomes)
+            if failure_rate >= self.failure_rate_threshold:
+                self._open()
+                logger.warning(
+                    f"[UPSTREAM] {self.name} circuit open for {self.open_seconds:.0f}s "
+                    f"({failure_rate:.0%} of recent calls failed or were slow)"
+                )
+
+    @asynccontextmanager
+    async def call(self):
+        """
+        Guard one upstream call made inside the `async with` block.
+
+        Raises:
+            UpstreamUnavailableError: If the circuit is open or no slot frees up in time
+        """
+        probe = self._admit()
+        try:
+            if self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise UpstreamUnavailableError(self.name, f"{self.waiting} requests already waiting", 1.0)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise UpstreamUnavailableError(
+                    self.name, f"no free slot within {self.queue_timeout_seconds:.0f}s", self.queue_timeout_seconds
+                )
+            finally:
+                self.waiting -= 1
+        except BaseException:
+            if probe:
+                self._probing = False
+            raise
+
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            # Says nothing about the upstream (e.g. a hedge loser, usually the slow
+            # call): record no outcome and let the next call probe again
+            if probe:
+                self._probing = False
+            raise
+        except BaseException as e:
+            self._record(_is_upstream_failure(e), probe)
+            raise
+        else:
+            self._record(time.monotonic() - start > self.slow_call_seconds, probe)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def get_state(self) -> Dict:
+        """Circuit state, occupancy and counters."""
+        return {
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "recent_failure_rate": round(sum(self._outcomes) / len(self._outcomes), 3) if self._outcomes else 0.0,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "retry_after_seconds": round(self._retry_after(), 1) if self.state == OPEN else 0.0,
+        }
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+
+
+def get_upstream_guard(name: str) -> UpstreamGuard:
+    """Shared guard for an upstream, created from the UPSTREAM_* settings on first use."""
+    if name not in _guards:
+        _guards[name] = UpstreamGuard(
+            name,
+            max_in_flight=settings.UPSTREAM_MAX_IN_FLIGHT,
+            max_queue=settings.UPSTREAM_MAX_QUEUE,
+            queue_timeout_seconds=settings.UPSTREAM_QUEUE_TIMEOUT_SECONDS,
+            failure_rate_threshold=settings.UPSTREAM_FAILURE_RATE_THRESHOLD,
+            slow_call_seconds=settings.UPSTREAM_SLOW_CALL_SECONDS,
+            window_size=settings.UPSTREAM_WINDOW_SIZE,
+            min_calls=settings.UPSTREAM_MIN_CALLS,
+            open_seconds=settings.UPSTREAM_OPEN_SECONDS,
+        )
+    return _guards[name]
+
+
+def get_upstream_states() -> Dict[str, Dict]:
+    """State of every upstream guard (for /health)."""
+    return {name: guard.get_state() for name, guard in _guards.items()}
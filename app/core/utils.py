@@ -4,7 +4,7 @@ Utility functions for the application.
 import uuid
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 from fastapi import UploadFile, HTTPException
 from app.core.config import settings
 
@@ -46,6 +46,46 @@ def validate_audio_file(file: UploadFile) -> None:
     logger.debug(f"Audio file validated: {file.filename}")
 
 
+async def iter_upload(file: UploadFile, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """
+    Read an uploaded file in chunks instead of materialising it with read().
+    
+    Args:
+        file: Uploaded file
+        chunk_size: Bytes per chunk
+    
+    Yields:
+        Consecutive chunks of the file
+    """
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def limit_upload(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Pass an upload through, counting its bytes as they arrive.
+    
+    Args:
+        chunks: The upload body, in arrival order
+        max_bytes: Largest upload accepted
+    
+    Yields:
+        The chunks of the upload
+    
+    Raises:
+        HTTPException: 413 as soon as the upload grows past max_bytes
+    """
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Audio larger than {max_bytes // (1024 * 1024)} MB")
+        yield chunk
+
+
 def get_target_language(detected_language: str) -> str:
     """
     Determine target language for translation.
@@ -0,0 +1,164 @@
+"""
+Energy-based voice activity detection over decoded 16kHz mono PCM.
+
+Frames are scored by RMS level in one vectorized pass; leading and trailing
+runs of frames below VAD_ENERGY_THRESHOLD_DBFS are trimmed, and a chunk with
+less than VAD_MIN_SPEECH_MS of voiced frames is reported as containing no
+speech so the pipeline can skip every upstream call. The same frame levels
+pick the split points when long recordings are transcribed in segments.
+"""
+import logging
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from app.core.audio_utils import TARGET_SAMPLE_RATE, encode_wav, parse_wav_header
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SilenceTrim(NamedTuple):
+    """Result of trimming one chunk (sample offsets refer to the untrimmed audio)."""
+    has_speech: bool
+    start_sample: int
+    end_sample: int
+    original_seconds: float
+    trimmed_seconds: float
+    leading_silence_seconds: float
+    trailing_silence_seconds: float
+    voiced_ratio: float
+
+
+def frame_levels_dbfs(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """
+    RMS level of consecutive non-overlapping frames in dBFS.
+
+    Args:
+        samples: int16 PCM samples (a trailing partial frame is ignored)
+        frame_size: Samples per frame
+
+    Returns:
+        float32 array with one level per frame
+    """
+    frame_count = samples.size // frame_size
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32)
+
+    frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size).astype(np.float32)
+    rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_size) / 32768.0
+    return (20.0 * np.log10(np.maximum(rms, 1e-10))).astype(np.float32)
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE) -> SilenceTrim:
+    """
+    Find the voiced region of a chunk.
+
+    Args:
+        samples: int16 PCM samples (mono)
+        sample_rate: Sample rate of `samples`
+
+    Returns:
+        SilenceTrim describing the region to keep
+    """
+    frame_size = max(1, sample_rate * settings.VAD_FRAME_MS // 1000)
+    levels = frame_levels_dbfs(samples, frame_size)
+    voiced = np.flatnonzero(levels > settings.VAD_ENERGY_THRESHOLD_DBFS)
+    total_seconds = samples.size / sample_rate
+
+    if voiced.size * settings.VAD_FRAME_MS < settings.VAD_MIN_SPEECH_MS:
+        return SilenceTrim(False, 0, 0, round(total_seconds, 3), 0.0, round(total_seconds, 3), 0.0, 0.0)
+
+    padding = sample_rate * settings.VAD_PADDING_MS // 1000
+    start = max(0, int(voiced[0]) * frame_size - padding)
+    end = min(samples.size, (int(voiced[-1]) + 1) * frame_size + padding)
+    if voiced[-1] == levels.size - 1:
+        end = samples.size  # Keep the partial frame after a voiced final frame
+
+    return SilenceTrim(
+        has_speech=True,
+        start_sample=start,
+        end_sample=end,
+        original_seconds=round(total_seconds, 3),
+        trimmed_seconds=round((end - start) / sample_rate, 3),
+        leading_silence_seconds=round(start / sample_rate, 3),
+        trailing_silence_seconds=round((samples.size - end) / sample_rate, 3),
+        voiced_ratio=round(voiced.size / levels.size, 3),
+    )
+
+
+def trim_silence(wav_data: bytes) -> Tuple[bytes, SilenceTrim]:
+    """
+    Trim leading and trailing silence from a 16-bit mono PCM WAV.
+
+    The input is returned as-is when nothing is trimmed.
+
+    Args:
+        wav_data: WAV bytes as produced by convert_to_wav_async
+
+    Returns:
+        Tuple of (trimmed WAV bytes, SilenceTrim)
+
+    Raises:
+        Exception: If the data is not 16-bit mono PCM WAV
+    """
+    info = parse_wav_header(wav_data)
+    if info is None or info.channels != 1 or info.bits_per_sample != 16:
+        raise Exception("Silence trimming requires 16-bit mono PCM WAV")
+
+    samples = np.frombuffer(
+        memoryview(wav_data)[info.data_offset:info.data_offset + info.data_size - info.data_size % 2],
+        dtype="<i2",
+    )
+    trim = detect_speech(samples, info.sample_rate)
+
+    if not trim.has_speech:
+        logger.info(f"[VAD] No speech in {trim.original_seconds:.2f}s of audio")
+        return wav_data, trim
+
+    logger.info(
+        f"[VAD] Kept {trim.trimmed_seconds:.2f}s of {trim.original_seconds:.2f}s "
+        f"(leading {trim.leading_silence_seconds:.2f}s, trailing {trim.trailing_silence_seconds:.2f}s)"
+    )
+    if trim.start_sample == 0 and trim.end_sample == samples.size:
+        return wav_data, trim
+    return encode_wav(samples[trim.start_sample:trim.end_sample], info.sample_rate), trim
+
+
+def split_at_silence(
+    samples: np.ndarray,
+    sample_rate: int = TARGET_SAMPLE_RATE,
+    target_seconds: float = 30.0,
+    search_seconds: float = 5.0,
+) -> List[Tuple[int, int]]:
+    """
+    Split audio into segments of about `target_seconds`, cutting at low-energy frames.
+
+    Each cut is placed in the quietest frame of the `search_seconds` window
+    that ends at the target length, so words are rarely split in half.
+
+    Args:
+        samples: int16 PCM samples (mono)
+        sample_rate: Sample rate of `samples`
+        target_seconds: Maximum segment length
+        search_seconds: Length of the window searched for a split point
+
+    Returns:
+        List of (start_sample, end_sample) covering the whole signal in order
+    """
+    frame_size = max(1, sample_rate * settings.VAD_FRAME_MS // 1000)
+    levels = frame_levels_dbfs(samples, frame_size)
+    target_frames = max(1, int(target_seconds * sample_rate) // frame_size)
+    search_frames = min(target_frames - 1, int(search_seconds * sample_rate) // frame_size)
+
+    segments = []
+    start_frame = 0
+    while (levels.size - start_frame) > target_frames:
+        window_end = start_frame + target_frames
+        window_start = window_end - search_frames
+        cut = window_start + int(np.argmin(levels[window_start:window_end + 1]))
+        segments.append((start_frame * frame_size, cut * frame_size))
+        start_frame = cut
+
+    segments.append((start_frame * frame_size, samples.size))
+    return segments
@@ -2,21 +2,32 @@
 FastAPI Speech Translation API
 Real-time multilingual speech translation with emotion preservation.
 """
+import asyncio
 import logging
+import time
 import uuid
 import base64
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from pathlib import Path
 from pydantic import BaseModel
 from typing import Optional, Dict
 
 from app.core.config import settings
 from app.core.utils import validate_audio_file, generate_audio_key
+from app.core.streaming_decoder import streaming_decoder_pool
+from app.core.redis_client import redis_client
+from app.core.hedging import get_hedging_states
+from app.core.retry import deadline_scope, get_retry_states
+from app.core.upstream_guard import UpstreamUnavailableError, get_upstream_states
+from app.core.audio_utils import convert_to_wav_async
+from app.core.vad import trim_silence
 
 # Import service modules
 from app.modules.speech_to_text.service import speech_to_text_service
+from app.modules.emotion_detection.classifier import NEUTRAL_ATTRIBUTES
 from app.modules.emotion_detection.service import emotion_detection_service
 from app.modules.translation.service import translation_service
 from app.modules.text_to_speech.service import text_to_speech_service
@@ -39,12 +50,89 @@ logger = logging.getLogger(__name__)
 preprocessed_data_store: Dict[str, Dict[int, dict]] = {}
 
 
+async def decode_session_chunk(
+    audio_data: bytes,
+    mimetype: str,
+    filename: str,
+    session_id: Optional[str],
+    is_final: bool,
+    chunk_index: Optional[int] = None,
+):
+    """
+    Decode a chunk with its session's long-lived streaming decoder.
+
+    Continuation chunks of a MediaRecorder stream only pay for their new
+    audio, and a retried chunk_index is replayed rather than decoded again.
+    Falls back to the original bytes (one-shot conversion later) when there
+    is no session, the format is not streamable or decoding fails.
+
+    Returns:
+        Tuple of (audio_data, mimetype, filename) to hand to the services
+    """
+    if not session_id or not settings.STREAM_DECODER_ENABLED or not streaming_decoder_pool.supports(mimetype):
+        return audio_data, mimetype, filename
+
+    try:
+        wav_data = await streaming_decoder_pool.decode_chunk(
+            session_id, audio_data, mimetype, is_final=is_final, chunk_index=chunk_index
+        )
+    except Exception as e:
+        logger.warning(f"⚠️  Streaming decoder failed for session {session_id}, using one-shot conversion: {e}")
+        return audio_data, mimetype, filename
+
+    if len(wav_data) <= 44:
+        logger.warning(f"⚠️  Streaming decoder produced no audio for session {session_id}, using one-shot conversion")
+        return audio_data, mimetype, filename
+
+    return wav_data, "audio/wav", f"{Path(filename or 'chunk').stem}.wav"
+
+
+async def trim_chunk_silence(audio_data: bytes, mimetype: str, filename: str):
+    """
+    Decode a chunk to 16kHz mono WAV and trim leading/trailing silence.
+
+    The decoded WAV is what STT and emotion detection receive, so the
+    decode is not repeated downstream. Falls back to the original bytes
+    when VAD is disabled or the chunk cannot be decoded.
+
+    Returns:
+        Tuple of (audio_data, mimetype, filename, SilenceTrim or None)
+    """
+    if not settings.VAD_ENABLED:
+        return audio_data, mimetype, filename, None
+
+    try:
+        wav_data = await convert_to_wav_async(audio_data, source_format=mimetype)
+        trimmed, trim = await asyncio.to_thread(trim_silence, wav_data)
+    except Exception as e:
+        logger.warning(f"⚠️  Silence trimming skipped: {e}")
+        return audio_data, mimetype, filename, None
+
+    return trimmed, "audio/wav", f"{Path(filename or 'chunk').stem}.wav", trim
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
     # Startup
     logger.info("Starting Speech Translation API...")
     try:
+        if settings.EMOTION_CACHE_REDIS or settings.TRANSLATION_CACHE_REDIS:
+            try:
+                await redis_client.connect()
+            except Exception as e:
+                logger.warning(f"Redis unavailable, caches stay in-process: {e}")
+        # Warm-up: service construction is cheap, the expensive setup (emotion
+        # worker processes with their Smile, HTTP/2 clients) happens here, once,
+        # instead of at import time or on the first request
+        warm_up_start = time.perf_counter()
+        await asyncio.gather(
+            speech_to_text_service.start(),
+            emotion_detection_service.start(),
+            translation_service.start(),
+            text_to_speech_service.start(),
+        )
+        logger.info(f"Services warmed up in {time.perf_counter() - warm_up_start:.2f}s")
         logger.info("Application started successfully")
     except Exception as e:
         logger.error(f"Failed to start application: {e}")
@@ -54,6 +142,12 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Speech Translation API...")
     await speech_to_text_service.cleanup()
+    await streaming_decoder_pool.close_all()
+    await emotion_detection_service.cleanup()
+    await translation_service.cleanup()
+    await text_to_speech_service.cleanup()
+    if settings.EMOTION_CACHE_REDIS or settings.TRANSLATION_CACHE_REDIS:
+        await redis_client.disconnect()
     logger.info("Application shutdown complete")
 
 
@@ -74,6 +168,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def apply_request_deadline(request: Request, call_next):
+    """Give each request a deadline; upstream retries that would wait past it are not started."""
+    with deadline_scope(settings.REQUEST_DEADLINE_SECONDS):
+        return await call_next(request)
+
 # Include module routers
 app.include_router(stt_router, prefix="/api")
 app.include_router(emotion_router, prefix="/api")
@@ -102,6 +203,8 @@ class ChunkProcessResponse(BaseModel):
     audio_chunk_size_bytes: int
     is_final: bool
     processing_time_seconds: float
+    speech_detected: bool = True
+    silence_trim: Optional[dict] = None  # VAD statistics (seconds trimmed, voiced ratio)
 
 
 class PreProcessChunkResponse(BaseModel):
@@ -116,6 +219,11 @@ class PreProcessChunkResponse(BaseModel):
     is_final: bool
     processing_time_seconds: float
     session_id: str  # For storing and retrieving data later
+    speech_detected: bool = True
+    silence_trim: Optional[dict] = None  # VAD statistics (seconds trimmed, voiced ratio)
+    session_emotion: Optional[str] = None  # Emotion over every chunk of the stream session so far
+    emotion_timeline_entry: Optional[dict] = None  # This chunk's entry; GET /api/emotion/timeline/{session_id} has them all
+    interim_transcripts: Optional[list] = None  # Deepgram live interim hypotheses (STT_STREAMING_ENABLED)
 
 
 class GenerateAudioRequest(BaseModel):
@@ -150,6 +258,16 @@ async def health_check():
         "status": "healthy",
         "storage": "in-memory",
         "sessions": len(preprocessed_data_store),
+        "emotion_workers": emotion_detection_service.get_metrics(),
+        "emotion_cache": emotion_detection_service.cache.get_metrics(),
+        "translation_cache": translation_service.cache.get_metrics(),
+        "translation_batching": translation_service.batcher.get_metrics(),
+        "emotion_timeline_sessions": len(emotion_detection_service.timelines),
+        "stt_live_sessions": len(speech_to_text_service.live_sessions),
+        "stt_language_sessions": len(speech_to_text_service.session_languages),
+        "upstreams": get_upstream_states(),
+        "retries": get_retry_states(),
+        "hedging": get_hedging_states(),
     }
 
 
@@ -233,9 +351,9 @@ async def process_audio(audio: UploadFile = File(...)):
         logger.info("⚡ STAGE 1: Speech-to-Text")
         logger.info("-" * 80)
         
-        # Run Speech-to-Text transcription
+        # Run Speech-to-Text transcription (long recordings as concurrent segments)
         try:
-            transcription = await speech_to_text_service.transcribe_audio(
+            transcription = await speech_to_text_service.transcribe_long(
                 audio_data,
                 mimetype=audio.content_type or "audio/wav"
             )
@@ -256,13 +374,11 @@ async def process_audio(audio: UploadFile = File(...)):
             
             # Use neutral emotion for TTS (emotion detection disabled)
             emotion = "neutral"
-            emotion_attributes = {
-                "pitch_mean": 0.5,
-                "energy": 0.5,
-                "speaking_rate": 0.5,
-            }
+            emotion_attributes = dict(NEUTRAL_ATTRIBUTES)
             stages["emotion_detection"]["status"] = "skipped"
             
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"✗ Parallel processing failed: {str(e)}")
             raise HTTPException(
@@ -293,6 +409,8 @@ async def process_audio(audio: UploadFile = File(...)):
             stages["translation"]["status"] = "completed"
             stages["translation"]["duration"] = time.time() - stage_start
             
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             stages["translation"]["status"] = "failed"
             stages["translation"]["error"] = str(e)
@@ -326,6 +444,8 @@ async def process_audio(audio: UploadFile = File(...)):
             stages["audio_generation"]["status"] = "completed"
             stages["audio_generation"]["duration"] = time.time() - stage_start
             
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             stages["audio_generation"]["status"] = "failed"
             stages["audio_generation"]["error"] = str(e)
@@ -386,6 +506,7 @@ async def process_audio_chunk(
     audio: UploadFile = File(...),
     chunk_index: int = Form(...),
     is_final: bool = Form(False),
+    session_id: Optional[str] = Form(None),
 ):
     """
     Process audio chunks incrementally for long recordings.
@@ -405,6 +526,7 @@ async def process_audio_chunk(
                Recommended: 2-minute segments, max 10MB per chunk
         chunk_index: Zero-based index of this chunk (0, 1, 2, ...)
         is_final: Whether this is the last chunk of the recording
+        session_id: Recording ID; consecutive WebM chunks of a session share one decoder
     
     Returns:
         ChunkProcessResponse with:
@@ -450,6 +572,34 @@ async def process_audio_chunk(
         
         logger.info(f"📊 Chunk size: {audio_size_mb:.2f} MB ({len(audio_data)} bytes)")
         
+        audio_data, mimetype, filename = await decode_session_chunk(
+            audio_data,
+            audio.content_type or "audio/webm",
+            audio.filename,
+            session_id,
+            is_final,
+            chunk_index,
+        )
+        audio_data, mimetype, _, trim = await trim_chunk_silence(audio_data, mimetype, filename)
+        silence_trim = trim._asdict() if trim is not None else None
+        
+        if trim is not None and not trim.has_speech:
+            total_duration = time.time() - chunk_start
+            logger.info(f"🔇 CHUNK {chunk_index}: no speech detected, skipping STT, translation and TTS")
+            return ChunkProcessResponse(
+                chunk_index=chunk_index,
+                transcription="",
+                source_language="",
+                translated_text="",
+                target_language="",
+                audio_chunk_base64="",
+                audio_chunk_size_bytes=0,
+                is_final=is_final,
+                processing_time_seconds=round(total_duration, 2),
+                speech_detected=False,
+                silence_trim=silence_trim,
+            )
+        
         # ============================================================
         # PARALLEL PROCESSING: STT + Emotion Detection
         # ============================================================
@@ -462,7 +612,7 @@ async def process_audio_chunk(
         try:
             transcription = await speech_to_text_service.transcribe_audio(
                 audio_data,
-                mimetype=audio.content_type or "audio/webm"
+                mimetype=mimetype
             )
             
             parallel_duration = time.time() - parallel_start
@@ -486,12 +636,10 @@ async def process_audio_chunk(
             
             # Use neutral emotion for TTS (emotion detection disabled)
             emotion = "neutral"
-            emotion_attributes = {
-                "pitch_mean": 0.5,
-                "energy": 0.5,
-                "speaking_rate": 0.5,
-            }
+            emotion_attributes = dict(NEUTRAL_ATTRIBUTES)
         
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"✗ Parallel processing failed: {str(e)}")
             raise HTTPException(
@@ -518,6 +666,8 @@ async def process_audio_chunk(
             logger.info(f"  Direction: {source_lang_code.upper()} → {target_language.upper()}")
             logger.info(f"  Translated: {translated_text[:100]}{'...' if len(translated_text) > 100 else ''}")
         
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"✗ Translation failed: {str(e)}")
             raise HTTPException(
@@ -545,6 +695,8 @@ async def process_audio_chunk(
             logger.info(f"  Size: {output_size_mb:.2f} MB ({len(generated_audio)} bytes)")
             logger.info(f"  Emotion applied: {emotion}")
         
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"✗ Audio generation failed: {str(e)}")
             raise HTTPException(
@@ -577,6 +729,7 @@ async def process_audio_chunk(
             audio_chunk_size_bytes=len(generated_audio),
             is_final=is_final,
             processing_time_seconds=round(total_duration, 2),
+            silence_trim=silence_trim,
         )
     
     except HTTPException:
@@ -627,6 +780,9 @@ async def pre_process_chunk(
     chunk_start = time.time()
     cache_key = None
     
+    # Only client-provided sessions span several chunks worth a streaming decoder
+    stream_session_id = session_id
+    
     # Generate session ID if not provided
     if not session_id:
         session_id = str(uuid.uuid4())
@@ -645,6 +801,42 @@ async def pre_process_chunk(
         audio_size_mb = len(audio_data) / (1024 * 1024)
         logger.info(f"📊 Chunk size: {audio_size_mb:.2f} MB")
         
+        audio_data, mimetype, filename = await decode_session_chunk(
+            audio_data,
+            audio.content_type or "audio/webm",
+            audio.filename,
+            stream_session_id,
+            is_final,
+            chunk_index,
+        )
+        audio_data, mimetype, filename, trim = await trim_chunk_silence(audio_data, mimetype, filename)
+        silence_trim = trim._asdict() if trim is not None else None
+        
+        if trim is not None and not trim.has_speech:
+            logger.info(f"🔇 No speech detected, skipping STT, emotion detection and translation")
+            chunk_data = {
+                "chunk_index": chunk_index,
+                "transcription": "",
+                "source_language": "",
+                "translated_text": "",
+                "target_language": "",
+                "emotion": "neutral",
+                "emotion_attributes": dict(NEUTRAL_ATTRIBUTES),
+                "is_final": is_final,
+            }
+            preprocessed_data_store.setdefault(session_id, {})[chunk_index] = chunk_data
+            if stream_session_id and is_final:
+                await speech_to_text_service.live_sessions.close_session(stream_session_id)
+            
+            total_duration = time.time() - chunk_start
+            return PreProcessChunkResponse(
+                **chunk_data,
+                processing_time_seconds=round(total_duration, 2),
+                session_id=session_id,
+                speech_detected=False,
+                silence_trim=silence_trim,
+            )
+        
         # ============================================================
         # PARALLEL PROCESSING: STT + Emotion Detection
         # ============================================================
@@ -655,14 +847,34 @@ async def pre_process_chunk(
         parallel_start = time.time()
         
         # Run STT and emotion detection in parallel
-        stt_task = speech_to_text_service.transcribe_audio(
-            audio_data,
-            mimetype=audio.content_type or "audio/webm"
-        )
-        emotion_task = emotion_detection_service.detect_emotion(
-            audio_data,
-            filename=audio.filename
-        )
+        if stream_session_id and settings.STT_STREAMING_ENABLED:
+            # Push the chunk to the session's Deepgram live stream
+            stt_task = speech_to_text_service.transcribe_stream(
+                stream_session_id,
+                audio_data,
+                mimetype=mimetype,
+                is_final=is_final,
+                chunk_index=chunk_index
+            )
+        else:
+            stt_task = speech_to_text_service.transcribe_audio(
+                audio_data,
+                mimetype=mimetype,
+                session_id=stream_session_id
+            )
+        if stream_session_id:
+            # Fold the chunk into the session's running emotion timeline
+            emotion_task = emotion_detection_service.track_chunk(
+                stream_session_id,
+                chunk_index,
+                audio_data,
+                filename=filename
+            )
+        else:
+            emotion_task = emotion_detection_service.detect_emotion(
+                audio_data,
+                filename=filename
+            )
         
         results = await asyncio.gather(stt_task, emotion_task, return_exceptions=True)
         transcription = results[0]
@@ -672,6 +884,8 @@ async def pre_process_chunk(
         logger.info(f"⚡ Parallel processing completed in {parallel_duration:.2f}s")
         
         # Handle transcription result
+        if isinstance(transcription, UpstreamUnavailableError):
+            raise transcription
         if isinstance(transcription, Exception):
             logger.error(f"❌ Speech-to-Text failed: {type(transcription).__name__}: {transcription}")
             logger.warning("⚠️  Continuing without transcription - returning error to client")
@@ -711,16 +925,17 @@ async def pre_process_chunk(
         
         # Handle emotion result
         emotion = "neutral"
-        emotion_attributes = {
-            "pitch_mean": 0.5,
-            "energy": 0.5,
-            "speaking_rate": 0.5,
-        }
+        emotion_attributes = dict(NEUTRAL_ATTRIBUTES)
+        
+        session_emotion = None
+        emotion_timeline_entry = None
         
         if not isinstance(emotion_result, Exception):
             emotion = emotion_result["emotion"]
             emotion_attributes = emotion_result["attributes"]
-            logger.info(f"✓ Emotion detected: {emotion}")
+            session_emotion = emotion_result.get("session_emotion")
+            emotion_timeline_entry = emotion_result.get("timeline_entry")
+            logger.info(f"✓ Emotion detected: {emotion}" + (f" (session: {session_emotion})" if session_emotion else ""))
         else:
             logger.warning(f"⚠️  Emotion detection failed, using neutral: {emotion_result}")
         
@@ -785,6 +1000,10 @@ async def pre_process_chunk(
             is_final=is_final,
             processing_time_seconds=round(total_duration, 2),
             session_id=session_id,
+            silence_trim=silence_trim,
+            session_emotion=session_emotion,
+            emotion_timeline_entry=emotion_timeline_entry,
+            interim_transcripts=transcription.get("interim"),
         )
     
     except HTTPException:
@@ -868,6 +1087,16 @@ async def generate_audio(
         logger.info(f"  Source → Target: {chunk_data.get('source_language', 'unknown')} → {target_language}")
         logger.info(f"  Emotion: {emotion}")
         
+        # Chunks without speech were stored with no text; there is nothing to speak
+        if not translated_text:
+            logger.info(f"🔇 Chunk {chunk_index} has no speech, skipping audio generation")
+            return GenerateAudioResponse(
+                chunk_index=chunk_index,
+                audio_chunk_base64="",
+                audio_chunk_size_bytes=0,
+                processing_time_seconds=round(time.time() - gen_start, 2),
+            )
+        
         # ============================================================
         # TEXT-TO-SPEECH GENERATION
         # ============================================================
@@ -0,0 +1,113 @@
+"""
+Vectorized emotion classification.
+
+Table-driven NumPy version of EmotionDetectionService._classify_emotion:
+every scoring rule is a (emotion, points, mask) row evaluated over a whole
+batch of feature vectors at once. Results are identical to the scalar
+classifier, including its tie-breaking and the SAD -> NEUTRAL override.
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Column order matches the scalar classifier's score dict, so argmax breaks ties the same way
+EMOTIONS = ("neutral", "happy", "sad", "angry")
+
+# Feature columns of the input matrix
+ATTRIBUTE_NAMES = ("pitch_mean", "pitch_std", "loudness_mean", "loudness_std")
+
+# Attributes reported with the "neutral" fallback when emotion is not detected
+NEUTRAL_ATTRIBUTES = {"pitch_mean": 0.5, "energy": 0.5, "speaking_rate": 0.5}
+
+
+def _scoring_rules(pitch_mean, pitch_std, loudness_mean, loudness_std):
+    """Scoring table: (emotion, points, mask) for every rule of _classify_emotion."""
+    # HAPPY: the three branches are an if/elif chain, so each excludes the previous ones
+    happy_range = (28.0 <= pitch_mean) & (pitch_mean <= 36.0)
+    happy_strong = happy_range & (pitch_std > 0.30)
+    happy_moderate = (
+        happy_range & ~happy_strong & (pitch_std > 0.22)
+        & (0.8 <= loudness_mean) & (loudness_mean <= 1.3)
+        & (0.85 <= loudness_std) & (loudness_std <= 1.3)
+    )
+    happy_excited = (
+        happy_range & ~happy_strong & ~happy_moderate
+        & (pitch_mean >= 30.0) & (loudness_mean >= 1.0) & (loudness_std >= 0.75)
+    )
+
+    return [
+        ("happy", 6, happy_strong),
+        ("happy", 5, happy_moderate),
+        ("happy", 4, happy_excited),
+        # ANGRY
+        ("angry", 5, pitch_mean > 37),
+        ("angry", 3, (pitch_mean > 35) & ~(pitch_mean > 37)),
+        ("angry", 4, loudness_mean > 1.4),
+        ("angry", 2, (loudness_mean > 1.2) & ~(loudness_mean > 1.4)),
+        ("angry", 2, loudness_std > 1.1),
+        ("angry", 2, (pitch_std < 0.2) & (pitch_mean > 30)),
+        # SAD
+        ("sad", 4, pitch_mean < 25),
+        ("sad", 3, pitch_std < 0.18),
+        ("sad", 4, loudness_mean < 0.4),
+        ("sad", 2, loudness_std < 0.7),
+        # NEUTRAL
+        ("neutral", 2, (26 <= pitch_mean) & (pitch_mean <= 32)),
+        ("neutral", 2, (0.3 <= loudness_mean) & (loudness_mean <= 1.0)),
+    ]
+
+
+def score_batch(features: np.ndarray) -> np.ndarray:
+    """
+    Score a batch of feature vectors.
+
+    Args:
+        features: (N, 4) array with columns in ATTRIBUTE_NAMES order
+
+    Returns:
+        (N, 4) int array of scores with columns in EMOTIONS order
+    """
+    features = np.asarray(features, dtype=np.float64).reshape(-1, len(ATTRIBUTE_NAMES))
+    scores = np.zeros((features.shape[0], len(EMOTIONS)), dtype=np.int64)
+    for emotion, points, mask in _scoring_rules(*features.T):
+        scores[:, EMOTIONS.index(emotion)] += points * mask
+    return scores
+
+
+def classify_batch(features: np.ndarray) -> List[str]:
+    """
+    Classify a batch of feature vectors in one pass.
+
+    Args:
+        features: (N, 4) array with columns in ATTRIBUTE_NAMES order
+
+    Returns:
+        Emotion label per row: happy, sad, angry, or neutral
+    """
+    features = np.asarray(features, dtype=np.float64).reshape(-1, len(ATTRIBUTE_NAMES))
+    scores = score_batch(features)
+    winners = np.argmax(scores, axis=1)  # First maximum wins; all-zero rows pick neutral
+
+    pitch_mean, _, loudness_mean, loudness_std = features.T
+    sad = EMOTIONS.index("sad")
+    sad_score = scores[:, sad]
+    # Borderline SAD is treated as NEUTRAL (same conditions as the scalar classifier)
+    neutral_override = (
+        (winners == sad)
+        & (sad_score <= 5)
+        & ((sad_score - scores[:, EMOTIONS.index("neutral")]) <= 3)
+        & (24.5 <= pitch_mean) & (pitch_mean <= 28.5)
+        & (0.35 <= loudness_mean) & (loudness_mean <= 0.9)
+        & (0.7 <= loudness_std) & (loudness_std <= 1.1)
+    )
+    winners[neutral_override] = EMOTIONS.index("neutral")
+
+    return [EMOTIONS[i] for i in winners]
+
+
+def attributes_to_matrix(attributes: Sequence[Dict[str, float]]) -> np.ndarray:
+    """Stack attribute dicts (as returned by _extract_emotional_attributes) into an (N, 4) matrix."""
+    return np.array(
+        [[item.get(name, 0) for name in ATTRIBUTE_NAMES] for item in attributes],
+        dtype=np.float64,
+    ).reshape(-1, len(ATTRIBUTE_NAMES))
@@ -0,0 +1,227 @@
+"""
+Pure NumPy pitch and loudness feature engine.
+
+Lightweight alternative to OpenSmile that computes the four attributes the
+emotion classifier consumes, following the eGeMAPSv02 definitions:
+
+- F0 in semitones from 27.5 Hz, estimated per 10 ms frame with YIN on 60 ms
+  frames (55-1000 Hz), smoothed over 3 voiced frames; amean and stddevNorm
+  (coefficient of variation) are taken over voiced frames only.
+- Loudness as the mean of the auditory spectrum (26 mel bands, 20-8000 Hz,
+  equal-loudness weighting, cube-root intensity-to-loudness compression) on
+  20 ms Hamming frames, smoothed over 3 frames; amean and stddevNorm are taken
+  over all frames.
+
+Values track OpenSmile closely on clean voiced speech but are not bit-exact;
+use OPENSMILE_CONFIG when exact eGeMAPS values are needed.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+FEATURE_VERSION = 1  # Bump when a change alters the computed values (invalidates cached results)
+FRAME_STEP_SECONDS = 0.010
+PITCH_FRAME_SECONDS = 0.060
+LOUDNESS_FRAME_SECONDS = 0.020
+MIN_F0_HZ = 55.0
+MAX_F0_HZ = 1000.0
+YIN_THRESHOLD = 0.15  # Cumulative mean normalised difference below this marks a voiced frame
+PITCH_BLOCK_FRAMES = 256
+VOICING_RMS_THRESHOLD = 0.001  # Same energy gate OpenSmile applies before accepting a pitch
+MEL_BANDS = 26
+MEL_LOW_HZ = 20.0
+MEL_HIGH_HZ = 8000.0
+LOUDNESS_COMPRESSION = 0.33
+# Calibration of the auditory spectrum against OpenSmile's cPlp output: a constant
+# power gain and a steep roll-off above ~4.6 kHz (fitted per band, within 1%)
+AUDITORY_GAIN = 5.868
+AUDITORY_ROLLOFF_HZ = 4610.0
+AUDITORY_ROLLOFF_ORDER = 7
+
+
+def _frames(signal: np.ndarray, frame_size: int, step: int) -> np.ndarray:
+    """Strided (n_frames, frame_size) view; frames start every `step` samples."""
+    if signal.size < frame_size:
+        return np.zeros((0, frame_size), dtype=signal.dtype)
+    return np.lib.stride_tricks.sliding_window_view(signal, frame_size)[::step]
+
+
+def _smooth3(values: np.ndarray, mask: np.ndarray = None) -> np.ndarray:
+    """3-frame moving average; with `mask`, only masked frames are smoothed and averaged (sma3nz)."""
+    if values.size == 0:
+        return values
+    if mask is None:
+        mask = np.ones(values.shape, dtype=bool)
+    weights = mask.astype(np.float64)
+    padded_values = np.pad(values * weights, 1)
+    padded_weights = np.pad(weights, 1)
+    sums = padded_values[:-2] + padded_values[1:-1] + padded_values[2:]
+    counts = padded_weights[:-2] + padded_weights[1:-1] + padded_weights[2:]
+    smoothed = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return np.where(mask, smoothed, 0.0)
+
+
+def _mean_and_cv(values: np.ndarray):
+    """Arithmetic mean and normalised standard deviation (std / mean), 0 for empty input."""
+    if values.size == 0:
+        return 0.0, 0.0
+    mean = float(values.mean())
+    return mean, float(values.std() / mean) if mean else 0.0
+
+
+def pitch_semitones(signal: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Frame-wise F0 in semitones from 27.5 Hz using YIN.
+
+    Args:
+        signal: Mono float32 samples in [-1, 1]
+        sample_rate: Sample rate of `signal`
+
+    Returns:
+        F0 per 10 ms frame; 0 for unvoiced frames
+    """
+    frame_size = int(PITCH_FRAME_SECONDS * sample_rate)
+    step = int(FRAME_STEP_SECONDS * sample_rate)
+    frames = _frames(signal.astype(np.float64), frame_size, step)
+    if frames.shape[0] == 0:
+        return np.zeros(0)
+    # Blocks of frames keep the FFT buffers cache-sized on long recordings
+    return np.concatenate([
+        _yin(frames[start:start + PITCH_BLOCK_FRAMES], sample_rate)
+        for start in range(0, frames.shape[0], PITCH_BLOCK_FRAMES)
+    ])
+
+
+def _yin(frames: np.ndarray, sample_rate: int) -> np.ndarray:
+    """YIN pitch (semitones, 0 when unvoiced) of each row of `frames`."""
+    frame_size = frames.shape[1]
+    tau_min = max(2, int(sample_rate / MAX_F0_HZ))
+    tau_max = min(int(sample_rate / MIN_F0_HZ), frame_size // 2)
+    window = frame_size - tau_max
+
+    # Difference function d(tau) = sum (x_j - x_{j+tau})^2 over the first `window`
+    # samples, via the FFT cross-correlation of the window with the whole frame
+    n_fft = 1 << int(np.ceil(np.log2(frame_size)))  # Only non-negative lags are used, so no wrap-around
+    head = frames[:, :window]
+    cross = np.fft.irfft(
+        np.fft.rfft(frames, n_fft) * np.conj(np.fft.rfft(head, n_fft)), n_fft
+    )[:, :tau_max + 1]
+    squares = np.cumsum(np.pad(frames ** 2, ((0, 0), (1, 0))), axis=1)
+    energy_head = squares[:, window][:, None]
+    taus = np.arange(tau_max + 1)
+    energy_shifted = squares[:, taus + window] - squares[:, taus]
+    diff = np.maximum(energy_head + energy_shifted - 2 * cross, 0.0)
+
+    # Cumulative mean normalised difference
+    cmnd = np.ones_like(diff)
+    cumulative = np.cumsum(diff[:, 1:], axis=1)
+    cmnd[:, 1:] = diff[:, 1:] * taus[1:] / np.maximum(cumulative, 1e-12)
+
+    # First dip below the threshold (then down to its local minimum), else no pitch
+    search = cmnd[:, tau_min:tau_max]
+    below = search < YIN_THRESHOLD
+    voiced = below.any(axis=1)
+    tau = np.argmax(below, axis=1) + tau_min
+    rows = np.arange(frames.shape[0])
+    for _ in range(tau_max):
+        step_down = voiced & (tau + 1 < tau_max) & (cmnd[rows, np.minimum(tau + 1, tau_max)] < cmnd[rows, tau])
+        if not step_down.any():
+            break
+        tau = tau + step_down
+
+    # Parabolic interpolation around the minimum
+    left = cmnd[rows, tau - 1]
+    centre = cmnd[rows, tau]
+    right = cmnd[rows, np.minimum(tau + 1, tau_max)]
+    denominator = left - 2 * centre + right
+    offset = np.divide(left - right, 2 * denominator, out=np.zeros_like(centre), where=np.abs(denominator) > 1e-12)
+    period = tau + np.clip(offset, -1, 1)
+
+    rms = np.sqrt(squares[:, -1] / frame_size)
+    voiced &= rms > VOICING_RMS_THRESHOLD
+    f0 = np.divide(sample_rate, period, out=np.zeros_like(period, dtype=np.float64), where=voiced)
+    return np.where(voiced, 12 * np.log2(np.maximum(f0, 1e-6) / 27.5), 0.0)
+
+
+def _hz_to_mel(hz):
+    return 1127.0 * np.log1p(np.asarray(hz) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * np.expm1(np.asarray(mel) / 1127.0)
+
+
+def _auditory_weights(n_fft: int, sample_rate: int) -> np.ndarray:
+    """(MEL_BANDS, bins) triangular mel filterbank with equal-loudness weighting per band."""
+    high = min(MEL_HIGH_HZ, sample_rate / 2)
+    edges = _mel_to_hz(np.linspace(_hz_to_mel(MEL_LOW_HZ), _hz_to_mel(high), MEL_BANDS + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    filters = np.maximum(0.0, np.minimum((bins - lower) / (centre - lower), (upper - bins) / (upper - centre)))
+
+    # Hermansky equal-loudness curve at each band centre (as in PLP)
+    omega_sq = (2 * np.pi * edges[1:-1]) ** 2
+    equal_loudness = (omega_sq + 56.8e6) * omega_sq ** 2 / ((omega_sq + 6.3e6) ** 2 * (omega_sq + 0.38e9))
+    equal_loudness *= AUDITORY_GAIN / (1 + (edges[1:-1] / AUDITORY_ROLLOFF_HZ) ** AUDITORY_ROLLOFF_ORDER)
+    return filters * equal_loudness[:, None]
+
+
+def loudness(signal: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Frame-wise loudness (mean of the compressed auditory spectrum bands).
+
+    Args:
+        signal: Mono float32 samples in [-1, 1]
+        sample_rate: Sample rate of `signal`
+
+    Returns:
+        Loudness per 10 ms frame
+    """
+    frame_size = int(LOUDNESS_FRAME_SECONDS * sample_rate)
+    step = int(FRAME_STEP_SECONDS * sample_rate)
+    frames = _frames(signal.astype(np.float64), frame_size, step)
+    if frames.shape[0] == 0:
+        return np.zeros(0)
+
+    n_fft = 1 << int(np.ceil(np.log2(frame_size)))
+    power = np.abs(np.fft.rfft(frames * np.hamming(frame_size), n_fft)) ** 2
+    auditory = power @ _auditory_weights(n_fft, sample_rate).T
+    return (auditory ** LOUDNESS_COMPRESSION).mean(axis=1)
+
+
+def frame_descriptors(signal: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Frame-level descriptors behind the four attributes.
+
+    Args:
+        signal: Mono float32 samples in [-1, 1]
+        sample_rate: Sample rate of `signal`
+
+    Returns:
+        Tuple of (smoothed F0 semitones of voiced frames, smoothed loudness of every frame)
+    """
+    f0 = pitch_semitones(signal, sample_rate)
+    voiced = f0 > 0
+    return _smooth3(f0, voiced)[voiced], _smooth3(loudness(signal, sample_rate))
+
+
+def extract_attributes(signal: np.ndarray, sample_rate: int) -> Dict[str, float]:
+    """
+    Compute the four emotional attributes from an in-memory signal.
+
+    Args:
+        signal: Mono float32 samples in [-1, 1]
+        sample_rate: Sample rate of `signal`
+
+    Returns:
+        Dictionary with pitch_mean, pitch_std, loudness_mean and loudness_std
+    """
+    pitch, frame_loudness = frame_descriptors(signal, sample_rate)
+    pitch_mean, pitch_std = _mean_and_cv(pitch)
+    loudness_mean, loudness_std = _mean_and_cv(frame_loudness)
+    return {
+        "pitch_mean": pitch_mean,
+        "pitch_std": pitch_std,
+        "loudness_mean": loudness_mean,
+        "loudness_std": loudness_std,
+    }
@@ -1,9 +1,10 @@
 """
 Router for emotion detection endpoints.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List, Optional
+from app.core.config import settings
 from app.modules.emotion_detection.service import emotion_detection_service
 from app.core.utils import validate_audio_file
 
@@ -16,13 +17,41 @@ class EmotionResponse(BaseModel):
     attributes: Dict[str, float]
 
 
+class BatchEmotionItem(EmotionResponse):
+    """Emotion detection result for one clip of a batch."""
+    filename: str
+
+
+class BatchEmotionResponse(BaseModel):
+    """Response model for batch emotion detection."""
+    results: List[BatchEmotionItem]
+
+
+class TimelineEntry(EmotionResponse):
+    """Emotion of one chunk of a stream session."""
+    chunk_index: int
+    duration_seconds: float
+    session_emotion: str
+
+
+class EmotionTimelineResponse(BaseModel):
+    """Response model for a stream session's emotion timeline."""
+    session_id: str
+    emotion: str
+    attributes: Dict[str, float]
+    chunks: int
+    seconds: float
+    timeline: List[TimelineEntry]
+
+
 @router.post("/detect", response_model=EmotionResponse)
-async def detect_emotion(audio: UploadFile = File(...)):
+async def detect_emotion(audio: UploadFile = File(...), fast: Optional[bool] = Form(None)):
     """
     Detect emotion from audio file.
     
     Args:
         audio: Audio file (mp3, wav, m4a, flac, ogg, webm)
+        fast: Approximate mode for long recordings (defaults to EMOTION_FAST_MODE)
     
     Returns:
         Detected emotion and acoustic attributes
@@ -37,7 +66,8 @@ async def detect_emotion(audio: UploadFile = File(...)):
         # Detect emotion
         result = await emotion_detection_service.detect_emotion(
             audio_data,
-            filename=audio.filename
+            filename=audio.filename,
+            fast=fast,
         )
         
         return result
@@ -46,3 +76,60 @@ async def detect_emotion(audio: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+
+
+@router.post("/detect-batch", response_model=BatchEmotionResponse)
+async def detect_emotion_batch(audios: List[UploadFile] = File(...), fast: Optional[bool] = Form(None)):
+    """
+    Detect emotion for many audio files in one request.
+    
+    Features are extracted for all files in parallel and classified in a
+    single vectorized pass (same labels as /detect).
+    
+    Args:
+        audios: Audio files (mp3, wav, m4a, flac, ogg, webm)
+        fast: Approximate mode for long recordings (defaults to EMOTION_FAST_MODE)
+    
+    Returns:
+        Detected emotion and acoustic attributes per file, in upload order
+    """
+    if len(audios) > settings.EMOTION_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files ({len(audios)}); the limit is {settings.EMOTION_BATCH_MAX_FILES}"
+        )
+    
+    # Validate every file before any processing starts
+    clips = []
+    for audio in audios:
+        validate_audio_file(audio)
+        clips.append((await audio.read(), audio.filename))
+    
+    try:
+        results = await emotion_detection_service.detect_emotion_batch(clips, fast=fast)
+        return {
+            "results": [
+                {"filename": filename, **result}
+                for (_, filename), result in zip(clips, results)
+            ]
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/timeline/{session_id}", response_model=EmotionTimelineResponse)
+async def get_emotion_timeline(session_id: str):
+    """
+    Get the emotion timeline of a stream session.
+    
+    Args:
+        session_id: Session ID passed to /api/pre-process-chunk
+    
+    Returns:
+        Session-level emotion and attributes plus one entry per processed chunk
+    """
+    session = emotion_detection_service.timelines.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No emotion timeline for session {session_id}")
+    return session.summary()
@@ -0,0 +1,100 @@
+"""
+Signal reduction for approximate (fast mode) emotion extraction.
+
+The classifier only needs four global statistics, so for long recordings
+they can be estimated from part of the signal: a strided sample of windows
+containing speech, spread over the whole recording, optionally at a lower
+sample rate. The reduced signal goes through the same feature engine as the
+full one.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+VOICED_FRAME_MS = 20
+# Windows that are nearly all silence are skipped when possible; a higher bar
+# would bias loudness upwards, since loudness statistics include the pauses
+MIN_VOICED_RATIO = 0.05
+
+
+def _voiced_ratio(windows: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Fraction of 20 ms frames above VAD_ENERGY_THRESHOLD_DBFS in each window row."""
+    frame_size = sample_rate * VOICED_FRAME_MS // 1000
+    frames_per_window = windows.shape[1] // frame_size
+    frames = windows[:, :frames_per_window * frame_size].reshape(windows.shape[0], frames_per_window, frame_size)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=2))
+    levels = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    return np.mean(levels > settings.VAD_ENERGY_THRESHOLD_DBFS, axis=1)
+
+
+def select_voiced_windows(signal: np.ndarray, sample_rate: int, window_seconds: float, max_windows: int) -> np.ndarray:
+    """
+    Keep at most `max_windows` windows with speech, evenly strided over the recording.
+
+    Args:
+        signal: Mono float32 samples
+        sample_rate: Sample rate of `signal`
+        window_seconds: Length of each analysed window
+        max_windows: Window budget
+
+    Returns:
+        The selected windows concatenated in time order (the input itself if it already fits the budget)
+    """
+    window = int(window_seconds * sample_rate)
+    count = signal.size // window if window else 0
+    if count <= max_windows:
+        return signal
+
+    windows = signal[:count * window].reshape(count, window)
+    ratios = _voiced_ratio(windows, sample_rate)
+    candidates = np.flatnonzero(ratios >= MIN_VOICED_RATIO)
+    if candidates.size < max_windows:
+        # Not enough clearly voiced windows: fill up with the most voiced of the rest
+        candidates = np.sort(np.argsort(-ratios, kind="stable")[:max_windows])
+    picks = candidates[np.round(np.linspace(0, candidates.size - 1, max_windows)).astype(int)]
+    return windows[picks].reshape(-1)
+
+
+def downsample(signal: np.ndarray, sample_rate: int, target_rate: int) -> Tuple[np.ndarray, int]:
+    """
+    Decimate by an integer factor after a windowed-sinc low-pass filter.
+
+    Args:
+        signal: Mono float32 samples
+        sample_rate: Sample rate of `signal`
+        target_rate: Desired sample rate (rounded to an integer divisor of `sample_rate`)
+
+    Returns:
+        Tuple of (decimated signal, new sample rate)
+    """
+    factor = sample_rate // target_rate if target_rate else 1
+    if factor <= 1:
+        return signal, sample_rate
+
+    taps = 16 * factor + 1
+    cutoff = 0.9 / factor  # Fraction of the input Nyquist frequency
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = cutoff * np.sinc(cutoff * n) * np.hamming(taps)
+    filtered = np.convolve(signal, kernel / kernel.sum(), mode="same")
+    return filtered[::factor].astype(np.float32), sample_rate // factor
+
+
+def approximate_signal(signal: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """
+    Reduce a long signal for fast mode according to the EMOTION_FAST_* settings.
+
+    Args:
+        signal: Mono float32 samples
+        sample_rate: Sample rate of `signal`
+
+    Returns:
+        Tuple of (reduced signal, its sample rate); short signals are returned unchanged
+    """
+    if signal.size < settings.EMOTION_FAST_MIN_SECONDS * sample_rate:
+        return signal, sample_rate
+    signal = select_voiced_windows(
+        signal, sample_rate, settings.EMOTION_FAST_WINDOW_SECONDS, settings.EMOTION_FAST_MAX_WINDOWS
+    )
+    return downsample(signal, sample_rate, settings.EMOTION_FAST_SAMPLE_RATE)
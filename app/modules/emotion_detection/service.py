@@ -1,53 +1,124 @@
 """
-Emotion detection service using OpenSmile.
+Emotion detection service using OpenSmile or the built-in NumPy feature engine.
 Analyzes acoustic features (pitch, energy, voice quality) for emotion detection.
 """
+import asyncio
+import importlib.util
 import logging
+import multiprocessing
 import tempfile
 import os
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+from app.core.audio_utils import decode_to_float32
+from app.core.config import settings
+from app.core.result_cache import ResultCache, content_key
+from app.modules.emotion_detection import worker
+from app.modules.emotion_detection.classifier import NEUTRAL_ATTRIBUTES, attributes_to_matrix, classify_batch
+from app.modules.emotion_detection.features import FEATURE_VERSION, extract_attributes, frame_descriptors
+from app.modules.emotion_detection.sampling import approximate_signal
+from app.modules.emotion_detection.timeline import EmotionTimelineStore, RunningStats
 
 logger = logging.getLogger(__name__)
 
 class EmotionDetectionService:
-    """Service for detecting emotion from audio using OpenSmile."""
+    """Service for detecting emotion from audio using OpenSmile or NumPy features."""
     
     def __init__(self):
-        """Initialize OpenSmile emotion detection service."""
+        """Initialize emotion detection service with the configured feature engine."""
         logger.info("=" * 60)
         logger.info("Initializing EmotionDetectionService...")
-        try:
-            import opensmile
-            logger.info("OpenSmile library imported successfully")
-            # Use ComParE feature set for faster processing
-            # eGeMAPSv02 has 88 features, ComParE_2016 is optimized
-            self.smile = opensmile.Smile(
-                feature_set=opensmile.FeatureSet.eGeMAPSv02,
-                feature_level=opensmile.FeatureLevel.Functionals,
-                num_workers=2,  # Parallel processing
+        self.pool_size = settings.EMOTION_WORKERS or max(1, (os.cpu_count() or 2) - 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0  # Extractions submitted to the pool and not finished yet
+        # Attributes of recently seen audio, so retried uploads skip feature extraction
+        self.cache = ResultCache(
+            "emotion",
+            max_bytes=settings.EMOTION_CACHE_MAX_BYTES,
+            ttl_seconds=settings.EMOTION_CACHE_TTL_SECONDS,
+            use_redis=settings.EMOTION_CACHE_REDIS,
+        )
+        self.timelines = EmotionTimelineStore()  # Running per-session aggregates for live chunks
+        self.opensmile_available = False
+        if settings.EMOTION_FEATURE_ENGINE.lower() == "opensmile":
+            # Only locate the package: opensmile (and pandas) are imported by the
+            # worker processes, each building its own Smile during start(), so
+            # importing the app does not pay for them
+            if importlib.util.find_spec("opensmile") is not None:
+                self.opensmile_available = True
+                logger.info("✓ OpenSmile available - REAL MODEL ACTIVE")
+                logger.info(f"Feature set: {settings.OPENSMILE_CONFIG}, Level: Functionals, Worker processes: {self.pool_size}")
+            else:
+                logger.warning("✗ OpenSmile not available, using NumPy feature engine")
+        logger.info(f"Feature engine: {self.feature_engine}")
+        logger.info("=" * 60)
+    
+    @property
+    def feature_engine(self) -> str:
+        """Active feature engine: opensmile, or numpy (in-process pitch and loudness, same 4 attributes)."""
+        return "opensmile" if self.opensmile_available else "numpy"
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get or create the OpenSmile worker pool."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),  # No forking of the event loop process
+                initializer=worker.init_worker,
+                initargs=(settings.OPENSMILE_CONFIG,),
             )
-            self.opensmile_available = True
-            logger.info("✓ OpenSmile initialized successfully - REAL MODEL ACTIVE")
-            logger.info(f"Feature set: eGeMAPSv02, Level: Functionals, Workers: 2")
-        except ImportError as e:
-            logger.warning("✗ OpenSmile not available, using mock emotion detection")
-            logger.warning(f"Import error: {e}")
-            self.smile = None
-            self.opensmile_available = False
+        return self._executor
+    
+    async def _run_in_pool(self, func, *args):
+        """Run a worker function in the pool, tracking queue depth and replacing a broken pool."""
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            logger.error("[OPENSMILE] Worker pool broken, it will be recreated on the next request")
+            self._executor = None
+            raise
+        finally:
+            self._pending -= 1
+    
+    async def start(self):
+        """Warm-up: start every worker process and build its Smile ahead of the first request."""
+        if not self.opensmile_available:
+            return
+        try:
+            pids = await asyncio.gather(*(self._run_in_pool(worker.ping) for _ in range(self.pool_size)))
+            logger.info(f"[OPENSMILE] Worker pool ready: {len(set(pids))} processes")
         except Exception as e:
-            logger.error(f"✗ Failed to initialize OpenSmile: {e}")
-            self.smile = None
+            logger.error(f"✗ Failed to start OpenSmile workers: {e}")
             self.opensmile_available = False
-        logger.info("=" * 60)
     
-    async def detect_emotion(self, audio_data: bytes, filename: str = "audio.wav") -> Dict:
+    def get_metrics(self) -> Dict[str, int]:
+        """Worker pool size and the number of extractions waiting for a free worker."""
+        return {
+            "workers": self.pool_size if self.opensmile_available else 0,
+            "in_flight": min(self._pending, self.pool_size),
+            "queue_depth": max(0, self._pending - self.pool_size),
+        }
+    
+    async def cleanup(self):
+        """Shut down the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Emotion detection workers shut down")
+    
+    async def detect_emotion(self, audio_data: bytes, filename: str = "audio.wav", fast: Optional[bool] = None) -> Dict:
         """
         Detect emotion from audio data.
         
         Args:
             audio_data: Binary audio data
             filename: Original filename (for extension detection)
+            fast: Approximate mode for long audio (strided windows, see
+                EMOTION_FAST_*); defaults to EMOTION_FAST_MODE
         
         Returns:
             Dictionary with 'emotion' and 'attributes' keys
@@ -57,60 +128,11 @@ class EmotionDetectionService:
         """
         logger.info(f"[DETECT_EMOTION] Starting emotion detection for file: {filename}")
         logger.info(f"[DETECT_EMOTION] Audio data size: {len(audio_data)} bytes")
-        logger.info(f"[DETECT_EMOTION] OpenSmile available: {self.opensmile_available}")
-        
-        if self.smile is None:
-            # Fallback to mock emotion detection
-            logger.warning("⚠ OpenSmile not available, using MOCK detection (not real model)")
-            return await self._mock_emotion_detection(audio_data)
-        
-        temp_path = None
+        logger.info(f"[DETECT_EMOTION] Feature engine: {self.feature_engine}")
         
         try:
-            # Save audio to temporary file (OpenSmile supports MP3, WAV, etc.)
-            suffix = Path(filename).suffix.lower() or ".wav"
-            
-            # Create temp file without automatic deletion (Windows compatibility)
-            # Use buffered write for better performance
-            temp_fd, temp_path = tempfile.mkstemp(suffix=suffix)
-            try:
-                # Write audio data in chunks for large files
-                chunk_size = 8192
-                for i in range(0, len(audio_data), chunk_size):
-                    os.write(temp_fd, audio_data[i:i+chunk_size])
-                os.close(temp_fd)
-                
-                # Verify file exists and is readable
-                if not os.path.exists(temp_path):
-                    raise FileNotFoundError(f"Temporary file not found: {temp_path}")
-                
-                file_size = os.path.getsize(temp_path)
-                if file_size == 0:
-                    raise ValueError(f"Temporary file is empty: {temp_path}")
-                
-                logger.info(f"[OPENSMILE] Processing audio file: {temp_path} (size: {file_size} bytes)")
-                logger.info(f"[OPENSMILE] Calling OpenSmile.process_file() - REAL MODEL EXTRACTION")
-                
-                # Extract features using OpenSmile (supports MP3, WAV, FLAC, etc.)
-                features = self.smile.process_file(temp_path)
-                
-                logger.info(f"[OPENSMILE] ✓ Feature extraction completed")
-                logger.info(f"[OPENSMILE] Features shape: {features.shape if features is not None else 'None'}")
-            except:
-                # Close fd if still open
-                try:
-                    os.close(temp_fd)
-                except:
-                    pass
-                raise
-            
-            if features is None or features.empty:
-                raise ValueError("OpenSmile returned empty features")
-            
-            # Extract key emotional attributes
-            logger.info(f"[PROCESSING] Extracting emotional attributes from OpenSmile features")
-            attributes = self._extract_emotional_attributes(features)
-            logger.info(f"[PROCESSING] Extracted attributes: {attributes}")
+            fast = settings.EMOTION_FAST_MODE if fast is None else fast
+            attributes = await self._extract_attributes(audio_data, filename, fast)
             
             # Classify emotion based on acoustic features
             logger.info(f"[CLASSIFICATION] Classifying emotion based on acoustic features")
@@ -138,21 +160,277 @@ class EmotionDetectionService:
             logger.warning("Returning neutral emotion due to processing error")
             return {
                 "emotion": "neutral",
-                "attributes": {
-                    "pitch_mean": 0.5,
-                    "energy": 0.5,
-                    "speaking_rate": 0.5,
-                },
+                "attributes": dict(NEUTRAL_ATTRIBUTES),
+            }
+    
+    def _cache_key(self, audio_data: bytes, fast: bool = False) -> str:
+        """Cache key: feature configuration version plus a hash of the audio bytes."""
+        if self.opensmile_available:
+            version = f"opensmile-{settings.OPENSMILE_CONFIG}"
+        else:
+            version = f"numpy-{FEATURE_VERSION}"
+        if fast:
+            version += (
+                f"-fast-{settings.EMOTION_FAST_MIN_SECONDS:g}-{settings.EMOTION_FAST_WINDOW_SECONDS:g}"
+                f"x{settings.EMOTION_FAST_MAX_WINDOWS}@{settings.EMOTION_FAST_SAMPLE_RATE}"
+            )
+        return f"{version}:{content_key(audio_data)}"
+    
+    async def _extract_attributes(self, audio_data: bytes, filename: str, fast: bool = False) -> Dict[str, float]:
+        """
+        Get the emotional attributes of one clip, from the cache when the same audio was seen recently.
+        
+        Args:
+            audio_data: Binary audio data
+            filename: Original filename (for extension detection)
+            fast: Analyse a strided sample of long audio instead of all of it
+        
+        Returns:
+            Dictionary of the 4 acoustic attributes used for classification
+        
+        Raises:
+            Exception: If decoding or feature extraction fails
+        """
+        if not settings.EMOTION_CACHE_ENABLED:
+            return await self._compute_attributes(audio_data, filename, fast)
+        
+        key = self._cache_key(audio_data, fast)
+        attributes = await self.cache.get(key)
+        if attributes is not None:
+            logger.info(f"[EMOTION_CACHE] Hit for {filename} ({len(audio_data)} bytes), skipping feature extraction")
+            return attributes
+        
+        attributes = await self._compute_attributes(audio_data, filename, fast)
+        await self.cache.set(key, attributes)
+        return attributes
+    
+    async def _compute_attributes(self, audio_data: bytes, filename: str, fast: bool = False) -> Dict[str, float]:
+        """
+        Run the feature engine on one clip and reduce the features to emotional attributes.
+        
+        Args:
+            audio_data: Binary audio data
+            filename: Original filename (for extension detection)
+            fast: Analyse a strided sample of long audio instead of all of it
+        
+        Returns:
+            Dictionary of the 4 acoustic attributes used for classification
+        
+        Raises:
+            Exception: If decoding or feature extraction fails
+        """
+        # Decode once to a 16kHz mono float32 signal and extract in memory;
+        # the temp file path is only used when in-memory decoding fails
+        try:
+            source_format = Path(filename).suffix.lstrip(".").lower() or "wav"
+            signal, sampling_rate = await decode_to_float32(audio_data, source_format=source_format)
+        except Exception as e:
+            if not self.opensmile_available:
+                raise
+            logger.warning(f"[OPENSMILE] In-memory decoding failed ({e}), falling back to temp file")
+            features = await self._process_temp_file(audio_data, filename)
+        else:
+            if fast:
+                original_seconds = signal.size / sampling_rate
+                signal, sampling_rate = approximate_signal(signal, sampling_rate)
+                if signal.size / sampling_rate < original_seconds:
+                    logger.info(
+                        f"[FAST_MODE] Analysing {signal.size / sampling_rate:.1f}s of {original_seconds:.1f}s "
+                        f"@ {sampling_rate} Hz"
+                    )
+            
+            if not self.opensmile_available:
+                logger.info(f"[NUMPY_FEATURES] Extracting pitch and loudness from {signal.size / sampling_rate:.2f}s @ {sampling_rate} Hz")
+                attributes = await asyncio.to_thread(extract_attributes, signal, sampling_rate)
+                logger.info(f"[NUMPY_FEATURES] Extracted attributes: {attributes}")
+                return attributes
+            
+            logger.info(f"[OPENSMILE] Calling OpenSmile.process_signal() in worker pool - REAL MODEL EXTRACTION")
+            logger.info(f"[OPENSMILE] Signal: {signal.size / sampling_rate:.2f}s @ {sampling_rate} Hz")
+            features = await self._run_in_pool(worker.process_signal, signal, sampling_rate)
+        
+        logger.info(f"[OPENSMILE] ✓ Feature extraction completed")
+        logger.info(f"[OPENSMILE] Features shape: {features.shape if features is not None else 'None'}")
+        
+        if features is None or features.empty:
+            raise ValueError("OpenSmile returned empty features")
+        
+        # Extract key emotional attributes
+        logger.info(f"[PROCESSING] Extracting emotional attributes from OpenSmile features")
+        attributes = self._extract_emotional_attributes(features)
+        logger.info(f"[PROCESSING] Extracted attributes: {attributes}")
+        return attributes
+    
+    async def detect_emotion_batch(self, clips: List[Tuple[bytes, str]], fast: Optional[bool] = None) -> List[Dict]:
+        """
+        Detect emotion for many clips at batch throughput.
+        
+        Features for all clips are extracted concurrently across the worker
+        pool, then every clip is classified in one vectorized pass that gives
+        the same labels as _classify_emotion.
+        
+        Args:
+            clips: List of (audio_data, filename) pairs
+            fast: Approximate mode for long clips; defaults to EMOTION_FAST_MODE
+        
+        Returns:
+            List of dictionaries with 'emotion' and 'attributes' keys, in input order
+        """
+        logger.info(f"[DETECT_EMOTION] Batch of {len(clips)} clips ({self.feature_engine} features)")
+        
+        fast = settings.EMOTION_FAST_MODE if fast is None else fast
+        extracted = await asyncio.gather(
+            *(self._extract_attributes(audio_data, filename, fast) for audio_data, filename in clips),
+            return_exceptions=True,
+        )
+        
+        succeeded = [i for i, item in enumerate(extracted) if not isinstance(item, Exception)]
+        labels = classify_batch(attributes_to_matrix([extracted[i] for i in succeeded]))
+        
+        results = [None] * len(clips)
+        for i, emotion in zip(succeeded, labels):
+            results[i] = {"emotion": emotion, "attributes": extracted[i]}
+        for i, item in enumerate(extracted):
+            if isinstance(item, Exception):
+                # Same neutral fallback as detect_emotion for clips that fail to process
+                logger.warning(f"[DETECT_EMOTION] Clip {i} ({clips[i][1]}) failed, using neutral: {item}")
+                results[i] = {
+                    "emotion": "neutral",
+                    "attributes": dict(NEUTRAL_ATTRIBUTES),
+                }
+        
+        logger.info(f"[DETECT_EMOTION] Batch done: {len(succeeded)}/{len(clips)} clips extracted")
+        return results
+    
+    async def track_chunk(self, session_id: str, chunk_index: int, audio_data: bytes, filename: str = "audio.wav") -> Dict:
+        """
+        Label one chunk of a live session and update the session's emotion timeline.
+        
+        Frame-level pitch and loudness are extracted once for the chunk; the chunk
+        label comes from their statistics and the session label from running
+        aggregates over every chunk so far, so earlier chunks are never reprocessed.
+        A retried chunk index gets its stored entry back before anything is
+        decoded, and new chunks go through the result cache.
+        
+        Args:
+            session_id: Stream session the chunk belongs to
+            chunk_index: Index of the chunk in the session (a repeated index is not counted twice)
+            audio_data: Binary audio data of the chunk
+            filename: Original filename (for extension detection)
+        
+        Returns:
+            Dictionary with 'emotion' and 'attributes' of the chunk, plus
+            'session_emotion', 'session_attributes' and the chunk's
+            'timeline_entry' (None if the chunk failed); the whole timeline
+            is served by GET /api/emotion/timeline/{session_id}
+        """
+        session = self.timelines.get_or_create(session_id)
+        entry = session.chunks.get(chunk_index)
+        if entry is not None:
+            logger.info(f"[EMOTION_TIMELINE] Session {session_id} chunk {chunk_index} already tracked, skipping extraction")
+        else:
+            try:
+                frames = await self._extract_frame_stats(audio_data, filename)
+            except Exception as e:
+                logger.error(f"[EMOTION_TIMELINE] Chunk {chunk_index} of session {session_id} failed: {e}")
+                return {
+                    "emotion": "neutral",
+                    "attributes": dict(NEUTRAL_ATTRIBUTES),
+                    "session_emotion": session.session_emotion,
+                    "session_attributes": session.attributes(),
+                    "timeline_entry": None,
+                }
+            entry = session.add_chunk_stats(
+                chunk_index,
+                RunningStats.from_list(frames["pitch"]),
+                RunningStats.from_list(frames["loudness"]),
+                frames["seconds"],
+            )
+        
+        logger.info(
+            f"[EMOTION_TIMELINE] Session {session_id} chunk {chunk_index}: {entry['emotion']} "
+            f"(session: {entry['session_emotion']}, {len(session.chunks)} chunks, {session.seconds:.1f}s)"
+        )
+        return {
+            "emotion": entry["emotion"],
+            "attributes": entry["attributes"],
+            "session_emotion": session.session_emotion,
+            "session_attributes": session.attributes(),
+            "timeline_entry": entry,
+        }
+    
+    async def _extract_frame_stats(self, audio_data: bytes, filename: str) -> Dict:
+        """
+        Reduce one chunk to the statistics of its frame-level pitch and loudness.
+        
+        Goes through the result cache like _extract_attributes, so a chunk whose
+        audio was seen recently (in any session) is not decoded or analysed again.
+        
+        Args:
+            audio_data: Binary audio data of the chunk
+            filename: Original filename (for extension detection)
+        
+        Returns:
+            Dictionary with 'pitch' and 'loudness' ([count, mean, m2]) and 'seconds' keys
+        
+        Raises:
+            Exception: If decoding or feature extraction fails
+        """
+        async def compute() -> Dict:
+            source_format = Path(filename).suffix.lstrip(".").lower() or "wav"
+            signal, sampling_rate = await decode_to_float32(audio_data, source_format=source_format)
+            if self.opensmile_available:
+                pitch, loudness = await self._run_in_pool(worker.process_signal_lld, signal, sampling_rate)
+            else:
+                pitch, loudness = await asyncio.to_thread(frame_descriptors, signal, sampling_rate)
+            return {
+                "pitch": RunningStats.of(pitch).to_list(),
+                "loudness": RunningStats.of(loudness).to_list(),
+                "seconds": signal.size / sampling_rate,
             }
         
+        if not settings.EMOTION_CACHE_ENABLED:
+            return await compute()
+        return await self.cache.get_or_compute(f"frames-{self._cache_key(audio_data)}", compute)
+    
+    async def _process_temp_file(self, audio_data: bytes, filename: str):
+        """
+        Extract features by letting OpenSmile read the audio from a temporary file.
+        
+        Fallback for audio the in-memory decoder cannot handle.
+        
+        Args:
+            audio_data: Binary audio data
+            filename: Original filename (for extension detection)
+        
+        Returns:
+            OpenSmile features DataFrame
+        """
+        # Save audio to temporary file (OpenSmile supports MP3, WAV, etc.)
+        suffix = Path(filename).suffix.lower() or ".wav"
+        
+        # Create temp file without automatic deletion (Windows compatibility)
+        temp_fd, temp_path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(temp_fd, "wb") as temp_file:
+                temp_file.write(audio_data)
+            
+            if len(audio_data) == 0:
+                raise ValueError(f"Temporary file is empty: {temp_path}")
+            
+            logger.info(f"[OPENSMILE] Processing audio file: {temp_path} (size: {len(audio_data)} bytes)")
+            logger.info(f"[OPENSMILE] Calling OpenSmile.process_file() in worker pool - REAL MODEL EXTRACTION")
+            
+            # Extract features using OpenSmile (supports MP3, WAV, FLAC, etc.)
+            return await self._run_in_pool(worker.process_file, temp_path)
+        
         finally:
             # Clean up temporary file
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                    logger.debug(f"Cleaned up temp file: {temp_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete temp file {temp_path}: {e}")
+            try:
+                os.unlink(temp_path)
+                logger.debug(f"Cleaned up temp file: {temp_path}")
+            except Exception as e:
+                logger.warning(f"Failed to delete temp file {temp_path}: {e}")
     
     def _extract_emotional_attributes(self, features) -> Dict[str, float]:
         """
@@ -351,38 +629,6 @@ class EmotionDetectionService:
 
         logger.info("=" * 80)
         return detected_emotion
-    
-    async def _mock_emotion_detection(self, audio_data: bytes) -> Dict:
-        """
-        Mock emotion detection when OpenSmile is not available.
-        
-        Args:
-            audio_data: Binary audio data
-        
-        Returns:
-            Mock emotion data
-        """
-        import hashlib
-        
-        # Use audio hash to generate consistent mock data
-        audio_hash = hashlib.md5(audio_data).hexdigest()
-        hash_val = int(audio_hash[:8], 16) / (16**8)
-        
-        emotions = ["happy", "sad", "angry", "neutral", "surprised"]
-        emotion_idx = int(hash_val * len(emotions))
-        emotion = emotions[emotion_idx]
-        
-        logger.warning(f"⚠ MOCK DETECTION USED (not real model): {emotion}")
-        logger.warning(f"⚠ Install OpenSmile to use real emotion detection")
-        
-        return {
-            "emotion": emotion,
-            "attributes": {
-                "pitch_mean": 0.5 + (hash_val - 0.5) * 0.3,
-                "energy": 0.5 + (hash_val - 0.5) * 0.4,
-                "speaking_rate": 0.5,
-            },
-        }
 
 
 # Global service instance
@@ -0,0 +1,203 @@
+"""
+Incremental per-session emotion timeline.
+
+Each chunk of a live session is reduced to frame-level F0 and loudness
+descriptors once. The chunk's own statistics give its label, and they are
+merged into running per-session aggregates (Welford / Chan et al. parallel
+update of count, mean and sum of squared deviations), so the session label
+is updated without revisiting earlier chunks.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.modules.emotion_detection.classifier import attributes_to_matrix, classify_batch
+
+logger = logging.getLogger(__name__)
+
+
+class RunningStats:
+    """Count, mean and sum of squared deviations, mergeable in any order."""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, values: np.ndarray):
+        """Merge a batch of values."""
+        if values.size:
+            batch_mean = float(values.mean())
+            self.merge(values.size, batch_mean, float(np.square(values - batch_mean).sum()))
+
+    def merge(self, count: int, mean: float, m2: float):
+        """Merge the statistics of another sample."""
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def merge_stats(self, other: "RunningStats"):
+        self.merge(other.count, other.mean, other.m2)
+
+    @classmethod
+    def of(cls, values: np.ndarray) -> "RunningStats":
+        stats = cls()
+        stats.add(values)
+        return stats
+
+    def to_list(self) -> List[float]:
+        """[count, mean, m2], JSON-serialisable for the result cache."""
+        return [self.count, self.mean, self.m2]
+
+    @classmethod
+    def from_list(cls, values: List[float]) -> "RunningStats":
+        stats = cls()
+        stats.merge(int(values[0]), values[1], values[2])
+        return stats
+
+    def mean_and_cv(self):
+        """Arithmetic mean and normalised (population) standard deviation, 0 when empty."""
+        if not self.count:
+            return 0.0, 0.0
+        std = math.sqrt(max(self.m2, 0.0) / self.count)
+        return self.mean, std / self.mean if self.mean else 0.0
+
+
+def _attributes(pitch: RunningStats, loudness: RunningStats) -> Dict[str, float]:
+    pitch_mean, pitch_std = pitch.mean_and_cv()
+    loudness_mean, loudness_std = loudness.mean_and_cv()
+    return {
+        "pitch_mean": pitch_mean,
+        "pitch_std": pitch_std,
+        "loudness_mean": loudness_mean,
+        "loudness_std": loudness_std,
+    }
+
+
+class SessionTimeline:
+    """Running aggregates and per-chunk results of one session."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.pitch = RunningStats()
+        self.loudness = RunningStats()
+        self.seconds = 0.0
+        self.chunks: Dict[int, Dict] = {}
+        self.session_emotion = "neutral"
+        self.last_used = time.monotonic()
+
+    def add_chunk(self, chunk_index: int, pitch: np.ndarray, loudness: np.ndarray, seconds: float) -> Dict:
+        """
+        Label one chunk and fold it into the session aggregates.
+
+        A chunk index that was already added (a retried upload) is not counted twice.
+
+        Args:
+            chunk_index: Index of the chunk in the session
+            pitch: F0 semitones of the chunk's voiced frames
+            loudness: Loudness of every frame of the chunk
+            seconds: Chunk duration
+
+        Returns:
+            The chunk's timeline entry
+        """
+        return self.add_chunk_stats(chunk_index, RunningStats.of(pitch), RunningStats.of(loudness), seconds)
+
+    def add_chunk_stats(
+        self,
+        chunk_index: int,
+        chunk_pitch: RunningStats,
+        chunk_loudness: RunningStats,
+        seconds: float,
+    ) -> Dict:
+        """Same as add_chunk, from the chunk's already reduced frame statistics."""
+        self.last_used = time.monotonic()
+        if chunk_index in self.chunks:
+            return self.chunks[chunk_index]
+
+        self.pitch.merge_stats(chunk_pitch)
+        self.loudness.merge_stats(chunk_loudness)
+        self.seconds += seconds
+
+        chunk_attributes = _attributes(chunk_pitch, chunk_loudness)
+        session_attributes = self.attributes()
+        # Chunk and session labels in one vectorized pass
+        chunk_emotion, self.session_emotion = classify_batch(
+            attributes_to_matrix([chunk_attributes, session_attributes])
+        )
+
+        entry = {
+            "chunk_index": chunk_index,
+            "duration_seconds": round(seconds, 3),
+            "emotion": chunk_emotion,
+            "attributes": chunk_attributes,
+            "session_emotion": self.session_emotion,
+        }
+        self.chunks[chunk_index] = entry
+        return entry
+
+    def attributes(self) -> Dict[str, float]:
+        """The four attributes over every frame of the session so far."""
+        return _attributes(self.pitch, self.loudness)
+
+    def timeline(self) -> List[Dict]:
+        """Chunk entries in chunk order."""
+        return [self.chunks[index] for index in sorted(self.chunks)]
+
+    def summary(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "emotion": self.session_emotion,
+            "attributes": self.attributes(),
+            "chunks": len(self.chunks),
+            "seconds": round(self.seconds, 3),
+            "timeline": self.timeline(),
+        }
+
+
+class EmotionTimelineStore:
+    """SessionTimeline per session_id with idle timeout and LRU eviction."""
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, SessionTimeline]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self):
+        """Drop idle sessions, then the least recently used ones beyond the session limit."""
+        now = time.monotonic()
+        for session_id in [
+            session_id for session_id, session in self._sessions.items()
+            if now - session.last_used > settings.EMOTION_TIMELINE_IDLE_TIMEOUT_SECONDS
+        ]:
+            del self._sessions[session_id]
+        while len(self._sessions) > settings.EMOTION_TIMELINE_MAX_SESSIONS:
+            session_id, session = self._sessions.popitem(last=False)
+            logger.info(f"[EMOTION_TIMELINE] Evicting session {session_id} after {len(session.chunks)} chunks")
+
+    def get(self, session_id: str) -> Optional[SessionTimeline]:
+        self._evict()
+        return self._sessions.get(session_id)
+
+    def get_or_create(self, session_id: str) -> SessionTimeline:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = SessionTimeline(session_id)
+        self._sessions.move_to_end(session_id)
+        self._evict()
+        return session
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
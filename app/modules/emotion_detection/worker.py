@@ -0,0 +1,121 @@
+"""
+OpenSmile worker process functions.
+
+Executed inside the emotion detection ProcessPoolExecutor: each worker
+builds its opensmile.Smile once in `init_worker` and reuses it for every
+extraction, so requests never pay the Smile construction cost.
+"""
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# OpenSmile configurations shipped with the emotion module
+CONFIG_DIR = Path(__file__).parent / "config"
+CUSTOM_FEATURE_SETS = {
+    "emotion_minimal": CONFIG_DIR / "emotion_minimal.conf",  # Only the 4 functionals we classify on
+}
+
+# Per-process Smile instances: functionals (created by init_worker) and
+# frame-level descriptors (created on first use)
+_smile = None
+_smile_lld = None
+
+
+def resolve_feature_set(feature_set: str):
+    """
+    Map an OPENSMILE_CONFIG value to something opensmile.Smile accepts.
+
+    Args:
+        feature_set: A shipped config name (emotion_minimal), a path to a
+            .conf file, or an opensmile.FeatureSet member name (eGeMAPSv02)
+
+    Returns:
+        Config file path or opensmile.FeatureSet member
+    """
+    import opensmile
+
+    if feature_set in CUSTOM_FEATURE_SETS:
+        return str(CUSTOM_FEATURE_SETS[feature_set])
+    if feature_set.endswith(".conf"):
+        return feature_set
+    return getattr(opensmile.FeatureSet, feature_set)
+
+
+def build_smile(feature_set: str):
+    """Create a Smile extractor producing functionals for the given OPENSMILE_CONFIG value."""
+    import opensmile
+
+    return opensmile.Smile(
+        feature_set=resolve_feature_set(feature_set),
+        feature_level=opensmile.FeatureLevel.Functionals,
+    )
+
+
+def init_worker(feature_set: str):
+    """
+    Pool initializer: build this process's Smile extractor.
+
+    Args:
+        feature_set: OPENSMILE_CONFIG value (see resolve_feature_set)
+    """
+    global _smile
+    _smile = build_smile(feature_set)
+    logger.info(f"[OPENSMILE] Worker {os.getpid()} ready ({feature_set})")
+
+
+def ping() -> int:
+    """No-op task used to start and initialise every worker ahead of the first request."""
+    return os.getpid()
+
+
+def process_signal(signal, sampling_rate: int):
+    """
+    Extract functionals from an in-memory signal.
+
+    Args:
+        signal: Mono float32 samples in [-1, 1]
+        sampling_rate: Sample rate of `signal`
+
+    Returns:
+        OpenSmile features DataFrame (one row)
+    """
+    return _smile.process_signal(signal, sampling_rate)
+
+
+def process_file(path: str):
+    """
+    Extract functionals from an audio file.
+
+    Args:
+        path: Path of the audio file
+
+    Returns:
+        OpenSmile features DataFrame (one row)
+    """
+    return _smile.process_file(path)
+
+
+def process_signal_lld(signal, sampling_rate: int):
+    """
+    Extract the frame-level F0 and loudness descriptors (eGeMAPSv02 LLDs).
+
+    Args:
+        signal: Mono float32 samples in [-1, 1]
+        sampling_rate: Sample rate of `signal`
+
+    Returns:
+        Tuple of (F0 semitones of voiced frames, loudness of every frame) as float64 arrays
+    """
+    global _smile_lld
+    if _smile_lld is None:
+        import opensmile
+
+        _smile_lld = opensmile.Smile(
+            feature_set=opensmile.FeatureSet.eGeMAPSv02,
+            feature_level=opensmile.FeatureLevel.LowLevelDescriptors,
+        )
+    descriptors = _smile_lld.process_signal(signal, sampling_rate)
+    f0 = descriptors["F0semitoneFrom27.5Hz_sma3nz"].to_numpy(dtype="float64")
+    return f0[f0 > 0], descriptors["Loudness_sma3"].to_numpy(dtype="float64")
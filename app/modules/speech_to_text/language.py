@@ -0,0 +1,100 @@
+"""
+Per-session language stickiness for pre-recorded transcription.
+
+Language detection adds latency to every request and can flip between
+chunks of one recording. Once the first STT_LANGUAGE_LOCK_CHUNKS chunks of a
+session are confidently detected as the same language, that language is
+sent explicitly for the session's later chunks. A low-confidence transcript
+in the locked language unlocks it, so the next chunk is detected again.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLanguage:
+    """Detection streak and locked language of one session."""
+
+    __slots__ = ("candidate", "streak", "locked", "last_used")
+
+    def __init__(self):
+        self.candidate: Optional[str] = None
+        self.streak = 0
+        self.locked: Optional[str] = None
+        self.last_used = time.monotonic()
+
+
+class SessionLanguageStore:
+    """SessionLanguage per session_id with idle timeout and LRU eviction."""
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, SessionLanguage]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self):
+        """Drop idle sessions, then the least recently used ones beyond the session limit."""
+        now = time.monotonic()
+        for session_id in [
+            session_id for session_id, state in self._sessions.items()
+            if now - state.last_used > settings.STT_LANGUAGE_IDLE_TIMEOUT_SECONDS
+        ]:
+            del self._sessions[session_id]
+        while len(self._sessions) > settings.STT_LANGUAGE_MAX_SESSIONS:
+            self._sessions.popitem(last=False)
+
+    def locked_language(self, session_id: Optional[str]) -> Optional[str]:
+        """Language to send explicitly for a session's next chunk, or None to detect it."""
+        if not session_id or settings.STT_LANGUAGE_LOCK_CHUNKS <= 0:
+            return None
+        self._evict()
+        state = self._sessions.get(session_id)
+        return state.locked if state is not None else None
+
+    def observe(self, session_id: Optional[str], language_code: str, confidence: float, detected: bool):
+        """
+        Record the outcome of one chunk.
+
+        Args:
+            session_id: Session the chunk belongs to (nothing is recorded without one)
+            language_code: Language of the transcript
+            confidence: Language confidence when detected, transcript confidence when sent explicitly
+            detected: Whether the language was detected rather than sent explicitly
+        """
+        if not session_id or settings.STT_LANGUAGE_LOCK_CHUNKS <= 0:
+            return
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = SessionLanguage()
+        self._sessions.move_to_end(session_id)
+        state.last_used = time.monotonic()
+        confident = confidence >= settings.STT_LANGUAGE_MIN_CONFIDENCE
+
+        if not detected:
+            if not confident:
+                logger.info(
+                    f"[DEEPGRAM] Low confidence ({confidence:.2f}) in locked language {state.locked} "
+                    f"for session {session_id}, detecting again"
+                )
+                state.locked, state.candidate, state.streak = None, None, 0
+        elif not confident:
+            state.streak = 0
+        elif language_code == state.candidate:
+            state.streak += 1
+        else:
+            state.candidate, state.streak = language_code, 1
+
+        if detected and state.streak >= settings.STT_LANGUAGE_LOCK_CHUNKS:
+            state.locked = state.candidate
+            logger.info(f"[DEEPGRAM] Session {session_id} language locked to {state.locked} after {state.streak} chunks")
+
+        self._evict()
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
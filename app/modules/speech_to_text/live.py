@@ -0,0 +1,352 @@
+"""
+Deepgram live-streaming transcription for chunked sessions.
+
+Each session keeps one websocket to Deepgram's live endpoint. Chunks are
+pushed as raw 16kHz PCM as they arrive, so the connection (and the model's
+context) carries over between chunks instead of every chunk being an
+independent pre-recorded request. After each chunk a Finalize message
+flushes the audio sent so far, which gives one final transcript per chunk;
+interim hypotheses received meanwhile are returned alongside it.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from app.core.audio_utils import TARGET_SAMPLE_RATE
+from app.core.config import settings
+from app.core.upstream_guard import UpstreamUnavailableError, get_upstream_guard
+
+logger = logging.getLogger(__name__)
+
+# Audio is sent in 250 ms messages (Deepgram recommends 20-250 ms buffers)
+FRAME_BYTES = TARGET_SAMPLE_RATE * 2 // 4
+
+# Results of the last few chunks per session, returned again when a client retries one
+REPLAY_CHUNKS = 4
+
+LANGUAGE_NAMES = {
+    "en": "English",
+    "es": "Spanish",
+}
+
+
+def live_params() -> Dict[str, str]:
+    """Query parameters of the live websocket: raw 16kHz mono PCM in, interim and final results out."""
+    return {
+        "encoding": "linear16",
+        "sample_rate": str(TARGET_SAMPLE_RATE),
+        "channels": "1",
+        "model": "nova-2",
+        "language": settings.DEEPGRAM_LIVE_LANGUAGE,
+        "smart_format": "true",
+        "punctuate": "true",
+        "interim_results": "true",
+    }
+
+
+def _result_language(alternative: Dict) -> Optional[str]:
+    """Language of a Results alternative: the one most of its words are in, else the first listed."""
+    votes = Counter(word["language"][:2].lower() for word in alternative.get("words", []) if word.get("language"))
+    if votes:
+        return votes.most_common(1)[0][0]
+    languages = alternative.get("languages") or []
+    return languages[0][:2].lower() if languages else None
+
+
+class ChunkAlreadySentError(Exception):
+    """A retried chunk was already pushed to the stream and its result is no longer kept."""
+
+
+class LiveTranscriber:
+    """One Deepgram live websocket transcribing a single session."""
+
+    def __init__(self, session_id: str, api_key: str, url: str):
+        self.session_id = session_id
+        self.api_key = api_key
+        self.url = url
+        self.last_used = time.monotonic()
+        self.chunks_sent = 0
+        self.last_index: Optional[int] = None  # Highest chunk_index pushed to the stream
+        self.language_code: Optional[str] = None  # Kept across chunks without detected language
+        self._connection = None
+        self._reader: Optional[asyncio.Task] = None
+        self._keepalive: Optional[asyncio.Task] = None
+        self._finals: List[Dict] = []  # Final results not handed out yet
+        self._interim: List[str] = []
+        self._flushed = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._replay: "OrderedDict[int, Dict]" = OrderedDict()  # chunk_index -> result
+
+    @property
+    def is_alive(self) -> bool:
+        return self._reader is not None and not self._reader.done()
+
+    async def start(self):
+        """Open the websocket and the tasks that read results and keep the stream alive."""
+        # Imported on first use so importing the app does not load the websocket client
+        from websockets.asyncio.client import connect
+
+        self._connection = await connect(
+            f"{self.url}?{urlencode(live_params())}",
+            additional_headers={"Authorization": f"Token {self.api_key}"},
+            compression=None,  # PCM does not deflate well, skip the CPU cost
+        )
+        self._reader = asyncio.create_task(self._read_results())
+        self._keepalive = asyncio.create_task(self._keep_alive())
+        logger.info(f"[DEEPGRAM_LIVE] Opened stream for session {self.session_id}")
+
+    async def _read_results(self):
+        try:
+            async for message in self._connection:
+                data = json.loads(message)
+                if data.get("type") != "Results":
+                    continue
+                alternative = (data.get("channel", {}).get("alternatives") or [{}])[0]
+                transcript = alternative.get("transcript", "").strip()
+                if data.get("is_final"):
+                    if transcript:
+                        self._finals.append({"text": transcript, "language_code": _result_language(alternative)})
+                    if data.get("from_finalize"):
+                        self._flushed.set()
+                elif transcript:
+                    self._interim.append(transcript)
+        except Exception as e:
+            logger.warning(f"[DEEPGRAM_LIVE] Stream for session {self.session_id} ended: {e}")
+        finally:
+            self._flushed.set()
+
+    async def _keep_alive(self):
+        """Send KeepAlive messages so pauses between chunks do not close the stream."""
+        try:
+            while True:
+                await asyncio.sleep(settings.DEEPGRAM_LIVE_KEEPALIVE_SECONDS)
+                await self._connection.send(json.dumps({"type": "KeepAlive"}))
+        except Exception:
+            pass
+
+    async def transcribe_chunk(self, pcm: bytes, is_final: bool = False, chunk_index: Optional[int] = None) -> Dict:
+        """
+        Push one chunk and collect the transcript of everything sent so far.
+
+        A chunk_index at or below the last one pushed is a client retry: its
+        audio is already in the stream, so the stored result is returned
+        instead of sending the samples a second time.
+
+        Args:
+            pcm: Raw 16kHz mono s16le samples
+            is_final: Close the stream after this chunk (CloseStream instead of Finalize)
+            chunk_index: Position of the chunk in the session, if known
+
+        Returns:
+            Dictionary with 'language', 'language_code', 'text' (final transcript
+            of the chunk) and 'interim' (interim hypotheses, oldest first) keys
+
+        Raises:
+            ChunkAlreadySentError: If the chunk was pushed before and its result is no longer kept
+        """
+        async with self._lock:
+            if chunk_index is not None and self.last_index is not None and chunk_index <= self.last_index:
+                if chunk_index not in self._replay:
+                    raise ChunkAlreadySentError(
+                        f"chunk {chunk_index} was already sent on the stream for session {self.session_id}"
+                    )
+                logger.info(f"[DEEPGRAM_LIVE] Session {self.session_id}: returning the result of retried chunk {chunk_index}")
+                result = self._replay[chunk_index]
+                return {**result, "interim": list(result["interim"])}
+
+            self.last_used = time.monotonic()
+            self._flushed.clear()
+            for start in range(0, len(pcm), FRAME_BYTES):
+                await self._connection.send(pcm[start:start + FRAME_BYTES])
+            await self._connection.send(json.dumps({"type": "CloseStream" if is_final else "Finalize"}))
+
+            # CloseStream is answered with the remaining results and a closed socket
+            done = asyncio.shield(self._reader) if is_final else self._flushed.wait()
+            try:
+                await asyncio.wait_for(done, timeout=settings.DEEPGRAM_LIVE_FINALIZE_TIMEOUT_MS / 1000)
+            except asyncio.TimeoutError:
+                logger.warning(f"[DEEPGRAM_LIVE] No final transcript for session {self.session_id} chunk {self.chunks_sent} in time")
+
+            finals, interim = self._finals, self._interim
+            self._finals, self._interim = [], []
+            self.chunks_sent += 1
+            self.last_used = time.monotonic()
+
+            votes = Counter()
+            for final in finals:
+                if final["language_code"]:
+                    votes[final["language_code"]] += len(final["text"])
+            if votes:
+                self.language_code = votes.most_common(1)[0][0]
+            configured = settings.DEEPGRAM_LIVE_LANGUAGE[:2].lower()
+            language_code = self.language_code or (configured if configured in LANGUAGE_NAMES else "en")
+            result = {
+                "language": LANGUAGE_NAMES.get(language_code, "English"),
+                "language_code": language_code,
+                "text": " ".join(final["text"] for final in finals),
+                "interim": interim,
+            }
+
+            if chunk_index is not None:
+                self.last_index = chunk_index
+                self._replay[chunk_index] = {**result, "interim": list(interim)}
+                while len(self._replay) > REPLAY_CHUNKS:
+                    self._replay.popitem(last=False)
+            return result
+
+    async def close(self):
+        """Close the websocket and stop its tasks."""
+        for task in (self._keepalive, self._reader):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+
+
+class LiveTranscriptionPool:
+    """Keeps one LiveTranscriber per session_id with idle timeout and LRU eviction."""
+
+    def __init__(self, api_key: str, url: str):
+        self.api_key = api_key
+        self.url = url
+        self._sessions: "OrderedDict[str, LiveTranscriber]" = OrderedDict()
+        self._opening: Dict[str, asyncio.Future] = {}  # Streams being connected, outside the lock
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, reserve: int = 0) -> List[LiveTranscriber]:
+        """Forget idle or dead streams, then LRU streams so `reserve` new ones fit. Returns them for closing."""
+        now = time.monotonic()
+        expired = [
+            session_id for session_id, transcriber in self._sessions.items()
+            if now - transcriber.last_used > settings.DEEPGRAM_LIVE_IDLE_TIMEOUT_SECONDS or not transcriber.is_alive
+        ]
+        remaining = [session_id for session_id in self._sessions if session_id not in expired]
+        overflow = len(remaining) + reserve - settings.DEEPGRAM_LIVE_MAX_SESSIONS
+        expired.extend(remaining[:max(0, overflow)])
+        return [self._sessions.pop(session_id) for session_id in expired]
+
+    async def _close(self, transcribers: List[LiveTranscriber]):
+        for transcriber in transcribers:
+            logger.info(
+                f"[DEEPGRAM_LIVE] Closing stream for session {transcriber.session_id} after {transcriber.chunks_sent} chunks"
+            )
+            await transcriber.close()
+
+    async def _get_transcriber(self, session_id: str) -> LiveTranscriber:
+        """
+        Return the session's stream, opening it if needed.
+
+        Only the bookkeeping runs under the pool lock. Connecting (and closing
+        evicted streams) happens outside it, so a slow Deepgram handshake only
+        holds up the chunks of its own session, which wait on its future.
+        """
+        opening = None
+        async with self._lock:
+            evicted = self._evict()
+            transcriber = self._sessions.get(session_id)
+            pending = self._opening.get(session_id)
+            if transcriber is not None:
+                self._sessions.move_to_end(session_id)
+            elif pending is None:
+                evicted += self._evict(reserve=len(self._opening) + 1)
+                opening = pending = self._opening[session_id] = asyncio.get_running_loop().create_future()
+        await self._close(evicted)
+
+        if transcriber is not None:
+            return transcriber
+        if opening is None:
+            return await asyncio.shield(pending)
+
+        transcriber = LiveTranscriber(session_id, self.api_key, self.url)
+        try:
+            async with get_upstream_guard("deepgram").call():
+                await asyncio.wait_for(transcriber.start(), timeout=settings.DEEPGRAM_LIVE_CONNECT_TIMEOUT_SECONDS)
+        except BaseException as error:
+            async with self._lock:
+                del self._opening[session_id]
+            await transcriber.close()
+            if isinstance(error, asyncio.TimeoutError):
+                error = Exception(f"connecting took longer than {settings.DEEPGRAM_LIVE_CONNECT_TIMEOUT_SECONDS:g}s")
+            if not isinstance(error, Exception):
+                opening.cancel()
+                raise
+            opening.set_exception(error)
+            opening.exception()  # Waiters still get it; without waiters it must not be logged as unretrieved
+            raise error
+
+        async with self._lock:
+            del self._opening[session_id]
+            self._sessions[session_id] = transcriber
+        opening.set_result(transcriber)
+        return transcriber
+
+    async def transcribe_chunk(
+        self,
+        session_id: str,
+        pcm: bytes,
+        is_final: bool = False,
+        chunk_index: Optional[int] = None,
+    ) -> Dict:
+        """
+        Transcribe the next chunk of a session over its live stream.
+
+        Opening the stream and each chunk's send/finalize round trip go through
+        the Deepgram upstream guard, so live-stream failures count towards its
+        circuit breaker like pre-recorded requests do.
+
+        Args:
+            session_id: Recording/session identifier
+            pcm: Raw 16kHz mono s16le samples of the chunk
+            is_final: Close the session's stream after this chunk
+            chunk_index: Position of the chunk in the session; retried chunks are not sent again
+
+        Returns:
+            Dictionary with 'language', 'language_code', 'text' and 'interim' keys
+
+        Raises:
+            UpstreamUnavailableError: If Deepgram calls are being rejected by the upstream guard
+            ChunkAlreadySentError: If a retried chunk's result is no longer kept (the stream is left open)
+            Exception: If the stream cannot be opened or fails while sending
+        """
+        transcriber = await self._get_transcriber(session_id)
+        try:
+            async with get_upstream_guard("deepgram").call():
+                result = await transcriber.transcribe_chunk(pcm, is_final=is_final, chunk_index=chunk_index)
+        except (UpstreamUnavailableError, ChunkAlreadySentError):
+            raise
+        except Exception as e:
+            await self.close_session(session_id)
+            raise Exception(f"Deepgram live stream for session {session_id} failed: {e}")
+
+        if is_final or not transcriber.is_alive:
+            await self.close_session(session_id)
+
+        logger.info(
+            f"[DEEPGRAM_LIVE] Session {session_id}: {len(pcm) / (2 * TARGET_SAMPLE_RATE):.2f}s -> "
+            f"{len(result['text'])} chars final, {len(result['interim'])} interim ({result['language_code']})"
+        )
+        return result
+
+    async def close_session(self, session_id: str):
+        """Close and forget a session's stream."""
+        async with self._lock:
+            transcriber = self._sessions.pop(session_id, None)
+        if transcriber is not None:
+            await transcriber.close()
+
+    async def close_all(self):
+        """Close every stream (application shutdown)."""
+        async with self._lock:
+            transcribers = list(self._sessions.values())
+            self._sessions.clear()
+        for transcriber in transcribers:
+            await transcriber.close()
+        if transcribers:
+            logger.info(f"[DEEPGRAM_LIVE] Closed {len(transcribers)} streams")
@@ -0,0 +1,139 @@
+"""
+Local Deepgram-compatible live transcription server.
+
+Speaks the part of Deepgram's live protocol that LiveTranscriber uses, so
+streaming STT can be developed and tested offline: binary linear16 audio,
+KeepAlive / Finalize / CloseStream control messages, and Results messages
+with interim and final transcripts. Transcripts come from a pluggable
+function of the audio (by default a description of its duration); no
+speech model is involved.
+
+Usage (from the repository root):
+    python -m app.modules.speech_to_text.live_standin --port 8765
+    DEEPGRAM_LIVE_URL=ws://127.0.0.1:8765/v1/listen STT_STREAMING_ENABLED=true uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# (pcm, sample_rate) -> (transcript, language code)
+TranscribeFunction = Callable[[bytes, int], Tuple[str, str]]
+
+
+def describe_audio(pcm: bytes, sample_rate: int) -> Tuple[str, str]:
+    """Default transcript: the duration of the audio, in English."""
+    return f"{len(pcm) / (2 * sample_rate):.1f} seconds of audio", "en"
+
+
+class DeepgramStandin:
+    """Websocket server emulating Deepgram's live endpoint."""
+
+    def __init__(self, transcribe: Optional[TranscribeFunction] = None, interim_seconds: float = 0.5):
+        """
+        Args:
+            transcribe: Transcript function for the audio of each final result
+            interim_seconds: Audio received between interim results
+        """
+        self.transcribe = transcribe or describe_audio
+        self.interim_seconds = interim_seconds
+        self.connections: List[Dict] = []  # Query parameters and headers of every accepted connection
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Start listening.
+
+        Returns:
+            Websocket URL to use as DEEPGRAM_LIVE_URL
+        """
+        from websockets.asyncio.server import serve
+
+        self._server = await serve(self._handle, host, port, compression=None)
+        port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"[DEEPGRAM_STANDIN] Listening on ws://{host}:{port}/v1/listen")
+        return f"ws://{host}:{port}/v1/listen"
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _results(self, pcm: bytes, start: float, sample_rate: int, is_final: bool, from_finalize: bool = False) -> str:
+        transcript, language = self.transcribe(pcm, sample_rate) if pcm else ("", "")
+        return json.dumps({
+            "type": "Results",
+            "channel_index": [0, 1],
+            "start": start,
+            "duration": len(pcm) / (2 * sample_rate),
+            "is_final": is_final,
+            "speech_final": is_final,
+            "from_finalize": from_finalize,
+            "channel": {
+                "alternatives": [{
+                    "transcript": transcript,
+                    "confidence": 0.99,
+                    "words": [{"word": word, "language": language} for word in transcript.split()],
+                }]
+            },
+        })
+
+    async def _handle(self, connection):
+        headers = connection.request.headers
+        if not headers.get("Authorization", "").startswith("Token "):
+            await connection.close(code=1008, reason="Missing Authorization token")
+            return
+
+        params = dict(parse_qsl(urlsplit(connection.request.path).query))
+        self.connections.append({"params": params, "authorization": headers["Authorization"]})
+        sample_rate = int(params.get("sample_rate", 16000))
+        interim_bytes = max(2, int(self.interim_seconds * sample_rate) * 2)
+        pending = bytearray()  # Audio since the last final result
+        offset = 0.0
+        since_interim = 0
+
+        async for message in connection:
+            if isinstance(message, bytes):
+                pending.extend(message)
+                since_interim += len(message)
+                if params.get("interim_results") == "true" and since_interim >= interim_bytes:
+                    since_interim = 0
+                    await connection.send(self._results(bytes(pending), offset, sample_rate, is_final=False))
+                continue
+
+            kind = json.loads(message).get("type")
+            if kind not in ("Finalize", "CloseStream"):
+                continue  # KeepAlive
+            await connection.send(
+                self._results(bytes(pending), offset, sample_rate, is_final=True, from_finalize=kind == "Finalize")
+            )
+            offset += len(pending) / (2 * sample_rate)
+            pending.clear()
+            since_interim = 0
+            if kind == "CloseStream":
+                await connection.send(json.dumps({"type": "Metadata", "duration": offset, "channels": 1}))
+                await connection.close()
+                return
+
+
+async def _serve(host: str, port: int):
+    standin = DeepgramStandin()
+    print(f"Deepgram stand-in: {await standin.start(host, port)}")
+    await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 """
 Router for speech-to-text endpoints.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
 from pydantic import BaseModel
+from app.core.config import settings
 from app.modules.speech_to_text.service import speech_to_text_service
-from app.core.utils import validate_audio_file
+from app.core.utils import iter_upload, validate_audio_file
 
 router = APIRouter(prefix="/speech-to-text", tags=["Speech-to-Text"])
 
@@ -31,17 +32,51 @@ async def transcribe(audio: UploadFile = File(...)):
         # Validate audio file
         validate_audio_file(audio)
         
-        # Read audio data
-        audio_data = await audio.read()
-        
-        # Transcribe
-        result = await speech_to_text_service.transcribe_audio(
-            audio_data,
-            mimetype=audio.content_type or "audio/wav"
+        # Transcribe without materialising the upload: 16kHz mono WAV is piped
+        # to Deepgram, long recordings are split into concurrent segments
+        result = await speech_to_text_service.transcribe_upload(
+            iter_upload(audio),
+            mimetype=audio.content_type or "audio/wav",
+            size=audio.size,
         )
         
         return result
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/transcribe-raw", response_model=TranscriptionResponse)
+async def transcribe_raw(request: Request):
+    """
+    Transcribe audio sent as the raw request body (e.g. Content-Type: audio/wav).
+    
+    Unlike multipart uploads, which are fully received before the endpoint
+    runs, a raw 16kHz mono WAV body is forwarded to Deepgram while the client
+    is still uploading it.
+    
+    Args:
+        request: Request whose body is the audio
+    
+    Returns:
+        Transcription with detected language
+    """
+    content_length = request.headers.get("content-length")
+    size = int(content_length) if content_length else None
+    if size is not None and size > settings.MAX_AUDIO_SIZE_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"Audio larger than {settings.MAX_AUDIO_SIZE_MB} MB")
+    
+    try:
+        return await speech_to_text_service.transcribe_upload(
+            request.stream(),
+            mimetype=request.headers.get("content-type") or "audio/wav",
+            size=size,
+        )
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -6,9 +6,19 @@ import logging
 import httpx
 import httpcore
 import asyncio
-from typing import Dict
+import numpy as np
+from collections import Counter
+from typing import AsyncIterator, Dict, Optional, Union
 from app.core.config import settings
-from app.core.audio_utils import convert_to_wav
+from app.core.hedging import get_hedger
+from app.core.retry import get_retry_policy
+from app.core.upstream_guard import UpstreamUnavailableError, get_upstream_guard
+from app.core.audio_headers import HEADER_SCAN_BYTES, declared_wav_data_size
+from app.core.audio_utils import OUTPUT_FORMATS, TARGET_SAMPLE_RATE, convert_audio, convert_to_wav_async, encode_wav, is_target_wav, parse_wav_header
+from app.core.utils import limit_upload
+from app.core.vad import split_at_silence
+from app.modules.speech_to_text.language import SessionLanguageStore
+from app.modules.speech_to_text.live import LiveTranscriptionPool
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +30,11 @@ class SpeechToTextService:
         self.api_key = settings.DEEPGRAM_API_KEY
         self.base_url = settings.DEEPGRAM_API_URL
         self._client = None
+        self.live_sessions = LiveTranscriptionPool(self.api_key, settings.DEEPGRAM_LIVE_URL)  # STT_STREAMING_ENABLED
+        self.session_languages = SessionLanguageStore()  # Confirmed language per chunked session
+        self.guard = get_upstream_guard("deepgram")
+        self.retry = get_retry_policy("deepgram")
+        self.hedger = get_hedger("deepgram")  # STT_HEDGING_ENABLED
     
     async def _get_client(self):
         """Get or create reusable HTTP client with optimized settings."""
@@ -38,13 +53,22 @@ class SpeechToTextService:
             self._client = None
         logger.info("HTTP client reset due to connection error")
     
-    async def transcribe_audio(self, audio_data: bytes, mimetype: str = "audio/wav") -> Dict[str, str]:
+    async def transcribe_audio(
+        self,
+        audio_data: bytes,
+        mimetype: str = "audio/wav",
+        session_id: Optional[str] = None,
+    ) -> Dict[str, str]:
         """
         Transcribe audio to text with language detection.
         
+        Chunks of a session whose language has been confirmed (see
+        SessionLanguageStore) are sent with that language instead of detection.
+        
         Args:
             audio_data: Binary audio data
             mimetype: MIME type of the audio file
+            session_id: Chunked session the audio belongs to, if any
         
         Returns:
             Dictionary with 'language' and 'text' keys
@@ -52,48 +76,130 @@ class SpeechToTextService:
         Raises:
             Exception: If transcription fails
         """
-        max_retries = 3
-        retry_delay = 1.0  # Initial delay in seconds
+        language = self.session_languages.locked_language(session_id)
+        
+        try:
+            result = await self._transcribe_with_retry(audio_data, mimetype, language=language)
+        except (httpcore.ConnectionNotAvailable, httpcore.RemoteProtocolError) as e:
+            logger.error(f"Connection to Deepgram failed, giving up: {type(e).__name__}")
+            await self._reset_client()
+            raise Exception("Connection to Deepgram failed after retrying. Please try again.")
+        return self._observe_language(result, session_id, language)
+    
+    async def _reset_client_on_connection_error(self, error: BaseException):
+        """Retry hook: drop pooled connections that the upstream has closed."""
+        if isinstance(error, (httpcore.ConnectionNotAvailable, httpcore.RemoteProtocolError, httpx.RemoteProtocolError)):
+            await self._reset_client()
+    
+    def _observe_language(self, result: Dict, session_id: Optional[str], language: Optional[str]) -> Dict[str, str]:
+        """Feed a transcription result to the session language state and strip its confidence."""
+        confidence = result.pop("language_confidence", 0.0)
+        if result["text"].strip():  # Silence says nothing about the language
+            self.session_languages.observe(session_id, result["language_code"], confidence, detected=language is None)
+        return result
+    
+    async def transcribe_upload(
+        self,
+        chunks: AsyncIterator[bytes],
+        mimetype: str = "audio/wav",
+        size: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """
+        Transcribe an upload while it is still being received.
         
-        for attempt in range(max_retries):
+        A 16kHz mono 16-bit WAV that fits in one request (at most
+        STT_SEGMENT_SECONDS, DEEPGRAM_UPLOAD_FORMAT=wav) needs no conversion, so
+        its chunks are piped into the Deepgram request body as they arrive and
+        the upload is never held in memory. Its length is taken from the WAV
+        header, or from `size` for streamed WAVs that leave it unset. Anything
+        else is read whole and goes through transcribe_long. A piped body
+        cannot be replayed, so it is not retried on connection errors.
+        
+        Args:
+            chunks: The upload body, in arrival order
+            mimetype: MIME type of the audio
+            size: Total upload size in bytes, if known
+        
+        Returns:
+            Dictionary with 'language', 'language_code' and 'text' keys
+        
+        Raises:
+            HTTPException: 413 if the upload is larger than MAX_AUDIO_SIZE_MB
+            Exception: If transcription fails
+        """
+        chunks = limit_upload(chunks, settings.MAX_AUDIO_SIZE_MB * 1024 * 1024)
+        head = b""
+        async for chunk in chunks:
+            head += chunk
+            if parse_wav_header(head) is not None or len(head) >= HEADER_SCAN_BYTES:
+                break
+        
+        info = parse_wav_header(head)
+        total = None
+        if is_target_wav(info):
+            data_size = declared_wav_data_size(head, info)
+            total = info.data_offset + data_size if data_size is not None else size
+        if (
+            settings.DEEPGRAM_UPLOAD_FORMAT == "wav"
+            and total is not None
+            and (total - info.data_offset) / (2 * TARGET_SAMPLE_RATE) <= settings.STT_SEGMENT_SECONDS
+        ):
+            async def body():
+                # Stop at the declared end; trailing chunks (e.g. LIST metadata) are not audio
+                remaining = total
+                yield head[:remaining]
+                remaining -= len(head)
+                async for chunk in chunks:
+                    if remaining <= 0:
+                        break
+                    yield chunk[:remaining]
+                    remaining -= len(chunk)
+            
+            logger.info(f"[DEEPGRAM] Piping {total} byte 16kHz mono WAV upload straight to Deepgram")
             try:
-                return await self._transcribe_with_retry(audio_data, mimetype, attempt)
+                result = await self._transcribe_with_retry(body(), "audio/wav", passthrough=True)
             except (httpcore.ConnectionNotAvailable, httpcore.RemoteProtocolError) as e:
-                logger.warning(f"Connection error on attempt {attempt + 1}/{max_retries}: {type(e).__name__}")
-                
-                # Reset client on connection errors
                 await self._reset_client()
-                
-                if attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)  # Exponential backoff
-                    logger.info(f"Retrying in {wait_time:.1f} seconds...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"All {max_retries} attempts failed")
-                    raise Exception(f"Connection to Deepgram failed after {max_retries} attempts. Please try again.")
-            except Exception as e:
-                # For non-connection errors, don't retry
-                raise
+                raise Exception(f"Connection to Deepgram failed while streaming the upload: {type(e).__name__}")
+            return self._observe_language(result, None, None)
+        
+        remaining = [chunk async for chunk in chunks]
+        return await self.transcribe_long(b"".join([head, *remaining]), mimetype)
     
-    async def _transcribe_with_retry(self, audio_data: bytes, mimetype: str, attempt: int) -> Dict[str, str]:
+    async def _transcribe_with_retry(
+        self,
+        audio_data: Union[bytes, AsyncIterator[bytes]],
+        mimetype: str,
+        language: Optional[str] = None,
+        passthrough: bool = False,
+    ) -> Dict[str, str]:
         """
         Internal method to perform the actual transcription.
         
+        The request is retried on transient failures by the shared retry
+        policy and hedged when STT_HEDGING_ENABLED, except a passthrough body,
+        which cannot be sent twice.
+        
         Args:
-            audio_data: Binary audio data
+            audio_data: Binary audio data, or the chunks of a streamed body when passthrough is set
             mimetype: MIME type of the audio file
-            attempt: Current attempt number (for logging)
+            language: Language to transcribe in; detected when None
+            passthrough: Send audio_data as-is (already 16kHz mono WAV), without conversion
         
         Returns:
-            Dictionary with 'language' and 'text' keys
+            Dictionary with 'language', 'language_code', 'text' and
+            'language_confidence' (detection confidence, or transcript
+            confidence when the language was given) keys
         """
         try:
-            # Convert audio to WAV format for Deepgram compatibility
-            # WebM/Opus and other formats may not be directly supported
-            if mimetype not in ["audio/wav", "audio/wave"]:
-                logger.info(f"[DEEPGRAM] Converting {mimetype} to WAV for compatibility")
-                audio_data = convert_to_wav(audio_data, source_format=mimetype)
-                mimetype = "audio/wav"
+            # Convert audio to 16kHz mono in DEEPGRAM_UPLOAD_FORMAT (WAV, FLAC or Ogg/Opus)
+            # WebM/Opus and other formats may not be directly supported.
+            # WAV input is detected from the bytes and skips ffmpeg entirely.
+            if not passthrough:
+                upload_format = settings.DEEPGRAM_UPLOAD_FORMAT
+                logger.info(f"[DEEPGRAM] Preparing {mimetype} audio as 16kHz mono {upload_format.upper()}")
+                audio_data = await convert_audio(audio_data, source_format=mimetype, output_format=upload_format)
+                mimetype = OUTPUT_FORMATS[upload_format]["mimetype"]
             
             headers = {
                 "Authorization": f"Token {self.api_key}",
@@ -102,22 +208,39 @@ class SpeechToTextService:
             
             # Deepgram parameters for language detection and transcription
             params = {
-                "detect_language": "true",
                 "model": "nova-2",  # Fast and accurate model
                 "smart_format": "true",
                 "punctuate": "true",
                 "diarize": "false",  # Disable diarization for speed
                 "utterances": "false",  # Disable utterances for speed
             }
+            if language:
+                params["language"] = language  # Session language already confirmed
+            else:
+                params["detect_language"] = "true"
+            
+            async def send() -> httpx.Response:
+                client = await self._get_client()
+                async with self.guard.call():
+                    response = await client.post(
+                        self.base_url,
+                        headers=headers,
+                        params=params,
+                        content=audio_data,
+                    )
+                    response.raise_for_status()
+                return response
             
-            client = await self._get_client()
-            response = await client.post(
-                self.base_url,
-                headers=headers,
-                params=params,
-                content=audio_data,
+            async def attempt() -> httpx.Response:
+                if passthrough:
+                    return await send()
+                return await self.hedger.run(send, hedge=settings.STT_HEDGING_ENABLED)
+            
+            response = await self.retry.run(
+                attempt,
+                max_attempts=1 if passthrough else None,
+                on_retry=self._reset_client_on_connection_error,
             )
-            response.raise_for_status()
             data = response.json()
             
             # Extract transcription and detected language
@@ -132,8 +255,9 @@ class SpeechToTextService:
                 raise Exception("No transcription alternatives found")
             
             transcript = alternatives[0].get("transcript", "")
-            detected_language = channels[0].get("detected_language", "en")
+            detected_language = language or channels[0].get("detected_language", "en")
             confidence = alternatives[0].get("confidence", 0.0)
+            language_confidence = confidence if language else channels[0].get("language_confidence", confidence)
             
             # Log the raw response for debugging
             logger.debug(f"[DEEPGRAM] Raw transcript: '{transcript}'")
@@ -143,7 +267,8 @@ class SpeechToTextService:
             # Check if transcript is empty
             if not transcript or transcript.strip() == "":
                 logger.warning(f"[DEEPGRAM] Empty transcript returned. Audio may be silent or too short.")
-                logger.warning(f"[DEEPGRAM] Audio size: {len(audio_data)} bytes")
+                if not passthrough:
+                    logger.warning(f"[DEEPGRAM] Audio size: {len(audio_data)} bytes")
                 # Still return the result, let the main handler decide what to do
             
             # Map language codes
@@ -157,7 +282,7 @@ class SpeechToTextService:
             language_name = language_map.get(language_code, "English")
             
             logger.info(f"[DEEPGRAM] Transcription successful")
-            logger.info(f"[DEEPGRAM] Detected language: {language_name} ({language_code})")
+            logger.info(f"[DEEPGRAM] {'Session' if language else 'Detected'} language: {language_name} ({language_code})")
             if transcript:
                 logger.info(f"[DEEPGRAM] Transcript: {transcript[:100]}...")
             else:
@@ -167,6 +292,7 @@ class SpeechToTextService:
                 "language": language_name,
                 "language_code": language_code,  # Use detected language code
                 "text": transcript,
+                "language_confidence": language_confidence,
             }
         
         except httpx.HTTPStatusError as e:
@@ -182,17 +308,152 @@ class SpeechToTextService:
             else:
                 raise Exception(f"Deepgram API error ({e.response.status_code}): {error_detail}")
         except (httpcore.ConnectionNotAvailable, httpcore.RemoteProtocolError) as e:
-            # Re-raise connection errors to be handled by retry logic
+            # Re-raise connection errors so callers can reset the client
             logger.error(f"Connection error: {type(e).__name__} - {str(e)}")
             raise
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             error_msg = str(e) if str(e) else "Unknown error occurred"
             logger.error(f"Transcription error: {error_msg}")
             logger.exception("Full traceback:")
             raise Exception(error_msg)
     
+    async def transcribe_long(self, audio_data: bytes, mimetype: str = "audio/wav") -> Dict[str, str]:
+        """
+        Transcribe a long recording as concurrent segments.
+        
+        The audio is decoded once, split at low-energy points into segments of
+        about STT_SEGMENT_SECONDS, and the segments are transcribed with at most
+        STT_SEGMENT_CONCURRENCY requests in flight. Each segment's request is
+        retried on its own by transcribe_audio, so one flaky segment does not
+        resend the others. Transcripts are joined in order, and the language
+        is the one most of the transcribed text is in. Recordings shorter than
+        one segment take a single request.
+        
+        Args:
+            audio_data: Binary audio data
+            mimetype: MIME type of the audio file
+        
+        Returns:
+            Dictionary with 'language', 'language_code' and 'text' keys
+        
+        Raises:
+            UpstreamUnavailableError: If Deepgram calls are being rejected by the upstream guard
+            Exception: If any segment still fails after its retries
+        """
+        try:
+            wav_data = await convert_to_wav_async(audio_data, source_format=mimetype)
+        except Exception as e:
+            logger.warning(f"[DEEPGRAM] Could not decode audio for segmentation ({e}), sending it whole")
+            return await self.transcribe_audio(audio_data, mimetype)
+        
+        info = parse_wav_header(wav_data)
+        samples = np.frombuffer(
+            memoryview(wav_data)[info.data_offset:info.data_offset + info.data_size - info.data_size % 2],
+            dtype="<i2",
+        )
+        bounds = split_at_silence(
+            samples,
+            info.sample_rate,
+            settings.STT_SEGMENT_SECONDS,
+            settings.STT_SEGMENT_SEARCH_SECONDS,
+        )
+        if len(bounds) == 1:
+            return await self.transcribe_audio(wav_data, "audio/wav")
+        
+        logger.info(
+            f"[DEEPGRAM] Transcribing {samples.size / info.sample_rate:.1f}s as {len(bounds)} segments "
+            f"(concurrency {settings.STT_SEGMENT_CONCURRENCY})"
+        )
+        semaphore = asyncio.Semaphore(settings.STT_SEGMENT_CONCURRENCY)
+        
+        async def transcribe_segment(index: int) -> Dict[str, str]:
+            start, end = bounds[index]
+            async with semaphore:
+                return await self.transcribe_audio(encode_wav(samples[start:end], info.sample_rate), "audio/wav")
+        
+        # Segments are not retried here. transcribe_audio already retries
+        # transient errors under RetryPolicy and the shared retry budget. A
+        # second retry loop around it stacked up to 3 x 3 attempts per
+        # segment, and it also re-ran errors RetryPolicy deliberately gives
+        # up on (401/400), which can never succeed. A segment that still
+        # fails after its per-request retries fails the whole transcription.
+        results = await asyncio.gather(*(transcribe_segment(i) for i in range(len(bounds))), return_exceptions=True)
+        failed = [index for index, result in enumerate(results) if isinstance(result, Exception)]
+        for index in failed:
+            if isinstance(results[index], UpstreamUnavailableError):
+                raise results[index]  # Circuit open or queue full: report the 503 as is
+        if failed:
+            raise Exception(f"Transcription failed for segments {failed} of {len(bounds)}: {results[failed[0]]}")
+        
+        # Language spoken in most of the transcribed text; ties go to the earliest segment
+        votes = Counter()
+        for result in results:
+            votes[result["language_code"]] += len(result["text"].strip())
+        language_code = max(votes, key=lambda code: votes[code]) if any(votes.values()) else results[0]["language_code"]
+        language = next(r["language"] for r in results if r["language_code"] == language_code)
+        text = " ".join(r["text"].strip() for r in results if r["text"].strip())
+        
+        logger.info(f"[DEEPGRAM] Stitched {len(bounds)} segments, language: {language} ({language_code})")
+        return {
+            "language": language,
+            "language_code": language_code,
+            "text": text,
+        }
+    
+    async def transcribe_stream(
+        self,
+        session_id: str,
+        audio_data: bytes,
+        mimetype: str = "audio/wav",
+        is_final: bool = False,
+        chunk_index: Optional[int] = None,
+    ) -> Dict:
+        """
+        Transcribe the next chunk of a session over its Deepgram live stream.
+        
+        The chunk is decoded to 16kHz PCM and pushed to the session's websocket,
+        which stays open between chunks. Falls back to a pre-recorded request
+        (transcribe_audio) when the stream cannot be opened or fails.
+        
+        Args:
+            session_id: Recording/session identifier
+            audio_data: Binary audio data of the chunk
+            mimetype: MIME type of the audio
+            is_final: Last chunk of the session (closes its stream)
+            chunk_index: Position of the chunk in the session, so retries are not streamed twice
+        
+        Returns:
+            Dictionary with 'language', 'language_code', 'text' and 'interim'
+            (interim hypotheses received while the chunk was transcribed) keys
+        
+        Raises:
+            UpstreamUnavailableError: If Deepgram calls are being rejected by the upstream guard
+            Exception: If decoding or the fallback transcription fails
+        """
+        wav_data = await convert_to_wav_async(audio_data, source_format=mimetype)
+        info = parse_wav_header(wav_data)
+        pcm = wav_data[info.data_offset:info.data_offset + info.data_size - info.data_size % 2]
+        
+        try:
+            return await self.live_sessions.transcribe_chunk(
+                session_id, pcm, is_final=is_final, chunk_index=chunk_index
+            )
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            logger.warning(f"[DEEPGRAM_LIVE] Streaming unavailable for session {session_id} ({e}), using a pre-recorded request")
+            result = await self.transcribe_audio(wav_data, "audio/wav", session_id=session_id)
+            return {**result, "interim": []}
+    
+    async def start(self):
+        """Warm-up: open the HTTP client (HTTP/2 and TLS setup) ahead of the first request."""
+        await self._get_client()
+    
     async def cleanup(self):
-        """Cleanup resources and close HTTP client."""
+        """Cleanup resources, close live streams and the HTTP client."""
+        await self.live_sessions.close_all()
         if self._client is not None:
             await self._client.aclose()
             self._client = None
@@ -45,6 +45,8 @@ async def generate_speech(request: TTSRequest):
             }
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
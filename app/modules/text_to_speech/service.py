@@ -6,6 +6,8 @@ import logging
 import httpx
 from typing import Dict, Optional
 from app.core.config import settings
+from app.core.retry import get_retry_policy
+from app.core.upstream_guard import UpstreamUnavailableError, get_upstream_guard
 from app.core.utils import map_emotion_to_voice_settings
 
 logger = logging.getLogger(__name__)
@@ -20,6 +22,12 @@ class TextToSpeechService:
         self.voice_id = settings.ELEVENLABS_VOICE_ID
         self.model_id = settings.ELEVENLABS_MODEL_ID
         self._client = None
+        self.guard = get_upstream_guard("elevenlabs")
+        self.retry = get_retry_policy("elevenlabs")
+    
+    async def start(self):
+        """Warm-up: open the HTTP client (HTTP/2 and TLS setup) ahead of the first request."""
+        await self._get_client()
     
     async def _get_client(self):
         """Get or create reusable HTTP client with optimized settings."""
@@ -51,6 +59,7 @@ class TextToSpeechService:
             Binary audio data (MP3)
         
         Raises:
+            UpstreamUnavailableError: If ElevenLabs calls are being rejected by the upstream guard
             Exception: If generation fails
         """
         try:
@@ -89,13 +98,18 @@ class TextToSpeechService:
             logger.info(f"[ELEVENLABS] Calling ElevenLabs API...")
             logger.info(f"[ELEVENLABS] Model: {self.model_id}, Voice: {self.voice_id}")
             
-            client = await self._get_client()
-            response = await client.post(
-                url,
-                headers=headers,
-                json=payload,
-            )
-            response.raise_for_status()
+            async def send() -> httpx.Response:
+                client = await self._get_client()
+                async with self.guard.call():
+                    response = await client.post(
+                        url,
+                        headers=headers,
+                        json=payload,
+                    )
+                    response.raise_for_status()
+                return response
+            
+            response = await self.retry.run(send)
             audio_data = response.content
             
             logger.info(f"[ELEVENLABS] ✓ Audio generation successful")
@@ -115,6 +129,8 @@ class TextToSpeechService:
                 raise Exception("ElevenLabs API access forbidden. Check your API key and quota")
             else:
                 raise Exception(f"ElevenLabs API error ({e.response.status_code}): {error_detail}")
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             error_msg = str(e) if str(e) else "Unknown audio generation error"
             logger.error(f"Audio generation error: {error_msg}")
@@ -135,7 +151,7 @@ class TextToSpeechService:
                 "xi-api-key": self.api_key,
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with httpx.AsyncClient(timeout=30.0) as client, self.guard.call():
                 response = await client.get(url, headers=headers)
                 response.raise_for_status()
                 data = response.json()
@@ -148,6 +164,13 @@ class TextToSpeechService:
         except Exception as e:
             logger.error(f"Failed to get voices: {str(e)}")
             return []
+    
+    async def cleanup(self):
+        """Cleanup resources and close HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Text-to-speech service cleaned up")
 
 
 # Global service instance
@@ -0,0 +1,118 @@
+"""
+Micro-batching of DeepL translation requests.
+
+DeepL accepts several `text` parameters per request. Translations of the same
+language pair requested within TRANSLATION_BATCH_WINDOW_MS of each other are
+collected into one batch and sent together; each caller gets the translation
+of its own text back. A batch is sent early once it holds
+TRANSLATION_BATCH_MAX_TEXTS texts, and a text that would push it past
+TRANSLATION_BATCH_MAX_BYTES starts a new batch.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SendBatch = Callable[[List[str], str, str], Awaitable[List[Dict[str, str]]]]
+
+
+class _Batch:
+    """Texts of one language pair waiting to be sent, with the futures of their callers."""
+
+    __slots__ = ("texts", "futures", "size", "timer")
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.futures: List[asyncio.Future] = []
+        self.size = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class TranslationBatcher:
+    """Coalesces concurrent translations of one language pair into multi-text requests."""
+
+    def __init__(self, send_batch: SendBatch, window_seconds: float, max_texts: int, max_bytes: int):
+        """
+        Args:
+            send_batch: Translates a list of texts with one request, results in the same order
+            window_seconds: How long the first text of a batch waits for others
+            max_texts: Texts per request (DeepL allows 50)
+            max_bytes: UTF-8 bytes of text per request
+        """
+        self.send_batch = send_batch
+        self.window_seconds = window_seconds
+        self.max_texts = max_texts
+        self.max_bytes = max_bytes
+        self._open: Dict[Tuple[str, str], _Batch] = {}
+        self._sending: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+
+    async def translate(self, text: str, source_lang_code: str, target_lang_code: str) -> Dict[str, str]:
+        """
+        Translate one text as part of the current batch of its language pair.
+
+        Args:
+            text: Text to translate
+            source_lang_code: DeepL source language code
+            target_lang_code: DeepL target language code
+
+        Returns:
+            Dictionary with 'translated_text', 'source_language' and 'target_language' keys
+
+        Raises:
+            Exception: The error of the batch request, if it fails
+        """
+        key = (source_lang_code, target_lang_code)
+        size = len(text.encode())
+        batch = self._open.get(key)
+        if batch is not None and batch.size + size > self.max_bytes:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = self._open[key] = _Batch()
+            batch.timer = asyncio.get_running_loop().call_later(self.window_seconds, self._flush, key)
+
+        future = asyncio.get_running_loop().create_future()
+        batch.texts.append(text)
+        batch.futures.append(future)
+        batch.size += size
+        if len(batch.texts) >= self.max_texts:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: Tuple[str, str]):
+        """Close the open batch of a language pair and send it."""
+        batch = self._open.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.ensure_future(self._send(batch, *key))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: _Batch, source_lang_code: str, target_lang_code: str):
+        self.batches += 1
+        self.texts += len(batch.texts)
+        self.largest_batch = max(self.largest_batch, len(batch.texts))
+        try:
+            results = await self.send_batch(batch.texts, source_lang_code, target_lang_code)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():  # The caller may have been cancelled meanwhile
+                future.set_result(result)
+
+    def get_metrics(self) -> Dict:
+        """Batches sent and how many texts they carried."""
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "average_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
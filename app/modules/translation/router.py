@@ -42,6 +42,8 @@ async def translate(request: TranslationRequest):
         
         return result
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2,13 +2,21 @@
 Translation service using DeepL API.
 Translates text between English and Spanish.
 """
+import json
 import logging
 import httpx
-from typing import Dict
+from typing import Dict, List
 from app.core.config import settings
+from app.core.hedging import get_hedger
+from app.core.result_cache import ResultCache, content_key
+from app.core.retry import get_retry_policy
+from app.core.upstream_guard import UpstreamUnavailableError, get_upstream_guard
+from app.modules.translation.batching import TranslationBatcher
 
 logger = logging.getLogger(__name__)
 
+FORMALITY = "default"  # Faster than "more" or "less"
+
 
 class TranslationService:
     """Service for translating text using DeepL API."""
@@ -17,6 +25,27 @@ class TranslationService:
         self.api_key = settings.DEEPL_API_KEY
         self.base_url = settings.DEEPL_API_URL
         self._client = None
+        self.guard = get_upstream_guard("deepl")
+        self.retry = get_retry_policy("deepl")
+        self.hedger = get_hedger("deepl")  # TRANSLATION_HEDGING_ENABLED
+        # Recurring phrases (greetings, "can you hear me") skip the DeepL round-trip
+        self.cache = ResultCache(
+            "translation",
+            max_bytes=settings.TRANSLATION_CACHE_MAX_BYTES,
+            ttl_seconds=settings.TRANSLATION_CACHE_TTL_SECONDS,
+            use_redis=settings.TRANSLATION_CACHE_REDIS,
+        )
+        # Concurrent misses of one language pair share a multi-text request (TRANSLATION_BATCHING_ENABLED)
+        self.batcher = TranslationBatcher(
+            self._request_translations,
+            window_seconds=settings.TRANSLATION_BATCH_WINDOW_MS / 1000,
+            max_texts=settings.TRANSLATION_BATCH_MAX_TEXTS,
+            max_bytes=settings.TRANSLATION_BATCH_MAX_BYTES,
+        )
+    
+    async def start(self):
+        """Warm-up: open the HTTP client (HTTP/2 and TLS setup) ahead of the first request."""
+        await self._get_client()
     
     async def _get_client(self):
         """Get or create reusable HTTP client with optimized settings."""
@@ -37,6 +66,10 @@ class TranslationService:
         """
         Translate text from source language to target language.
         
+        Results are cached by (normalised text, languages, formality); a
+        translation already in flight for the same key is awaited instead of
+        requested again.
+        
         Args:
             text: Text to translate
             source_lang: Source language code (en, es)
@@ -46,6 +79,7 @@ class TranslationService:
             Dictionary with 'translated_text' and 'target_language' keys
         
         Raises:
+            UpstreamUnavailableError: If DeepL calls are being rejected by the upstream guard
             Exception: If translation fails
         """
         try:
@@ -58,51 +92,14 @@ class TranslationService:
             source_lang_code = self._normalize_source_language(source_lang)
             target_lang_code = self._normalize_target_language(target_lang)
             
-            logger.info(f"[DEEPL] Translating: {source_lang_code} -> {target_lang_code}")
-            logger.debug(f"[DEEPL] Text to translate: {text[:100]}...")
-            
-            headers = {
-                "Authorization": f"DeepL-Auth-Key {self.api_key}",
-                "Content-Type": "application/x-www-form-urlencoded",
-            }
-            
-            data = {
-                "text": text,
-                "source_lang": source_lang_code,
-                "target_lang": target_lang_code,
-                "formality": "default",  # Faster than "more" or "less"
-            }
+            if not settings.TRANSLATION_CACHE_ENABLED:
+                return await self._request_translation(text, source_lang_code, target_lang_code)
             
-            client = await self._get_client()
-            response = await client.post(
-                self.base_url,
-                headers=headers,
-                data=data,
+            key = self._cache_key(text, source_lang_code, target_lang_code)
+            return await self.cache.get_or_compute(
+                key,
+                lambda: self._request_translation(text, source_lang_code, target_lang_code),
             )
-            response.raise_for_status()
-            result = response.json()
-            
-            # Extract translation
-            translations = result.get("translations", [])
-            if not translations:
-                raise Exception("No translation returned from DeepL")
-            
-            translated_text = translations[0].get("text", "")
-            detected_source = translations[0].get("detected_source_language", source_lang_code)
-            
-            logger.info(f"[DEEPL] ✓ Translation successful: {source_lang_code} -> {target_lang_code}")
-            logger.info(f"[DEEPL] Translated text: {translated_text[:100]}...")
-            
-            # Extract base language code (remove variants like -US, -GB)
-            target_base_code = target_lang_code.split('-')[0].lower()
-            
-            logger.info(f"[DEEPL] Returning target language: {target_base_code}")
-            
-            return {
-                "translated_text": translated_text,
-                "source_language": detected_source.lower(),
-                "target_language": target_base_code,  # Return base code (en, es, etc.)
-            }
         
         except httpx.HTTPStatusError as e:
             error_detail = e.response.text if hasattr(e.response, 'text') else str(e)
@@ -113,12 +110,97 @@ class TranslationService:
                 raise Exception("Invalid DeepL API key. Please check your DEEPL_API_KEY in .env file")
             else:
                 raise Exception(f"DeepL API error ({e.response.status_code}): {error_detail}")
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             error_msg = str(e) if str(e) else "Unknown translation error"
             logger.error(f"Translation error: {error_msg}")
             logger.exception("Full traceback:")
             raise Exception(error_msg)
     
+    def _cache_key(self, text: str, source_lang_code: str, target_lang_code: str) -> str:
+        """Cache key of a translation: whitespace-normalised text, DeepL language codes and formality."""
+        normalised = " ".join(text.split())
+        return content_key(json.dumps([normalised, source_lang_code, target_lang_code, FORMALITY]).encode())
+    
+    async def _request_translation(self, text: str, source_lang_code: str, target_lang_code: str) -> Dict[str, str]:
+        """Translate one text, batched with concurrent translations of the same language pair when enabled."""
+        if settings.TRANSLATION_BATCHING_ENABLED:
+            return await self.batcher.translate(text, source_lang_code, target_lang_code)
+        return (await self._request_translations([text], source_lang_code, target_lang_code))[0]
+    
+    async def _request_translations(
+        self,
+        texts: List[str],
+        source_lang_code: str,
+        target_lang_code: str,
+    ) -> List[Dict[str, str]]:
+        """
+        Translate texts with one DeepL request (retried and hedged by the shared policies).
+        
+        Args:
+            texts: Texts to translate (one `text` parameter each)
+            source_lang_code: DeepL source language code (EN, ES)
+            target_lang_code: DeepL target language code (EN-US, ES)
+        
+        Returns:
+            One dictionary per text, in order, with 'translated_text',
+            'source_language' and 'target_language' keys
+        """
+        logger.info(f"[DEEPL] Translating {len(texts)} text(s): {source_lang_code} -> {target_lang_code}")
+        logger.debug(f"[DEEPL] Text to translate: {texts[0][:100]}...")
+        
+        headers = {
+            "Authorization": f"DeepL-Auth-Key {self.api_key}",
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        
+        data = {
+            "text": texts,  # Sent as repeated text parameters
+            "source_lang": source_lang_code,
+            "target_lang": target_lang_code,
+            "formality": FORMALITY,
+        }
+        
+        async def send() -> httpx.Response:
+            client = await self._get_client()
+            async with self.guard.call():
+                response = await client.post(
+                    self.base_url,
+                    headers=headers,
+                    data=data,
+                )
+                response.raise_for_status()
+            return response
+        
+        response = await self.retry.run(
+            lambda: self.hedger.run(send, hedge=settings.TRANSLATION_HEDGING_ENABLED)
+        )
+        result = response.json()
+        
+        # Extract translations (same order as the texts)
+        translations = result.get("translations", [])
+        if not translations:
+            raise Exception("No translation returned from DeepL")
+        if len(translations) != len(texts):
+            raise Exception(f"DeepL returned {len(translations)} translations for {len(texts)} texts")
+        
+        # Extract base language code (remove variants like -US, -GB)
+        target_base_code = target_lang_code.split('-')[0].lower()
+        
+        logger.info(f"[DEEPL] ✓ Translation successful: {source_lang_code} -> {target_lang_code}")
+        logger.info(f"[DEEPL] Translated text: {translations[0].get('text', '')[:100]}...")
+        logger.info(f"[DEEPL] Returning target language: {target_base_code}")
+        
+        return [
+            {
+                "translated_text": translation.get("text", ""),
+                "source_language": translation.get("detected_source_language", source_lang_code).lower(),
+                "target_language": target_base_code,  # Return base code (en, es, etc.)
+            }
+            for translation in translations
+        ]
+    
     def _get_target_language(self, source_lang: str) -> str:
         """
         Get target language based on source language.
@@ -186,6 +268,13 @@ class TranslationService:
             return "PT-BR"  # Default to Brazilian Portuguese (can also use PT-PT)
         
         return code
+    
+    async def cleanup(self):
+        """Cleanup resources and close HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Translation service cleaned up")
 
 
 # Global service instance
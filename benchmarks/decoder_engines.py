@@ -0,0 +1,113 @@
+"""
+Benchmark per-chunk decode latency and throughput of the audio decoder engines.
+
+Usage (from the repository root):
+    python -m benchmarks.decoder_engines --chunk-seconds 3 --iterations 30
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import time
+
+import numpy as np
+
+from app.core.audio_utils import DECODER_ENGINES, get_audio_decoder
+
+
+def make_speech_like_signal(seconds: float, sample_rate: int = 48000) -> np.ndarray:
+    """Harmonic tone with syllable-rate amplitude modulation and a little noise."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    noise = np.random.default_rng(0).normal(0, 0.01, t.size)
+    return (0.3 * voice * envelope + noise).astype(np.float32)
+
+
+def encode_samples(samples: np.ndarray, sample_rate: int):
+    """Encode the signal into every format the local libraries can write."""
+    encoded = {}
+    try:
+        import soundfile as sf
+        stereo = np.stack([samples, samples], axis=1)
+        for name, fmt, subtype in [("wav", "WAV", "PCM_16"), ("flac", "FLAC", "PCM_16"), ("ogg", "OGG", "OPUS")]:
+            buffer = io.BytesIO()
+            sf.write(buffer, stereo, sample_rate, format=fmt, subtype=subtype)
+            encoded[name] = buffer.getvalue()
+    except Exception as e:
+        print(f"soundfile encoding unavailable: {e}")
+
+    try:
+        import av
+        buffer = io.BytesIO()
+        with av.open(buffer, mode="w", format="webm") as container:
+            stream = container.add_stream("libopus", rate=48000)
+            stream.layout = "mono"
+            frame = av.AudioFrame.from_ndarray(
+                (samples * 32767).astype(np.int16).reshape(1, -1), format="s16", layout="mono"
+            )
+            frame.sample_rate = sample_rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        encoded["webm"] = buffer.getvalue()
+    except Exception as e:
+        print(f"PyAV webm encoding unavailable: {e}")
+
+    return encoded
+
+
+async def bench_engine(engine_name: str, source_format: str, data: bytes, iterations: int):
+    """Measure sequential latency and concurrent throughput for one engine/format."""
+    decoder = get_audio_decoder(engine_name)
+    if decoder.name != engine_name or not decoder.supports(source_format):
+        return None
+
+    await decoder.to_wav(data, source_format)  # warm-up
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await decoder.to_wav(data, source_format)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # All chunks at once; ffmpeg is still bounded by FFMPEG_MAX_CONCURRENCY
+    start = time.perf_counter()
+    await asyncio.gather(*(decoder.to_wav(data, source_format) for _ in range(iterations)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "chunks_per_s": iterations / elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-seconds", type=float, default=3.0)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    sample_rate = 48000
+    encoded = encode_samples(make_speech_like_signal(args.chunk_seconds, sample_rate), sample_rate)
+
+    print(f"Chunk: {args.chunk_seconds}s @ {sample_rate} Hz, {args.iterations} iterations\n")
+    print(f"{'engine':<10} {'format':<6} {'bytes':>8} {'p50 ms':>8} {'p95 ms':>8} {'chunks/s':>9}")
+    for source_format, data in encoded.items():
+        for engine_name in DECODER_ENGINES:
+            result = await bench_engine(engine_name, source_format, data, args.iterations)
+            if result is None:
+                continue
+            print(
+                f"{engine_name:<10} {source_format:<6} {len(data):>8} "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['chunks_per_s']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
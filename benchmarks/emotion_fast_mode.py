@@ -0,0 +1,118 @@
+"""
+Accuracy-vs-speed report for approximate (fast mode) emotion extraction.
+
+Builds a synthetic corpus of long speech-like recordings (voiced utterances
+separated by pauses, with per-recording pitch and loudness profiles spread
+over the classifier's decision regions) and compares fast-mode variants with
+full extraction: label agreement, mean absolute attribute error, and time.
+
+Usage (from the repository root):
+    python -m benchmarks.emotion_fast_mode --recordings 40 --seconds 120
+    python -m benchmarks.emotion_fast_mode --engine opensmile --max-windows 8 16 32
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.modules.emotion_detection.classifier import ATTRIBUTE_NAMES, classify_batch
+from app.modules.emotion_detection.features import extract_attributes
+from app.modules.emotion_detection.sampling import downsample, select_voiced_windows
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 2.0
+
+
+def make_recording(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """Utterances around a random speaker profile, separated by low-level pauses."""
+    base_f0 = rng.uniform(90, 300)
+    intonation = rng.uniform(0.5, 14.0)  # Pitch swing in semitones
+    level = 10 ** rng.uniform(-1.3, 0.3)
+    dynamics = rng.uniform(0.2, 1.0)
+    sharpness = rng.uniform(1.0, 6.0)  # Higher = shorter, punchier syllables
+    max_pause = rng.uniform(0.3, 3.0)
+    parts, total = [], 0
+    while total < seconds * SAMPLE_RATE:
+        length = int(rng.uniform(0.8, 4.0) * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        f0 = base_f0 * rng.uniform(0.9, 1.1) * 2 ** (intonation * np.sin(2 * np.pi * rng.uniform(0.3, 2.0) * t) / 12)
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voice = sum(np.sin(k * phase) / k ** rng.uniform(0.8, 1.5) for k in range(1, 10))
+        envelope = 1 - dynamics + dynamics * (0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 6) * t))) ** sharpness
+        parts.append(np.clip(level * rng.uniform(0.7, 1.3) * voice * envelope / 3, -1, 1))
+        pause = int(rng.uniform(0.1, max_pause) * SAMPLE_RATE)
+        parts.append(rng.normal(0, rng.uniform(0.0005, 0.005), pause))
+        total += length + pause
+    return np.concatenate(parts)[:int(seconds * SAMPLE_RATE)].astype(np.float32)
+
+
+def make_extractor(engine: str):
+    """Return extract(signal, sample_rate) -> attribute vector for the chosen engine."""
+    if engine == "numpy":
+        return lambda signal, rate: [extract_attributes(signal, rate)[name] for name in ATTRIBUTE_NAMES]
+
+    from app.modules.emotion_detection.worker import build_smile
+    smile = build_smile("emotion_minimal")
+    columns = [
+        "F0semitoneFrom27.5Hz_sma3nz_amean",
+        "F0semitoneFrom27.5Hz_sma3nz_stddevNorm",
+        "loudness_sma3_amean",
+        "loudness_sma3_stddevNorm",
+    ]
+    return lambda signal, rate: smile.process_signal(signal, rate)[columns].iloc[0].to_list()
+
+
+def run_variant(extract, corpus, max_windows: int, sample_rate: int):
+    """Extract every recording with one fast-mode variant; returns (attributes matrix, per-recording ms)."""
+    rows, timings = [], []
+    for signal in corpus:
+        start = time.perf_counter()
+        reduced = select_voiced_windows(signal, SAMPLE_RATE, WINDOW_SECONDS, max_windows) if max_windows else signal
+        reduced, rate = downsample(reduced, SAMPLE_RATE, sample_rate)
+        rows.append(extract(reduced, rate))
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(rows), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=["numpy", "opensmile"], default="numpy")
+    parser.add_argument("--recordings", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument("--max-windows", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corpus = [make_recording(args.seconds, rng) for _ in range(args.recordings)]
+    extract = make_extractor(args.engine)
+
+    reference, reference_ms = run_variant(extract, corpus, 0, SAMPLE_RATE)
+    reference_labels = classify_batch(reference)
+    print(
+        f"Engine: {args.engine}, {args.recordings} recordings x {args.seconds:.0f}s, "
+        f"{WINDOW_SECONDS:.0f}s windows; labels: "
+        + ", ".join(f"{e} {reference_labels.count(e)}" for e in sorted(set(reference_labels)))
+    )
+    header = f"\n{'variant':<18} {'agree':>6} " + " ".join(f"{name:>13}" for name in ATTRIBUTE_NAMES) + f" {'p50 ms':>8} {'speedup':>8}"
+    print(header)
+    print(f"{'full':<18} {1:>6.0%} " + " ".join(f"{0:>13.3f}" for _ in ATTRIBUTE_NAMES) + f" {statistics.median(reference_ms):>8.1f} {1:>7.1f}x")
+
+    variants = [("full @8k", 0, 8000)]
+    for windows in args.max_windows:
+        variants += [(f"{windows} windows", windows, SAMPLE_RATE), (f"{windows} windows @8k", windows, 8000)]
+    for name, windows, rate in variants:
+        attributes, timings = run_variant(extract, corpus, windows, rate)
+        agreement = np.mean([a == b for a, b in zip(classify_batch(attributes), reference_labels)])
+        errors = np.mean(np.abs(attributes - reference), axis=0)
+        p50 = statistics.median(timings)
+        print(
+            f"{name:<18} {agreement:>6.0%} " + " ".join(f"{error:>13.3f}" for error in errors)
+            + f" {p50:>8.1f} {statistics.median(reference_ms) / p50:>7.1f}x"
+        )
+    print("\nAttribute columns are mean absolute errors against the full extraction.")
+
+
+if __name__ == "__main__":
+    main()
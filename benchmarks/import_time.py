@@ -0,0 +1,90 @@
+"""
+Benchmark the cold-start cost of importing the application.
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters and
+reports the median total import time, the slowest top-level imports, and
+whether modules only needed after startup (opensmile, pandas, redis) were
+imported. Exits with status 1 when the median exceeds --budget-ms or a
+deferred module is imported, so it can guard the cold-start budget in CI.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time --runs 5 --budget-ms 1500
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Heavy modules left to the emotion worker processes (opensmile, pandas) or
+# to the lifespan startup when the Redis cache is enabled (redis)
+DEFERRED_MODULES = ("opensmile", "pandas", "redis")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse `-X importtime` output.
+
+    Args:
+        stderr: Interpreter stderr
+
+    Returns:
+        List of (module, self microseconds, cumulative microseconds)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(target: str) -> Dict:
+    """Import `target` in a fresh interpreter and return its import time profile."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = parse_importtime(result.stderr)
+    return {
+        "total_ms": next(cumulative for name, _, cumulative in rows if name == target) / 1000,
+        "rows": rows,
+        "modules": {name for name, _, _ in rows},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when the median import time exceeds this")
+    args = parser.parse_args()
+
+    runs = [measure(args.target) for _ in range(args.runs)]
+    median_ms = statistics.median(run["total_ms"] for run in runs)
+    last = runs[-1]
+
+    print(f"import {args.target}: median {median_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(run['total_ms'] for run in runs):.0f}, max {max(run['total_ms'] for run in runs):.0f})\n")
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    top_level = [row for row in last["rows"] if "." not in row[0]]
+    for name, self_us, cumulative_us in sorted(top_level, key=lambda row: -row[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>13.1f} {self_us / 1000:>8.1f}  {name}")
+
+    deferred = [name for name in DEFERRED_MODULES if name in last["modules"]]
+    print(f"\nDeferred modules imported: {', '.join(deferred) or 'none'}")
+
+    failed = bool(deferred)
+    if args.budget_ms is not None:
+        within = median_ms <= args.budget_ms
+        print(f"Budget: {args.budget_ms:.0f} ms - {'OK' if within else 'EXCEEDED'}")
+        failed = failed or not within
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
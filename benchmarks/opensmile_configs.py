@@ -0,0 +1,71 @@
+"""
+Benchmark emotion feature extraction time per OPENSMILE_CONFIG value and for
+the NumPy feature engine (EMOTION_FEATURE_ENGINE=numpy).
+
+Runs each extractor on a speech-like 16kHz signal and reports how far the
+four attributes used for classification are from eGeMAPSv02.
+
+Usage (from the repository root):
+    python -m benchmarks.opensmile_configs --chunk-seconds 5 --iterations 20
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.core.audio_utils import TARGET_SAMPLE_RATE
+from app.modules.emotion_detection.features import extract_attributes
+from app.modules.emotion_detection.worker import build_smile
+from benchmarks.decoder_engines import make_speech_like_signal
+
+CONFIGS = ["eGeMAPSv02", "emotion_minimal", "numpy"]
+COLUMNS = [
+    "F0semitoneFrom27.5Hz_sma3nz_amean",
+    "F0semitoneFrom27.5Hz_sma3nz_stddevNorm",
+    "loudness_sma3_amean",
+    "loudness_sma3_stddevNorm",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-seconds", type=float, default=5.0)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    signal = make_speech_like_signal(args.chunk_seconds, TARGET_SAMPLE_RATE)
+    print(f"Chunk: {args.chunk_seconds}s @ {TARGET_SAMPLE_RATE} Hz, {args.iterations} iterations\n")
+    print(f"{'config':<16} {'features':>8} {'init ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max |diff|':>11}")
+
+    reference = None
+    for config in CONFIGS:
+        start = time.perf_counter()
+        if config == "numpy":
+            extract = lambda: list(extract_attributes(signal, TARGET_SAMPLE_RATE).values())
+            n_features = len(COLUMNS)
+        else:
+            smile = build_smile(config)
+            extract = lambda: smile.process_signal(signal, TARGET_SAMPLE_RATE)[COLUMNS].iloc[0].to_numpy()
+            n_features = len(smile.feature_names)
+        init_ms = (time.perf_counter() - start) * 1000
+
+        values = np.asarray(extract())  # warm-up
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            extract()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+
+        if reference is None:
+            reference = values
+        diff = float(abs(values - reference).max())
+        print(
+            f"{config:<16} {n_features:>8} {init_ms:>8.1f} {statistics.median(timings):>8.2f} "
+            f"{timings[int(0.95 * (len(timings) - 1))]:>8.2f} {diff:>11.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
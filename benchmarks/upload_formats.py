@@ -0,0 +1,91 @@
+"""
+Benchmark the audio formats the STT service can upload to Deepgram.
+
+For each DEEPGRAM_UPLOAD_FORMAT this reports the bytes on the wire, the
+conversion time from a MediaRecorder-style WebM/Opus chunk, and the
+end-to-end latency (conversion + upload). Without --live the upload time is
+modeled from --uplink-mbps; with --live each payload is POSTed to Deepgram
+(DEEPGRAM_API_KEY must be set) and the measured round trip is reported.
+
+Usage (from the repository root):
+    python -m benchmarks.upload_formats --chunk-seconds 10 --uplink-mbps 10
+    python -m benchmarks.upload_formats --chunk-seconds 10 --live
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.core.audio_utils import OUTPUT_FORMATS, convert_audio
+from app.core.config import settings
+from benchmarks.decoder_engines import encode_samples, make_speech_like_signal
+
+
+async def bench_format(data: bytes, source_format: str, output_format: str, iterations: int):
+    """Measure conversion time and output size for one upload format."""
+    converted = await convert_audio(data, source_format, output_format)  # warm-up
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        converted = await convert_audio(data, source_format, output_format)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return converted, statistics.median(timings)
+
+
+async def upload_round_trip(client: httpx.AsyncClient, payload: bytes, output_format: str) -> float:
+    """POST one payload to Deepgram and return the round trip in milliseconds."""
+    start = time.perf_counter()
+    response = await client.post(
+        f"{settings.DEEPGRAM_API_URL}?detect_language=true&model=nova-2",
+        headers={
+            "Authorization": f"Token {settings.DEEPGRAM_API_KEY}",
+            "Content-Type": OUTPUT_FORMATS[output_format]["mimetype"],
+        },
+        content=payload,
+    )
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-seconds", type=float, default=10.0)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--uplink-mbps", type=float, default=10.0, help="Modeled client uplink bandwidth")
+    parser.add_argument("--live", action="store_true", help="Upload to Deepgram instead of modeling the upload")
+    args = parser.parse_args()
+
+    sample_rate = 48000
+    encoded = encode_samples(make_speech_like_signal(args.chunk_seconds, sample_rate), sample_rate)
+    source = encoded.get("webm") or encoded.get("ogg")
+    source_format = "webm" if "webm" in encoded else "ogg"
+    if source is None:
+        raise SystemExit("Neither PyAV nor soundfile is available to build the source chunk")
+
+    print(f"Source: {args.chunk_seconds}s {source_format}/opus chunk, {len(source)} bytes")
+    mode = "measured Deepgram round trip" if args.live else f"modeled upload at {args.uplink_mbps} Mbps"
+    print(f"Upload: {mode}\n")
+    print(f"{'format':<6} {'bytes':>9} {'kbps':>7} {'convert ms':>11} {'upload ms':>10} {'total ms':>9}")
+
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        for output_format in OUTPUT_FORMATS:
+            payload, convert_ms = await bench_format(source, source_format, output_format, args.iterations)
+            if args.live:
+                upload_ms = statistics.median(
+                    [await upload_round_trip(client, payload, output_format) for _ in range(3)]
+                )
+            else:
+                upload_ms = len(payload) * 8 / (args.uplink_mbps * 1_000_000) * 1000
+            kbps = len(payload) * 8 / args.chunk_seconds / 1000
+            print(
+                f"{output_format:<6} {len(payload):>9} {kbps:>7.1f} "
+                f"{convert_ms:>11.2f} {upload_ms:>10.2f} {convert_ms + upload_ms:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,7 +3,9 @@ Pytest configuration and fixtures.
 """
 import pytest
 import asyncio
+import numpy as np
 from unittest.mock import AsyncMock, patch
+from app.core.audio_utils import encode_wav
 
 
 @pytest.fixture(scope="session")
@@ -31,6 +33,13 @@ def sample_audio_data():
     return b"fake_audio_content_for_testing"
 
 
+@pytest.fixture
+def sample_wav_data():
+    """One second of a 220 Hz tone as 16kHz mono 16-bit WAV."""
+    t = np.arange(16000) / 16000
+    return encode_wav((0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+
+
 @pytest.fixture
 def sample_transcription():
     """Sample transcription result."""
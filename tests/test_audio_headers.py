@@ -0,0 +1,101 @@
+"""
+Unit tests for native container header parsing.
+"""
+import struct
+from unittest.mock import MagicMock, patch
+from app.core.audio_headers import parse_audio_header
+from app.core.audio_utils import get_audio_info
+
+
+def _ebml(element_id: int, payload: bytes, unknown_size: bool = False) -> bytes:
+    """Encode one EBML element with an 8-byte size field."""
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    size = b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown_size else (0x01 << 56 | len(payload)).to_bytes(8, "big")
+    return id_bytes + size + payload
+
+
+def _ogg_page(granule: int, packet: bytes) -> bytes:
+    """Build an Ogg page carrying one packet (CRC left at zero)."""
+    return b"OggS" + struct.pack("<BBqIIIB", 0, 0, granule, 1, 0, 0, 1) + bytes([len(packet)]) + packet
+
+
+def test_parse_wav(sample_wav_data):
+    """Test WAV stream properties."""
+    header = parse_audio_header(sample_wav_data)
+
+    assert header == ("wav", "pcm", 1, 16000, 1.0)
+
+
+def test_parse_flac_streaminfo():
+    """Test FLAC STREAMINFO decoding (44.1kHz stereo, 2.5 s)."""
+    packed = (44100 << 44) | (1 << 41) | (15 << 36) | 110250
+    streaminfo = struct.pack(">HH", 4096, 4096) + b"\x00" * 6 + packed.to_bytes(8, "big") + b"\x00" * 16
+    flac = b"fLaC" + bytes([0x80]) + len(streaminfo).to_bytes(3, "big") + streaminfo
+
+    assert parse_audio_header(flac) == ("flac", "flac", 2, 44100, 2.5)
+
+
+def test_parse_ogg_opus_duration_from_last_page():
+    """Test OpusHead parsing and duration from the last granule position."""
+    opus_head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, 312, 16000, 0, 0)
+    ogg = _ogg_page(0, opus_head) + _ogg_page(0, b"OpusTags") + _ogg_page(312 + 96000, b"\x00" * 10)
+
+    assert parse_audio_header(ogg) == ("ogg", "opus", 1, 48000, 2.0)
+
+
+def _webm_header(info: bytes = b""):
+    """EBML header, and the Info and Tracks elements of a 48kHz mono Opus WebM (Segment children)."""
+    ebml_header = _ebml(0x1A45DFA3, _ebml(0x4282, b"webm"))
+    audio = _ebml(0xE1, _ebml(0xB5, struct.pack(">d", 48000.0)) + _ebml(0x9F, b"\x01"))
+    track = _ebml(0xAE, _ebml(0x86, b"A_OPUS") + _ebml(0x83, b"\x02") + audio)
+    return ebml_header, _ebml(0x1549A966, _ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big")) + info) + _ebml(0x1654AE6B, track)
+
+
+def test_parse_live_webm_without_duration():
+    """Test MediaRecorder-style WebM: unknown sizes, no Duration, parsing stops at the first Cluster."""
+    ebml_header, segment_header = _webm_header()
+    block = _ebml(0xA3, b"\x81" + struct.pack(">hB", 0, 0x80) + b"\x00" * 40)
+    cluster = _ebml(0x1F43B675, _ebml(0xE7, (0).to_bytes(2, "big")) + block, unknown_size=True)
+    webm = ebml_header + _ebml(0x18538067, segment_header + cluster + b"\xff" * 1000, unknown_size=True)
+
+    assert parse_audio_header(webm) == ("webm", "opus", 1, 48000, None)
+    assert parse_audio_header(memoryview(webm)) == parse_audio_header(webm)
+
+
+def test_parse_webm_duration_element():
+    """Test that a Duration element in Info gives the duration in seconds."""
+    ebml_header, segment_header = _webm_header(info=_ebml(0x4489, struct.pack(">d", 2500.0)))
+    webm = ebml_header + _ebml(0x18538067, segment_header, unknown_size=True)
+
+    assert parse_audio_header(webm) == ("webm", "opus", 1, 48000, 2.5)
+
+
+def test_get_audio_info_uses_ffprobe_for_webm_without_duration():
+    """Test that a missing WebM Duration falls back to ffprobe instead of scanning clusters."""
+    ebml_header, segment_header = _webm_header()
+    webm = ebml_header + _ebml(0x18538067, segment_header, unknown_size=True)
+    ffprobe_output = b'{"format": {"duration": "3.2", "format_name": "matroska,webm"}, "streams": [{"channels": 1}]}'
+
+    with patch("subprocess.run", return_value=MagicMock(stdout=ffprobe_output)) as mock_run:
+        info = get_audio_info(webm, "webm")
+
+    mock_run.assert_called_once()
+    assert info["duration_seconds"] == 3.2
+
+
+def test_parse_unknown_container():
+    """Test that unrecognised data returns None."""
+    assert parse_audio_header(b"ID3\x04\x00\x00\x00\x00\x00\x00\xff\xfb") is None
+    assert parse_audio_header(b"") is None
+
+
+def test_get_audio_info_skips_ffprobe_for_known_containers(sample_wav_data):
+    """Test that get_audio_info never spawns ffprobe for parseable headers."""
+    with patch("subprocess.run") as mock_run:
+        info = get_audio_info(sample_wav_data, "wav")
+
+    mock_run.assert_not_called()
+    assert info["duration_seconds"] == 1.0
+    assert info["channels"] == 1
+    assert info["sample_rate"] == 16000
+    assert info["size_bytes"] == len(sample_wav_data)
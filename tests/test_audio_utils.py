@@ -0,0 +1,249 @@
+"""
+Unit tests for audio utility functions.
+"""
+import asyncio
+import shutil
+import struct
+import numpy as np
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.core import audio_utils
+from app.core.audio_utils import (
+    _build_ffmpeg_command,
+    _finalize_wav_header,
+    convert_audio,
+    convert_to_wav_async,
+    encode_wav,
+    get_audio_decoder,
+    parse_wav_header,
+    resample_audio,
+    wav_fast_path,
+)
+
+
+def _pipe_wav(pcm: bytes) -> bytes:
+    """Build a WAV the way ffmpeg writes it to a pipe (unknown sizes)."""
+    fmt = struct.pack("<HHIIHH", 1, 1, 16000, 32000, 2, 16)
+    return (
+        b"RIFF" + b"\xff\xff\xff\xff" + b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + b"\xff\xff\xff\xff" + pcm
+    )
+
+
+def test_finalize_wav_header_patches_sizes():
+    """Test that pipe-written WAV headers get real chunk sizes."""
+    wav = _finalize_wav_header(_pipe_wav(b"\x01\x00" * 100))
+
+    assert struct.unpack_from("<I", wav, 4)[0] == len(wav) - 8
+    assert struct.unpack_from("<I", wav, 40)[0] == 200
+
+
+def test_finalize_wav_header_ignores_non_wav():
+    """Test that non-WAV data is returned untouched."""
+    data = b"not a wav file"
+    assert _finalize_wav_header(data) is data
+
+
+@pytest.mark.asyncio
+async def test_convert_to_wav_async_uses_pipes():
+    """Test that conversion streams through stdin/stdout without temp files."""
+    process = MagicMock()
+    process.returncode = 0
+    process.communicate = AsyncMock(return_value=(_pipe_wav(b"\x00\x00" * 10), b""))
+
+    with patch("asyncio.create_subprocess_exec", new=AsyncMock(return_value=process)) as mock_exec, \
+            patch("tempfile.NamedTemporaryFile") as mock_tempfile:
+        wav = await convert_to_wav_async(b"webm-bytes", "audio/webm")
+
+    args = mock_exec.call_args.args
+    assert "pipe:0" in args and "pipe:1" in args
+    process.communicate.assert_awaited_once_with(input=b"webm-bytes")
+    mock_tempfile.assert_not_called()
+    assert struct.unpack_from("<I", wav, 40)[0] == 20
+
+
+@pytest.mark.asyncio
+async def test_convert_to_wav_async_bounded_concurrency():
+    """Test that concurrent conversions never exceed the configured limit."""
+    running = 0
+    peak = 0
+
+    async def fake_communicate(input=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return _pipe_wav(b""), b""
+
+    def make_process(*args, **kwargs):
+        process = MagicMock()
+        process.returncode = 0
+        process.communicate = fake_communicate
+        return process
+
+    with patch.object(audio_utils.settings, "FFMPEG_MAX_CONCURRENCY", 2), \
+            patch.object(audio_utils, "_ffmpeg_semaphore", None), \
+            patch("asyncio.create_subprocess_exec", new=AsyncMock(side_effect=make_process)):
+        await asyncio.gather(*(convert_to_wav_async(b"x", "webm") for _ in range(6)))
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_convert_to_wav_async_failure():
+    """Test that ffmpeg errors surface as conversion failures."""
+    process = MagicMock()
+    process.returncode = 1
+    process.communicate = AsyncMock(return_value=(b"", b"Invalid data found"))
+
+    with patch("asyncio.create_subprocess_exec", new=AsyncMock(return_value=process)):
+        with pytest.raises(Exception, match="Audio format conversion failed: Invalid data found"):
+            await convert_to_wav_async(b"garbage", "webm")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+async def test_convert_to_wav_async_real_ffmpeg():
+    """Test a real mu-law WAV conversion through ffmpeg."""
+    fmt = struct.pack("<HHIIHH", 0x0007, 1, 8000, 8000, 1, 8)
+    payload = b"\xff" * 8000
+    source = (
+        b"RIFF" + struct.pack("<I", 36 + len(payload)) + b"WAVE"
+        + b"fmt " + struct.pack("<I", 16) + fmt
+        + b"data" + struct.pack("<I", len(payload)) + payload
+    )
+    wav = await convert_to_wav_async(source, "audio/wav")
+
+    assert parse_wav_header(wav)[:6] == (1, 1, 16000, 16, 44, 32000)
+    assert struct.unpack_from("<I", wav, 4)[0] == len(wav) - 8
+
+
+def test_encode_wav_and_resample():
+    """Test NumPy resampling and WAV encoding of a 48kHz signal."""
+    t = np.arange(48000) / 48000
+    samples = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+    resampled = resample_audio(samples, 48000)
+    wav = encode_wav(resampled)
+
+    assert resampled.size == 16000
+    assert wav[:4] == b"RIFF"
+    assert struct.unpack_from("<I", wav, 24)[0] == 16000
+    assert struct.unpack_from("<I", wav, 40)[0] == 32000
+
+
+def test_get_audio_decoder_unknown_engine_falls_back():
+    """Test that an unknown engine name falls back to ffmpeg."""
+    assert get_audio_decoder("does-not-exist").name == "ffmpeg"
+
+
+def test_decoder_base_classes_are_abstract():
+    """Test that an engine missing to_wav (or decode, for in-process engines) cannot be created."""
+    class Incomplete(audio_utils.InProcessDecoder):
+        name = "incomplete"
+
+    for decoder_class in (audio_utils.AudioDecoder, audio_utils.InProcessDecoder, Incomplete):
+        with pytest.raises(TypeError):
+            decoder_class()
+
+
+@pytest.mark.asyncio
+async def test_in_process_decoder_failure_falls_back_to_ffmpeg():
+    """Test that in-process decode failures are retried with ffmpeg."""
+    decoder = MagicMock()
+    decoder.name = "soundfile"
+    decoder.supports.return_value = True
+    decoder.to_wav = AsyncMock(side_effect=RuntimeError("bad data"))
+
+    with patch.object(audio_utils, "get_audio_decoder", return_value=decoder), \
+            patch.object(audio_utils, "_ffmpeg_convert", new=AsyncMock(return_value=b"wav")) as mock_ffmpeg:
+        assert await convert_to_wav_async(b"data", "audio/flac") == b"wav"
+
+    mock_ffmpeg.assert_awaited_once_with(b"data", "flac")
+
+
+def test_parse_wav_header(sample_wav_data):
+    """Test RIFF header parsing of a canonical WAV."""
+    info = parse_wav_header(sample_wav_data)
+
+    assert info == (1, 1, 16000, 16, 44, 32000, 32000)
+    assert parse_wav_header(b"OggS" + b"\x00" * 40) is None
+
+
+def test_wav_fast_path_passthrough_is_zero_copy(sample_wav_data):
+    """Test that conformant WAV input is returned without copying."""
+    assert wav_fast_path(sample_wav_data) is sample_wav_data
+
+
+def test_wav_fast_path_downmix_and_resample():
+    """Test that 44.1kHz stereo 24-bit WAV is converted natively."""
+    frames = 44100
+    left = (np.sin(2 * np.pi * 300 * np.arange(frames) / 44100) * 0.5 * 8388607).astype(np.int32)
+    interleaved = np.stack([left, left], axis=1).reshape(-1)
+    payload = interleaved.astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    fmt = struct.pack("<HHIIHH", 1, 2, 44100, 44100 * 6, 6, 24)
+    wav = (
+        b"RIFF" + struct.pack("<I", 36 + len(payload)) + b"WAVE"
+        + b"fmt " + struct.pack("<I", 16) + fmt
+        + b"data" + struct.pack("<I", len(payload)) + payload
+    )
+
+    converted = wav_fast_path(wav)
+    info = parse_wav_header(converted)
+    samples = np.frombuffer(converted[44:], dtype="<i2")
+
+    assert (info.channels, info.sample_rate, info.bits_per_sample) == (1, 16000, 16)
+    assert samples.size == 16000
+    assert 0.3 < np.abs(samples).max() / 32768 < 0.55
+
+
+def test_wav_fast_path_rejects_compressed_wav():
+    """Test that non-PCM WAV codecs are left to ffmpeg."""
+    fmt = struct.pack("<HHIIHH", 0x0007, 1, 8000, 8000, 1, 8)  # mu-law
+    wav = b"RIFF" + struct.pack("<I", 40) + b"WAVE" + b"fmt " + struct.pack("<I", 16) + fmt + b"data" + struct.pack("<I", 4) + b"\x00" * 4
+
+    assert wav_fast_path(wav) is None
+
+
+@pytest.mark.asyncio
+async def test_convert_to_wav_async_skips_ffmpeg_for_wav(sample_wav_data):
+    """Test that WAV bytes never spawn a subprocess, whatever the MIME type says."""
+    with patch("asyncio.create_subprocess_exec") as mock_exec:
+        wav = await convert_to_wav_async(sample_wav_data, "audio/webm")
+
+    mock_exec.assert_not_called()
+    assert wav is sample_wav_data
+
+
+@pytest.mark.asyncio
+async def test_convert_audio_flac_from_wav_in_process(sample_wav_data):
+    """Test that WAV input is encoded to FLAC without spawning ffmpeg."""
+    pytest.importorskip("soundfile")
+    with patch("asyncio.create_subprocess_exec") as mock_exec:
+        flac = await convert_audio(sample_wav_data, "audio/wav", "flac")
+
+    mock_exec.assert_not_called()
+    assert flac[:4] == b"fLaC"
+    assert len(flac) < len(sample_wav_data)
+
+
+@pytest.mark.asyncio
+async def test_convert_audio_remuxes_opus_input():
+    """Test that Opus in Ogg/WebM is copied into Ogg instead of re-encoded."""
+    opus_head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, 312, 48000, 0, 0)
+    ogg = b"OggS" + struct.pack("<BBqIIIB", 0, 2, 0, 1, 0, 0, 1) + bytes([len(opus_head)]) + opus_head
+
+    with patch.object(audio_utils, "_ffmpeg_convert", new=AsyncMock(return_value=b"OggS")) as mock_ffmpeg:
+        assert await convert_audio(ogg, "audio/ogg", "opus") == b"OggS"
+
+    mock_ffmpeg.assert_awaited_once_with(ogg, "audio/ogg", "opus", remux=True)
+    assert _build_ffmpeg_command(output_format="opus", remux=True)[-4:-1] == ["copy", "-f", "ogg"]
+
+
+@pytest.mark.asyncio
+async def test_convert_audio_unknown_format():
+    """Test that unsupported output formats are rejected."""
+    with pytest.raises(Exception, match="Unsupported output format: mp3"):
+        await convert_audio(b"data", "webm", "mp3")
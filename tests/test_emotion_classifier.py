@@ -0,0 +1,58 @@
+"""
+Unit tests for the vectorized emotion classifier and batch detection.
+"""
+import itertools
+import logging
+import numpy as np
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.modules.emotion_detection.classifier import ATTRIBUTE_NAMES, classify_batch
+from app.modules.emotion_detection.service import EmotionDetectionService, emotion_detection_service
+
+
+def test_classify_batch_matches_scalar_classifier():
+    """Test identical labels to _classify_emotion on a grid around every rule threshold."""
+    grid = itertools.product(
+        [20, 24.5, 25, 26, 28, 28.5, 30, 32, 35, 35.5, 36, 37, 38, np.nan],
+        [0.1, 0.18, 0.19, 0.2, 0.22, 0.25, 0.3, 0.31],
+        [0.2, 0.3, 0.35, 0.4, 0.8, 0.9, 1.0, 1.2, 1.3, 1.4, 1.5],
+        [0.5, 0.7, 0.75, 0.85, 1.1, 1.2, 1.3, 1.4],
+    )
+    rows = np.array(list(grid))
+    service = EmotionDetectionService()
+
+    logging.disable(logging.INFO)  # The scalar classifier logs every rule
+    try:
+        expected = [service._classify_emotion(dict(zip(ATTRIBUTE_NAMES, row))) for row in rows]
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert classify_batch(rows) == expected
+
+
+def test_classify_batch_empty():
+    """Test that an empty batch classifies to an empty list."""
+    assert classify_batch(np.empty((0, 4))) == []
+
+
+def test_detect_batch_endpoint_preserves_order():
+    """Test the batch endpoint: one pass over all clips, results in upload order."""
+    attributes = [
+        {"pitch_mean": 33.0, "pitch_std": 0.4, "loudness_mean": 1.0, "loudness_std": 1.0},
+        {"pitch_mean": 22.0, "pitch_std": 0.1, "loudness_mean": 0.2, "loudness_std": 0.5},
+    ]
+
+    async def fake_extract(audio_data, filename, fast=False):
+        return attributes[int(audio_data)]
+
+    with patch.object(emotion_detection_service, "opensmile_available", True), \
+            patch.object(emotion_detection_service, "_extract_attributes", new=AsyncMock(side_effect=fake_extract)):
+        response = TestClient(app).post(
+            "/api/emotion/detect-batch",
+            files=[("audios", ("a.wav", b"0", "audio/wav")), ("audios", ("b.wav", b"1", "audio/wav"))],
+        )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(r["filename"], r["emotion"]) for r in results] == [("a.wav", "happy"), ("b.wav", "sad")]
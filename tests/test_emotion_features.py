@@ -0,0 +1,87 @@
+"""
+Tests for the NumPy pitch and loudness feature engine.
+"""
+import numpy as np
+import pytest
+
+from app.modules.emotion_detection.features import extract_attributes, pitch_semitones
+from app.modules.emotion_detection.sampling import downsample, select_voiced_windows
+
+SAMPLE_RATE = 16000
+
+
+def make_voice(f0: float, seconds: float = 2.0, amplitude: float = 0.3) -> np.ndarray:
+    """Harmonic tone with vibrato and syllable-rate amplitude modulation."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.1 * np.sin(2 * np.pi * 0.7 * t))) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.1 + 0.9 * 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    return (amplitude * voice * envelope / 3).astype(np.float32)
+
+
+def test_pitch_of_pure_tone():
+    """Test YIN pitch in semitones from 27.5 Hz on a steady tone."""
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    f0 = pitch_semitones((0.5 * np.sin(2 * np.pi * 110 * t)).astype(np.float32), SAMPLE_RATE)
+
+    assert np.all(f0 > 0)
+    assert f0 == pytest.approx(24.0, abs=0.05)  # 110 Hz is two octaves above 27.5 Hz
+
+
+def test_silence_has_no_pitch_or_loudness():
+    """Test that silence yields zero attributes instead of NaNs."""
+    attributes = extract_attributes(np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+
+    assert attributes == {"pitch_mean": 0.0, "pitch_std": 0.0, "loudness_mean": 0.0, "loudness_std": 0.0}
+
+
+def test_short_signal():
+    """Test that clips shorter than one pitch frame do not fail."""
+    attributes = extract_attributes(np.zeros(100, dtype=np.float32), SAMPLE_RATE)
+
+    assert attributes["pitch_mean"] == 0.0
+
+
+@pytest.mark.parametrize("f0, amplitude", [(110, 0.2), (180, 0.4), (260, 0.8)])
+def test_matches_opensmile(f0, amplitude):
+    """Test that the four attributes track OpenSmile eGeMAPSv02 on voiced speech-like audio."""
+    pytest.importorskip("opensmile")
+    from app.modules.emotion_detection.worker import build_smile
+
+    signal = make_voice(f0, amplitude=amplitude)
+    row = build_smile("emotion_minimal").process_signal(signal, SAMPLE_RATE).iloc[0]
+    attributes = extract_attributes(signal, SAMPLE_RATE)
+
+    assert attributes["pitch_mean"] == pytest.approx(row["F0semitoneFrom27.5Hz_sma3nz_amean"], abs=0.1)
+    assert attributes["pitch_std"] == pytest.approx(row["F0semitoneFrom27.5Hz_sma3nz_stddevNorm"], abs=0.005)
+    assert attributes["loudness_mean"] == pytest.approx(row["loudness_sma3_amean"], rel=0.02)
+    assert attributes["loudness_std"] == pytest.approx(row["loudness_sma3_stddevNorm"], rel=0.05)
+
+
+def test_select_voiced_windows_strides_over_speech():
+    """Test the window budget: silent windows are skipped and picks span the recording."""
+    window = SAMPLE_RATE  # 1 s windows
+    speech = make_voice(150, seconds=1.0)
+    silence = np.zeros(window, dtype=np.float32)
+    # Speech in even seconds, each window scaled differently so it can be identified
+    signal = np.concatenate([speech * (1 + i / 100) if i % 2 == 0 else silence for i in range(20)])
+
+    selected = select_voiced_windows(signal, SAMPLE_RATE, 1.0, max_windows=4)
+
+    assert selected.size == 4 * window
+    picked = [round((np.abs(w).max() / np.abs(speech).max() - 1) * 100) for w in selected.reshape(4, window)]
+    assert picked == [0, 6, 12, 18]
+    # Within budget: the signal is returned as is
+    assert select_voiced_windows(signal, SAMPLE_RATE, 1.0, max_windows=20) is signal
+
+
+def test_downsample_to_8khz():
+    """Test integer-factor decimation keeps in-band tones and the pitch estimate."""
+    signal = make_voice(150)
+    decimated, rate = downsample(signal, SAMPLE_RATE, 8000)
+
+    assert rate == 8000
+    assert decimated.size == signal.size // 2
+    assert extract_attributes(decimated, rate)["pitch_mean"] == pytest.approx(
+        extract_attributes(signal, SAMPLE_RATE)["pitch_mean"], abs=0.2
+    )
@@ -0,0 +1,65 @@
+"""
+Tests for the incremental per-session emotion timeline.
+"""
+import numpy as np
+import pytest
+
+from app.modules.emotion_detection.timeline import EmotionTimelineStore, RunningStats, SessionTimeline
+
+
+def test_running_stats_match_numpy():
+    """Test that merging chunk by chunk gives the mean and CV of all values at once."""
+    rng = np.random.default_rng(0)
+    chunks = [rng.normal(30, 3, size) for size in (1, 250, 0, 1000, 37)]
+
+    stats = RunningStats()
+    for chunk in chunks:
+        stats.add(chunk)
+
+    values = np.concatenate(chunks)
+    mean, cv = stats.mean_and_cv()
+    assert stats.count == values.size
+    assert mean == pytest.approx(values.mean(), rel=1e-12)
+    assert cv == pytest.approx(values.std() / values.mean(), rel=1e-9)
+
+
+def test_empty_running_stats():
+    """Test that a session without voiced frames reports zeros."""
+    assert RunningStats().mean_and_cv() == (0.0, 0.0)
+
+
+def test_session_aggregates_without_double_counting():
+    """Test session attributes over all chunks, labels per chunk, and that a retried chunk is ignored."""
+    rng = np.random.default_rng(1)
+    pitch = [rng.normal(28, 2, 300), rng.normal(40, 4, 200)]
+    loudness = [rng.uniform(0.1, 0.4, 400), rng.uniform(1.0, 2.0, 400)]
+    session = SessionTimeline("s1")
+
+    first = session.add_chunk(0, pitch[0], loudness[0], 4.0)
+    session.add_chunk(1, pitch[1], loudness[1], 4.0)
+    retried = session.add_chunk(0, pitch[1], loudness[1], 4.0)
+
+    all_pitch, all_loudness = np.concatenate(pitch), np.concatenate(loudness)
+    attributes = session.attributes()
+    assert retried is first
+    assert session.seconds == 8.0
+    assert attributes["pitch_mean"] == pytest.approx(all_pitch.mean())
+    assert attributes["loudness_std"] == pytest.approx(all_loudness.std() / all_loudness.mean())
+    assert first["attributes"]["pitch_mean"] == pytest.approx(pitch[0].mean())
+    assert [entry["chunk_index"] for entry in session.timeline()] == [0, 1]
+    assert session.timeline()[-1]["session_emotion"] == session.session_emotion
+
+
+def test_store_evicts_least_recently_used(monkeypatch):
+    """Test that the store keeps at most EMOTION_TIMELINE_MAX_SESSIONS sessions."""
+    monkeypatch.setattr("app.modules.emotion_detection.timeline.settings.EMOTION_TIMELINE_MAX_SESSIONS", 2)
+    store = EmotionTimelineStore()
+
+    store.get_or_create("a")
+    store.get_or_create("b")
+    store.get_or_create("a")
+    store.get_or_create("c")
+
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") is not None
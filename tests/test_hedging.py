@@ -0,0 +1,99 @@
+"""
+Unit tests for hedged upstream requests.
+"""
+import asyncio
+import pytest
+from app.core.hedging import Hedger
+
+
+def make_hedger(max_rate: float = 0.5) -> Hedger:
+    hedger = Hedger("test", percentile=90.0, min_delay_seconds=0.01, max_rate=max_rate, window_size=50, min_samples=5)
+    hedger.latencies.extend([0.02] * 40)  # Learned p90: 20 ms
+    return hedger
+
+
+def requests_taking(*seconds):
+    """Operation whose successive calls take the given times; records which calls were cancelled."""
+    calls = {"started": 0, "cancelled": []}
+
+    async def operation():
+        index = calls["started"]
+        calls["started"] += 1
+        try:
+            await asyncio.sleep(seconds[index])
+        except asyncio.CancelledError:
+            calls["cancelled"].append(index)
+            raise
+        return f"response {index}"
+    return operation, calls
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_loser_cancelled():
+    """Test that a call past the learned percentile gets a hedge, and the slower request is cancelled."""
+    hedger = make_hedger()
+    operation, calls = requests_taking(1.0, 0.01)
+
+    result = await hedger.run(operation)
+    await asyncio.sleep(0)
+
+    assert result == "response 1"
+    assert calls["cancelled"] == [0]
+    assert hedger.get_state()["hedged"] == 1 and hedger.hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_primary_latency_is_recorded_as_lower_bound():
+    """Test that a primary cancelled by a winning hedge still adds the time it ran to the latencies."""
+    hedger = make_hedger()
+    operation, calls = requests_taking(1.0, 0.05)
+
+    await hedger.run(operation)
+    await asyncio.sleep(0)
+
+    recorded = list(hedger.latencies)[40:]
+    assert calls["cancelled"] == [0]
+    assert len(recorded) == 2  # The winning hedge and the cancelled primary
+    assert max(recorded) >= 0.06  # Hedge delay plus the hedge's own 50 ms
+
+
+@pytest.mark.asyncio
+async def test_cancelled_hedge_latency_is_not_recorded():
+    """Test that a hedge cancelled because the original request answered first is not recorded."""
+    hedger = make_hedger()
+    operation, calls = requests_taking(0.05, 1.0)
+
+    assert await hedger.run(operation) == "response 0"
+    await asyncio.sleep(0)
+
+    assert calls["cancelled"] == [1]
+    assert len(hedger.latencies) == 41
+
+
+@pytest.mark.asyncio
+async def test_fast_call_and_disabled_hedging_are_only_timed():
+    """Test that no hedge is sent for calls within the percentile or with hedging off."""
+    hedger = make_hedger()
+
+    fast, fast_calls = requests_taking(0.001)
+    assert await hedger.run(fast) == "response 0"
+    slow, slow_calls = requests_taking(0.05)
+    assert await hedger.run(slow, hedge=False) == "response 0"
+
+    assert fast_calls["started"] == slow_calls["started"] == 1
+    assert hedger.hedged == 0
+    assert len(hedger.latencies) == 42
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_is_capped():
+    """Test that hedges stop once the HEDGE_MAX_RATE share of calls has been hedged."""
+    hedger = make_hedger(max_rate=0.25)
+
+    for _ in range(4):
+        operation, _ = requests_taking(0.05, 0.001)
+        await hedger.run(operation)
+
+    state = hedger.get_state()
+    assert state["hedged"] == 1  # The bucket starts with one hedge and earns a quarter per call
+    assert state["capped"] == 3
@@ -0,0 +1,150 @@
+"""
+Unit tests for Deepgram live-streaming transcription, against the local stand-in server.
+"""
+import asyncio
+import numpy as np
+import pytest
+import pytest_asyncio
+from unittest.mock import patch, AsyncMock
+from app.core.audio_utils import encode_wav
+from app.core.upstream_guard import UpstreamUnavailableError, get_upstream_guard
+from app.modules.speech_to_text.live import ChunkAlreadySentError, LiveTranscriber, LiveTranscriptionPool
+from app.modules.speech_to_text.live_standin import DeepgramStandin
+from app.modules.speech_to_text.service import SpeechToTextService
+
+
+def tone_wav(seconds: float) -> bytes:
+    t = np.arange(int(seconds * 16000)) / 16000
+    return encode_wav((0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+
+
+@pytest.fixture(autouse=True)
+def fresh_guards():
+    """Give each test its own upstream guards, so failures do not leak into other tests."""
+    with patch.dict("app.core.upstream_guard._guards", clear=True):
+        yield
+
+
+@pytest_asyncio.fixture
+async def standin():
+    server = DeepgramStandin(transcribe=lambda pcm, sr: (f"hola {len(pcm) // (2 * sr)} segundos", "es"))
+    url = await server.start()
+    yield server, url
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_session_chunks_share_one_stream(standin):
+    """Test that a session's chunks go over one websocket, each with its own final transcript."""
+    server, url = standin
+    service = SpeechToTextService()
+    service.live_sessions = LiveTranscriptionPool("test-key", url)
+
+    first = await service.transcribe_stream("session-1", tone_wav(2.0), "audio/wav")
+    second = await service.transcribe_stream("session-1", tone_wav(1.0), "audio/wav", is_final=True)
+
+    assert len(server.connections) == 1
+    params = server.connections[0]["params"]
+    assert params["encoding"] == "linear16" and params["sample_rate"] == "16000"
+    assert server.connections[0]["authorization"] == "Token test-key"
+    assert first["text"] == "hola 2 segundos"
+    assert first["language_code"] == "es" and first["language"] == "Spanish"
+    assert first["interim"]  # 2s of audio at one interim result per 0.5s
+    assert second["text"] == "hola 1 segundos"
+    assert len(service.live_sessions) == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_evicts_least_recently_used_stream(standin):
+    """Test that the pool never holds more than DEEPGRAM_LIVE_MAX_SESSIONS streams."""
+    _, url = standin
+    pool = LiveTranscriptionPool("test-key", url)
+
+    with patch("app.modules.speech_to_text.live.settings.DEEPGRAM_LIVE_MAX_SESSIONS", 2):
+        for session_id in ("a", "b", "a", "c"):
+            await pool.transcribe_chunk(session_id, b"\x00\x00" * 1600)
+
+    assert list(pool._sessions) == ["a", "c"]
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_to_prerecorded_request():
+    """Test that an unreachable live endpoint falls back to a pre-recorded request."""
+    service = SpeechToTextService()
+    service.live_sessions = LiveTranscriptionPool("test-key", "ws://127.0.0.1:9/v1/listen")
+    fallback = {"language": "English", "language_code": "en", "text": "hello"}
+
+    with patch.object(service, "transcribe_audio", new=AsyncMock(return_value=fallback)) as mock_transcribe:
+        result = await service.transcribe_stream("session-1", tone_wav(1.0), "audio/wav")
+
+    mock_transcribe.assert_awaited_once()
+    assert result == {**fallback, "interim": []}
+
+
+@pytest.mark.asyncio
+async def test_retried_chunk_is_not_sent_twice(standin):
+    """Test that a retried chunk_index returns its stored result without pushing the audio again."""
+    _, url = standin
+    pool = LiveTranscriptionPool("test-key", url)
+    second = b"\x00\x00" * 16000
+
+    first = await pool.transcribe_chunk("session-1", second * 2, chunk_index=0)
+    connection = pool._sessions["session-1"]._connection
+    with patch.object(connection, "send", new=AsyncMock(wraps=connection.send)) as mock_send:
+        retried = await pool.transcribe_chunk("session-1", second * 2, chunk_index=0)
+        mock_send.assert_not_awaited()
+        following = await pool.transcribe_chunk("session-1", second, chunk_index=1)
+        mock_send.assert_awaited()
+
+    assert retried == first and retried["text"] == "hola 2 segundos"
+    assert following["text"] == "hola 1 segundos"
+
+    with patch("app.modules.speech_to_text.live.REPLAY_CHUNKS", 0):
+        await pool.transcribe_chunk("session-1", second, chunk_index=2)
+    with pytest.raises(ChunkAlreadySentError):
+        await pool.transcribe_chunk("session-1", second, chunk_index=2)
+    assert len(pool) == 1  # A stale retry leaves the stream open
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_slow_connect_does_not_block_other_sessions(standin):
+    """Test that a hanging handshake only holds up its own session and is bounded by the connect timeout."""
+    _, url = standin
+    pool = LiveTranscriptionPool("test-key", url)
+    real_start = LiveTranscriber.start
+
+    async def start(transcriber):
+        if transcriber.session_id == "slow":
+            await asyncio.sleep(60)
+        await real_start(transcriber)
+
+    with patch.object(LiveTranscriber, "start", start), \
+            patch("app.modules.speech_to_text.live.settings.DEEPGRAM_LIVE_CONNECT_TIMEOUT_SECONDS", 0.5):
+        slow = asyncio.create_task(pool.transcribe_chunk("slow", b"\x00\x00" * 1600))
+        slow_retry = asyncio.create_task(pool.transcribe_chunk("slow", b"\x00\x00" * 1600))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(pool.transcribe_chunk("fast", b"\x00\x00" * 1600), timeout=0.4)
+        await asyncio.wait_for(pool.close_session("fast"), timeout=0.4)
+        assert not slow.done()
+
+        for task in (slow, slow_retry):
+            with pytest.raises(Exception, match="connecting took longer"):
+                await task
+
+    assert len(pool) == 0 and not pool._opening
+
+
+@pytest.mark.asyncio
+async def test_failed_connects_open_the_deepgram_circuit():
+    """Test that live-stream connect failures count towards the Deepgram upstream guard."""
+    pool = LiveTranscriptionPool("test-key", "ws://127.0.0.1:9/v1/listen")
+
+    for _ in range(5):
+        with pytest.raises(Exception):
+            await pool.transcribe_chunk("session-1", b"\x00\x00" * 1600)
+
+    assert get_upstream_guard("deepgram").get_state()["state"] == "open"
+    with pytest.raises(UpstreamUnavailableError):
+        await pool.transcribe_chunk("session-1", b"\x00\x00" * 1600)
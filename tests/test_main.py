@@ -2,6 +2,7 @@
 Unit tests for main API endpoints.
 """
 import pytest
+from contextlib import ExitStack
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock
 from app.main import app
@@ -84,6 +85,52 @@ async def test_process_audio_integration(
     assert data["emotion"] == "happy"
 
 
+def test_pre_process_chunk_returns_only_current_timeline_entry(sample_wav_data):
+    """Test that a stream session chunk reports its own timeline entry and the session emotion, not the history."""
+    entry = {"chunk_index": 3, "duration_seconds": 1.0, "emotion": "happy", "attributes": {}, "session_emotion": "sad"}
+    tracked = {
+        "emotion": "happy",
+        "attributes": {"pitch_mean": 40.0},
+        "session_emotion": "sad",
+        "session_attributes": {},
+        "timeline_entry": entry,
+    }
+    with patch("app.main.speech_to_text_service.transcribe_audio", new=AsyncMock(return_value={
+                "language": "English", "language_code": "en", "text": "Hello"})), \
+            patch("app.main.emotion_detection_service.track_chunk", new=AsyncMock(return_value=tracked)), \
+            patch("app.main.translation_service.translate_text", new=AsyncMock(return_value={
+                "translated_text": "Hola", "source_language": "en", "target_language": "es"})):
+        response = client.post(
+            "/api/pre-process-chunk",
+            files={"audio": ("chunk.wav", sample_wav_data, "audio/wav")},
+            data={"chunk_index": "3", "session_id": "timeline-session"},
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["session_emotion"] == "sad"
+    assert data["emotion_timeline_entry"] == entry
+    assert "emotion_timeline" not in data
+
+
+def test_pre_process_chunk_returns_interim_transcripts(sample_wav_data):
+    """Test that live-streaming interim hypotheses reach the pre-process-chunk response."""
+    transcription = {"language": "English", "language_code": "en", "text": "Hello there", "interim": ["Hello"]}
+    with patch("app.main.settings.STT_STREAMING_ENABLED", True), \
+            patch("app.main.speech_to_text_service.transcribe_stream", new=AsyncMock(return_value=transcription)), \
+            patch("app.main.emotion_detection_service.track_chunk", new=AsyncMock(side_effect=Exception("no audio"))), \
+            patch("app.main.translation_service.translate_text", new=AsyncMock(return_value={
+                "translated_text": "Hola", "source_language": "en", "target_language": "es"})):
+        response = client.post(
+            "/api/pre-process-chunk",
+            files={"audio": ("chunk.wav", sample_wav_data, "audio/wav")},
+            data={"chunk_index": "0", "session_id": "live-session"},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["interim_transcripts"] == ["Hello"]
+
+
 def test_process_audio_invalid_file():
     """Test process audio with invalid file format."""
     files = {
@@ -101,3 +148,36 @@ def test_api_docs_available():
     
     response = client.get("/redoc")
     assert response.status_code == 200
+
+
+def test_app_import_defers_heavy_modules():
+    """Test that importing the app leaves OpenSmile, pandas and Redis to startup (cold-start budget)."""
+    from benchmarks.import_time import DEFERRED_MODULES, measure
+
+    profile = measure("app.main")
+
+    assert not profile["modules"] & set(DEFERRED_MODULES)
+
+
+def test_lifespan_warms_up_services():
+    """Test that every service is warmed up once at startup and cleaned up at shutdown."""
+    from app import main
+
+    services = [
+        main.speech_to_text_service,
+        main.emotion_detection_service,
+        main.translation_service,
+        main.text_to_speech_service,
+    ]
+    with ExitStack() as stack:
+        mocks = [
+            (stack.enter_context(patch.object(service, "start", new=AsyncMock())),
+             stack.enter_context(patch.object(service, "cleanup", new=AsyncMock())))
+            for service in services
+        ]
+        with TestClient(app):
+            pass
+
+    for start, cleanup in mocks:
+        start.assert_awaited_once()
+        cleanup.assert_awaited_once()
@@ -0,0 +1,126 @@
+"""
+Tests for the content-addressed result cache.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.redis_client import RedisClient
+from app.core.result_cache import ResultCache, content_key
+
+
+@pytest.mark.asyncio
+async def test_hit_miss_and_copy():
+    """Test that hits return an independent copy and counters are kept."""
+    cache = ResultCache("test", max_bytes=1024, ttl_seconds=60)
+    assert await cache.get("a") is None
+
+    await cache.set("a", {"pitch_mean": 30.0})
+    first = await cache.get("a")
+    first["pitch_mean"] = 0.0
+
+    assert await cache.get("a") == {"pitch_mean": 30.0}
+    assert cache.get_metrics()["hits"] == 2
+    assert cache.get_metrics()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used_beyond_max_bytes():
+    """Test the byte bound: the least recently used entry goes first."""
+    cache = ResultCache("test", max_bytes=40, ttl_seconds=60)
+    await cache.set("a", "x" * 10)  # 1 + 12 bytes
+    await cache.set("b", "y" * 10)
+    await cache.get("a")
+    await cache.set("c", "z" * 10)
+    await cache.set("d", "w" * 10)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "x" * 10
+    metrics = cache.get_metrics()
+    assert metrics["bytes"] <= 40
+    assert metrics["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_misses():
+    """Test that entries past their TTL are dropped."""
+    cache = ResultCache("test", max_bytes=1024, ttl_seconds=10)
+    with patch("app.core.result_cache.time.monotonic", return_value=100.0):
+        await cache.set("a", 1)
+    with patch("app.core.result_cache.time.monotonic", return_value=111.0):
+        assert await cache.get("a") is None
+    assert cache.get_metrics()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_shares_results():
+    """Test that a local miss falls through to Redis and is then served locally."""
+    cache = ResultCache("emotion", max_bytes=1024, ttl_seconds=60, use_redis=True)
+    with patch("app.core.result_cache.redis_client") as mock_client:
+        mock_client.redis = MagicMock()
+        mock_client.get = AsyncMock(return_value='{"emotion": "happy"}')
+        mock_client.set = AsyncMock(return_value=True)
+
+        assert await cache.get("k") == {"emotion": "happy"}
+        assert await cache.get("k") == {"emotion": "happy"}
+        await cache.set("other", {"emotion": "sad"})
+
+    mock_client.get.assert_awaited_once_with("emotion:k")
+    mock_client.set.assert_awaited_once_with("emotion:other", '{"emotion": "sad"}', ex=60)
+    assert cache.get_metrics()["redis_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_single_flight():
+    """Test that concurrent misses share one computation and failures are not cached."""
+    cache = ResultCache("test", max_bytes=1024, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"text": "hola"}
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+    assert results == [{"text": "hola"}] * 5
+    assert len(calls) == 1
+    assert await cache.get_or_compute("k", compute) == {"text": "hola"}
+    assert len(calls) == 1
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("other", failing)
+    assert await cache.get("other") is None
+
+    metrics = cache.get_metrics()
+    assert metrics["coalesced"] == 4
+    assert metrics["hit_rate"] == round(metrics["hits"] / (metrics["hits"] + metrics["misses"]), 3)
+
+
+@pytest.mark.asyncio
+async def test_failed_redis_connect_keeps_cache_in_process():
+    """Test that a Redis that fails its ping is not used for later lookups."""
+    client = RedisClient()
+    dead = MagicMock()
+    dead.ping = AsyncMock(side_effect=ConnectionError("refused"))
+    dead.close = AsyncMock()
+
+    with patch("redis.asyncio.Redis", return_value=dead), pytest.raises(ConnectionError):
+        await client.connect()
+    assert client.redis is None
+
+    cache = ResultCache("translation", max_bytes=1024, ttl_seconds=60, use_redis=True)
+    with patch("app.core.result_cache.redis_client", client):
+        assert await cache.get("k") is None
+        await cache.set("k", {"text": "hola"})
+    dead.get.assert_not_called()
+    dead.set.assert_not_called()
+
+
+def test_content_key():
+    """Test that the key depends only on the bytes."""
+    assert content_key(b"audio") == content_key(bytes(b"audio"))
+    assert content_key(b"audio") != content_key(b"audio2")
+    assert len(content_key(b"")) == 32
@@ -0,0 +1,97 @@
+"""
+Unit tests for the shared upstream retry policy.
+"""
+import httpx
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.core.retry import RetryBudget, RetryPolicy, deadline_scope
+from app.modules.translation.service import TranslationService
+
+
+def make_policy(budget_tokens: float = 10.0) -> RetryPolicy:
+    return RetryPolicy(
+        "test",
+        max_attempts=3,
+        base_delay_seconds=0.5,
+        max_delay_seconds=8.0,
+        max_elapsed_seconds=30.0,
+        budget=RetryBudget(ratio=0.2, max_tokens=budget_tokens),
+    )
+
+
+def status_error(status_code: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://upstream.test")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def flaky(*errors):
+    """Operation that raises the given errors in turn, then returns "ok"."""
+    outcomes = list(errors)
+
+    async def operation():
+        if outcomes:
+            raise outcomes.pop(0)
+        return "ok"
+    return operation
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors_honouring_retry_after():
+    """Test that 429/5xx and transport errors are retried, after Retry-After when sent."""
+    policy = make_policy()
+    operation = flaky(status_error(429, {"Retry-After": "2"}), httpx.ConnectError("refused"))
+
+    with patch("asyncio.sleep", new=AsyncMock()) as mock_sleep:
+        assert await policy.run(operation) == "ok"
+
+    delays = [call.args[0] for call in mock_sleep.await_args_list]
+    assert delays[0] == 2.0
+    assert 0.5 <= delays[1] <= 6.0  # Decorrelated jitter: between base and 3x the previous delay
+    assert policy.budget.retries == 2
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    """Test that a 4xx other than 429 fails on the first attempt."""
+    policy = make_policy()
+
+    with patch("asyncio.sleep", new=AsyncMock()) as mock_sleep, pytest.raises(httpx.HTTPStatusError):
+        await policy.run(flaky(status_error(400)))
+
+    mock_sleep.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_budget_and_deadline_stop_retries():
+    """Test that an empty retry budget or a close request deadline prevents a retry."""
+    policy = make_policy(budget_tokens=1.0)
+    policy.budget.tokens = 0.0
+
+    with patch("asyncio.sleep", new=AsyncMock()), pytest.raises(httpx.HTTPStatusError):
+        await policy.run(flaky(status_error(503)))
+    assert policy.budget.exhausted == 1
+
+    policy = make_policy()
+    with deadline_scope(1.0), pytest.raises(httpx.HTTPStatusError):
+        await policy.run(flaky(status_error(503, {"Retry-After": "5"})))
+    assert policy.budget.retries == 0
+
+
+@pytest.mark.asyncio
+async def test_translation_retries_rate_limited_request():
+    """Test that a 429 from DeepL is retried instead of failing the translation."""
+    ok = MagicMock()
+    ok.json.return_value = {"translations": [{"text": "Hola", "detected_source_language": "EN"}]}
+    ok.raise_for_status = MagicMock()
+    limited = MagicMock()
+    limited.raise_for_status = MagicMock(side_effect=status_error(429, {"Retry-After": "1"}))
+
+    service = TranslationService()
+    service.retry = make_policy()
+    with patch("httpx.AsyncClient.post", new=AsyncMock(side_effect=[limited, ok])) as mock_post, \
+            patch("asyncio.sleep", new=AsyncMock()):
+        result = await service.translate_text("Hello", "en", "es")
+
+    assert result["translated_text"] == "Hola"
+    assert mock_post.await_count == 2
@@ -1,9 +1,17 @@
 """
 Unit tests for individual services.
 """
+import asyncio
+import threading
+import numpy as np
 import pytest
+from fastapi import HTTPException
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, AsyncMock, MagicMock
+from app.core.audio_utils import decode_to_float32, encode_wav
+from app.modules.emotion_detection.classifier import NEUTRAL_ATTRIBUTES
 from app.modules.speech_to_text.service import SpeechToTextService
+from app.modules.emotion_detection.features import frame_descriptors
 from app.modules.emotion_detection.service import EmotionDetectionService
 from app.modules.translation.service import TranslationService
 from app.modules.text_to_speech.service import TextToSpeechService
@@ -14,7 +22,7 @@ class TestSpeechToTextService:
     """Tests for Speech-to-Text service."""
     
     @patch("httpx.AsyncClient.post")
-    async def test_transcribe_audio_success(self, mock_post):
+    async def test_transcribe_audio_success(self, mock_post, sample_wav_data):
         """Test successful audio transcription."""
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -33,27 +41,360 @@ class TestSpeechToTextService:
         mock_post.return_value = mock_response
         
         service = SpeechToTextService()
-        result = await service.transcribe_audio(b"fake_audio", "audio/wav")
+        result = await service.transcribe_audio(sample_wav_data, "audio/wav")
         
         assert result["text"] == "Hello world"
         assert result["language"] == "English"
         assert result["language_code"] == "en"
 
+    @patch("httpx.AsyncClient.post")
+    async def test_transcribe_audio_flac_upload(self, mock_post, sample_wav_data):
+        """Test that DEEPGRAM_UPLOAD_FORMAT=flac uploads FLAC with a matching Content-Type."""
+        pytest.importorskip("soundfile")
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "results": {"channels": [{"alternatives": [{"transcript": "Hi"}], "detected_language": "en"}]}
+        }
+        mock_response.raise_for_status = MagicMock()
+        mock_post.return_value = mock_response
+
+        with patch("app.modules.speech_to_text.service.settings.DEEPGRAM_UPLOAD_FORMAT", "flac"):
+            await SpeechToTextService().transcribe_audio(sample_wav_data, "audio/wav")
+
+        kwargs = mock_post.call_args.kwargs
+        assert kwargs["headers"]["Content-Type"] == "audio/flac"
+        assert kwargs["content"][:4] == b"fLaC"
+
+    @patch("httpx.AsyncClient.post")
+    async def test_session_language_is_locked_after_confident_chunks(self, mock_post, sample_wav_data):
+        """Test that detect_language is replaced by the confirmed language, and restored on low confidence."""
+        def response(confidence, language_confidence=0.95):
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "results": {"channels": [{
+                    "alternatives": [{"transcript": "Hola", "confidence": confidence}],
+                    "detected_language": "es",
+                    "language_confidence": language_confidence,
+                }]}
+            }
+            return mock_response
+        mock_post.side_effect = [response(0.9), response(0.9), response(0.3), response(0.9)]
+
+        service = SpeechToTextService()
+        results = [await service.transcribe_audio(sample_wav_data, "audio/wav", session_id="s1") for _ in range(4)]
+
+        sent = [call.kwargs["params"] for call in mock_post.call_args_list]
+        assert [params.get("detect_language") for params in sent] == ["true", "true", None, "true"]
+        assert sent[2]["language"] == "es"
+        assert all(result["language_code"] == "es" and "language_confidence" not in result for result in results)
+
+    async def test_upload_of_target_wav_is_piped_to_deepgram(self, sample_wav_data):
+        """Test that a 16kHz mono WAV upload is streamed as the request body, unconverted."""
+        received = []
+
+        async def fake_post(url, headers, params, content):
+            async for chunk in content:
+                received.append(chunk)
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "results": {"channels": [{"alternatives": [{"transcript": "Hi"}], "detected_language": "en"}]}
+            }
+            return mock_response
+
+        async def upload():
+            for start in range(0, len(sample_wav_data), 4096):
+                yield sample_wav_data[start:start + 4096]
+
+        service = SpeechToTextService()
+        with patch("httpx.AsyncClient.post", side_effect=fake_post), \
+                patch("app.modules.speech_to_text.service.convert_audio") as mock_convert:
+            result = await service.transcribe_upload(upload(), "audio/wav", size=len(sample_wav_data))
+
+        mock_convert.assert_not_called()
+        assert len(received) > 1
+        assert b"".join(received) == sample_wav_data
+        assert result == {"language": "English", "language_code": "en", "text": "Hi"}
+
+    async def test_upload_needing_conversion_is_buffered(self):
+        """Test that a WAV in another layout is read whole and transcribed through transcribe_long."""
+        wav = encode_wav(np.zeros(8000, dtype=np.float32), sample_rate=8000)
+
+        async def upload():
+            yield wav[:100]
+            yield wav[100:]
+
+        service = SpeechToTextService()
+        with patch.object(service, "transcribe_long", new=AsyncMock(return_value={"text": ""})) as mock_long:
+            await service.transcribe_upload(upload(), "audio/wav", size=len(wav))
+
+        mock_long.assert_awaited_once_with(wav, "audio/wav")
+
+    async def test_upload_without_size_is_piped_by_wav_header(self, sample_wav_data):
+        """Test that a chunked upload (no Content-Length) is piped using the header's data size."""
+        received = []
+
+        async def fake_post(url, headers, params, content):
+            async for chunk in content:
+                received.append(chunk)
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"results": {"channels": [{"alternatives": [{"transcript": "Hi"}]}]}}
+            return mock_response
+
+        async def upload():
+            yield sample_wav_data[:4096]
+            yield sample_wav_data[4096:] + b"LIST\x04\x00\x00\x00INFO"
+
+        service = SpeechToTextService()
+        with patch("httpx.AsyncClient.post", side_effect=fake_post):
+            await service.transcribe_upload(upload(), "audio/wav")
+
+        assert b"".join(received) == sample_wav_data
+
+    async def test_chunked_upload_past_size_limit_is_rejected(self):
+        """Test that an upload without a size is counted as it arrives and stopped with a 413."""
+        received = []
+
+        async def upload():
+            for _ in range(3):
+                received.append(1)
+                yield b"\x00" * (1024 * 1024)
+
+        service = SpeechToTextService()
+        with patch("app.modules.speech_to_text.service.settings.MAX_AUDIO_SIZE_MB", 1), \
+                patch.object(service, "transcribe_long", new=AsyncMock()) as mock_long:
+            with pytest.raises(HTTPException) as exc_info:
+                await service.transcribe_upload(upload(), "audio/mpeg")
+
+        assert exc_info.value.status_code == 413
+        assert len(received) == 2
+        mock_long.assert_not_awaited()
+
+    async def test_transcribe_long_stitches_segments_in_order(self):
+        """Test segmented transcription: bounded fan-out and ordered stitching."""
+        t = np.arange(16000 * 10) / 16000
+        wav = encode_wav((0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+        calls = []
+        
+        async def fake_transcribe(audio_data, mimetype):
+            index = len(calls)
+            calls.append(index)
+            seconds = (len(audio_data) - 44) / 32000
+            code = "es" if index == 2 else "en"
+            return {"language": "Spanish" if code == "es" else "English", "language_code": code, "text": f"{seconds:.0f}s"}
+        
+        service = SpeechToTextService()
+        with patch.object(service, "transcribe_audio", side_effect=fake_transcribe), \
+                patch("app.modules.speech_to_text.service.settings.STT_SEGMENT_SECONDS", 4.0), \
+                patch("app.modules.speech_to_text.service.settings.STT_SEGMENT_SEARCH_SECONDS", 0.0):
+            result = await service.transcribe_long(wav, "audio/wav")
+        
+        assert len(calls) == 3
+        assert result["text"] == "4s 4s 2s"
+        assert result["language_code"] == "en"
+    
+    async def test_transcribe_long_does_not_rerun_failed_segments(self):
+        """Test that a segment failing after transcribe_audio's own retries fails the recording at once."""
+        t = np.arange(16000 * 10) / 16000
+        wav = encode_wav((0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+        calls = []
+        
+        async def fake_transcribe(audio_data, mimetype):
+            calls.append(len(calls))
+            if len(calls) == 2:
+                raise Exception("Deepgram API error (401): invalid credentials")
+            return {"language": "English", "language_code": "en", "text": "ok"}
+        
+        service = SpeechToTextService()
+        with patch.object(service, "transcribe_audio", side_effect=fake_transcribe), \
+                patch("app.modules.speech_to_text.service.settings.STT_SEGMENT_SECONDS", 4.0), \
+                patch("app.modules.speech_to_text.service.settings.STT_SEGMENT_SEARCH_SECONDS", 0.0):
+            with pytest.raises(Exception, match=r"segments \[1\] of 3"):
+                await service.transcribe_long(wav, "audio/wav")
+        
+        assert len(calls) == 3
+
 
 @pytest.mark.asyncio
 class TestEmotionDetectionService:
     """Tests for Emotion Detection service."""
     
-    async def test_mock_emotion_detection(self):
-        """Test mock emotion detection fallback."""
+    async def test_numpy_engine_without_opensmile(self, sample_wav_data):
+        """Test that the NumPy feature engine is used when OpenSmile is not installed."""
+        with patch.dict("sys.modules", {"opensmile": None}):
+            service = EmotionDetectionService()
+        
+        with patch.object(service, "_run_in_pool") as mock_pool:
+            result = await service.detect_emotion(sample_wav_data, filename="chunk.wav")
+        
+        mock_pool.assert_not_called()
+        assert service.feature_engine == "numpy"
+        assert result["emotion"] in ["happy", "sad", "angry", "neutral"]
+        # 220 Hz tone: 12 * log2(220 / 27.5) = 36 semitones, steady pitch
+        assert result["attributes"]["pitch_mean"] == pytest.approx(36.0, abs=0.1)
+        assert result["attributes"]["pitch_std"] < 0.01
+        assert result["attributes"]["loudness_mean"] > 0
+    
+    async def test_worker_pool_queue_depth_metric(self):
+        """Test that extractions waiting for a worker are reported as queue depth."""
         service = EmotionDetectionService()
-        result = await service._mock_emotion_detection(b"fake_audio")
+        service.pool_size = 1
+        release = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=1)
         
-        assert "emotion" in result
-        assert "attributes" in result
-        assert result["emotion"] in ["happy", "sad", "angry", "neutral", "surprised"]
-        assert "pitch_mean" in result["attributes"]
-        assert "energy" in result["attributes"]
+        with patch.object(service, "_get_executor", return_value=executor):
+            tasks = [asyncio.ensure_future(service._run_in_pool(release.wait)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            assert service.get_metrics()["queue_depth"] == 2
+            release.set()
+            await asyncio.gather(*tasks)
+        
+        assert service.get_metrics()["queue_depth"] == 0
+        executor.shutdown()
+    
+    async def test_detect_emotion_in_worker_process(self, sample_wav_data):
+        """Test real OpenSmile extraction in a worker process."""
+        pytest.importorskip("opensmile")
+        service = EmotionDetectionService()
+        service.pool_size = 1
+        try:
+            result = await service.detect_emotion(sample_wav_data, filename="chunk.wav")
+        finally:
+            await service.cleanup()
+        
+        assert set(result["attributes"]) == {"pitch_mean", "pitch_std", "loudness_mean", "loudness_std"}
+    
+    async def test_detect_emotion_uses_in_memory_signal(self, sample_wav_data):
+        """Test that decodable audio is passed to process_signal without touching the filesystem."""
+        import pandas as pd
+        from app.modules.emotion_detection import worker
+        
+        service = EmotionDetectionService()
+        service.opensmile_available = True
+        features = pd.DataFrame([{"F0semitoneFrom27.5Hz_sma3nz_amean": 30.0}])
+        
+        with patch.object(service, "_run_in_pool", new=AsyncMock(return_value=features)) as mock_pool, \
+                patch("tempfile.mkstemp") as mock_mkstemp:
+            await service.detect_emotion(sample_wav_data, filename="chunk.wav")
+        
+        mock_mkstemp.assert_not_called()
+        func, signal, sampling_rate = mock_pool.call_args.args
+        assert func is worker.process_signal
+        assert signal.dtype == np.float32 and signal.size == 16000
+        assert sampling_rate == 16000
+    
+    async def test_detect_emotion_falls_back_to_temp_file(self):
+        """Test that undecodable audio is handed to OpenSmile through a temp file."""
+        import pandas as pd
+        
+        service = EmotionDetectionService()
+        service.opensmile_available = True
+        features = pd.DataFrame([{"loudness_sma3_amean": 0.5}])
+        
+        with patch("app.modules.emotion_detection.service.decode_to_float32", new=AsyncMock(side_effect=Exception("bad"))), \
+                patch.object(service, "_process_temp_file", new=AsyncMock(return_value=features)) as mock_file:
+            result = await service.detect_emotion(b"opaque", filename="chunk.mp3")
+        
+        mock_file.assert_awaited_once_with(b"opaque", "chunk.mp3")
+        assert result["attributes"]["loudness_mean"] == 0.5
+
+    async def test_retried_upload_hits_cache(self, sample_wav_data):
+        """Test that identical audio is only extracted once and the key tracks the feature config."""
+        service = EmotionDetectionService()
+        attributes = {"pitch_mean": 30.0, "pitch_std": 0.1, "loudness_mean": 0.5, "loudness_std": 0.8}
+        
+        with patch.object(service, "_compute_attributes", new=AsyncMock(return_value=attributes)) as mock_compute:
+            first = await service.detect_emotion(sample_wav_data, filename="chunk.wav")
+            second = await service.detect_emotion(sample_wav_data, filename="retry.wav")
+            service.opensmile_available = not service.opensmile_available
+            await service.detect_emotion(sample_wav_data, filename="chunk.wav")
+        
+        assert mock_compute.await_count == 2
+        assert first == second
+        assert service.cache.get_metrics()["hits"] == 1
+    
+    async def test_fast_mode_analyses_strided_windows(self):
+        """Test that fast mode hands a reduced signal to the feature engine for long audio."""
+        t = np.arange(16000 * 90) / 16000
+        wav = encode_wav((0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+        service = EmotionDetectionService()
+        service.opensmile_available = False
+        
+        with patch("app.modules.emotion_detection.service.extract_attributes", return_value={"pitch_mean": 36.0}) as mock_extract, \
+                patch("app.modules.emotion_detection.service.settings.EMOTION_FAST_MAX_WINDOWS", 5):
+            await service.detect_emotion(wav, filename="long.wav", fast=True)
+            await service.detect_emotion(wav, filename="long.wav", fast=False)
+        
+        fast_signal, fast_rate = mock_extract.call_args_list[0].args
+        full_signal, _ = mock_extract.call_args_list[1].args
+        assert fast_signal.size == 5 * 2 * fast_rate  # 5 windows of EMOTION_FAST_WINDOW_SECONDS
+        assert full_signal.size == 16000 * 90
+    
+    async def test_track_chunk_updates_session_timeline(self):
+        """Test that session attributes accumulate over chunks without reprocessing earlier ones."""
+        t = np.arange(16000 * 2) / 16000
+        low = encode_wav((0.3 * np.sin(2 * np.pi * 110 * t)).astype(np.float32))
+        high = encode_wav((0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32))
+        service = EmotionDetectionService()
+        service.opensmile_available = False
+
+        with patch("app.modules.emotion_detection.service.frame_descriptors", wraps=frame_descriptors) as mock_lld:
+            first = await service.track_chunk("session-1", 0, low, filename="chunk.wav")
+            second = await service.track_chunk("session-1", 1, high, filename="chunk.wav")
+
+        assert mock_lld.call_count == 2
+        # 110 Hz and 440 Hz are 24 and 48 semitones above 27.5 Hz
+        assert first["attributes"]["pitch_mean"] == pytest.approx(24.0, abs=0.1)
+        assert second["attributes"]["pitch_mean"] == pytest.approx(48.0, abs=0.1)
+        assert second["session_attributes"]["pitch_mean"] == pytest.approx(36.0, abs=0.2)
+        assert second["timeline_entry"]["chunk_index"] == 1
+        assert "timeline" not in second  # Full history only through the timeline store
+        assert [entry["chunk_index"] for entry in service.timelines.get("session-1").timeline()] == [0, 1]
+
+    async def test_track_chunk_retry_skips_extraction(self):
+        """Test that a retried chunk index, or the same audio in another session, is not analysed again."""
+        t = np.arange(16000 * 2) / 16000
+        low = encode_wav((0.3 * np.sin(2 * np.pi * 110 * t)).astype(np.float32))
+        service = EmotionDetectionService()
+        service.opensmile_available = False
+
+        with patch("app.modules.emotion_detection.service.frame_descriptors", wraps=frame_descriptors) as mock_lld, \
+                patch("app.modules.emotion_detection.service.decode_to_float32", wraps=decode_to_float32) as mock_decode:
+            first = await service.track_chunk("session-1", 0, low, filename="chunk.wav")
+            retried = await service.track_chunk("session-1", 0, low, filename="chunk.wav")
+            other = await service.track_chunk("session-2", 0, low, filename="chunk.wav")
+
+        assert mock_decode.call_count == mock_lld.call_count == 1
+        assert retried["timeline_entry"] is first["timeline_entry"]
+        assert other["attributes"] == pytest.approx(first["attributes"])
+        assert len(service.timelines.get("session-2").chunks) == 1
+
+    async def test_track_chunk_failure_returns_neutral_attributes(self):
+        """Test that a chunk that cannot be decoded gets the same neutral attributes as every other fallback."""
+        service = EmotionDetectionService()
+        service.opensmile_available = False
+
+        with patch("app.modules.emotion_detection.service.decode_to_float32", new=AsyncMock(side_effect=Exception("bad"))):
+            result = await service.track_chunk("session-1", 0, b"not audio", filename="chunk.webm")
+
+        assert result["emotion"] == "neutral"
+        assert result["attributes"] == NEUTRAL_ATTRIBUTES
+        assert result["timeline_entry"] is None
+
+    async def test_minimal_config_matches_egemaps(self):
+        """Test that the shipped emotion_minimal config yields the same four values as eGeMAPSv02."""
+        pytest.importorskip("opensmile")
+        from app.modules.emotion_detection.worker import build_smile
+
+        t = np.arange(3 * 16000) / 16000
+        voice = sum(np.sin(2 * np.pi * k * 150 * t) / k for k in range(1, 6))
+        signal = (0.3 * voice * 0.5 * (1 + np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+        minimal = build_smile("emotion_minimal").process_signal(signal, 16000)
+        full = build_smile("eGeMAPSv02").process_signal(signal, 16000)
+
+        assert len(minimal.columns) == 4
+        for column in minimal.columns:
+            assert minimal[column].iloc[0] == pytest.approx(full[column].iloc[0], rel=1e-6)
 
 
 @pytest.mark.asyncio
@@ -81,6 +422,46 @@ class TestTranslationService:
         assert result["translated_text"] == "Hola mundo"
         assert result["target_language"] == "es"
     
+    @patch("httpx.AsyncClient.post")
+    async def test_translate_text_is_cached(self, mock_post):
+        """Test that a repeated phrase is served from the cache, whitespace-normalised."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"translations": [{"text": "Hola", "detected_source_language": "EN"}]}
+        mock_response.raise_for_status = MagicMock()
+        mock_post.return_value = mock_response
+        
+        service = TranslationService()
+        first = await service.translate_text("Hello", "en", "es")
+        second = await service.translate_text("  Hello ", "EN", "es")
+        other = await service.translate_text("Hello", "en", "en")
+        
+        assert first == second
+        assert other["target_language"] == "en"
+        assert mock_post.await_count == 2  # Different target language, different key
+        assert service.cache.get_metrics()["hits"] == 1
+    
+    async def test_concurrent_translations_share_one_request(self):
+        """Test that concurrent texts of one language pair go out as one multi-text request."""
+        async def fake_post(url, headers=None, data=None):
+            response = MagicMock()
+            response.json.return_value = {
+                "translations": [{"text": text.upper(), "detected_source_language": "EN"} for text in data["text"]]
+            }
+            response.raise_for_status = MagicMock()
+            return response
+        
+        service = TranslationService()
+        with patch("httpx.AsyncClient.post", new=AsyncMock(side_effect=fake_post)) as mock_post, \
+                patch.object(service.batcher, "window_seconds", 0.02), \
+                patch.object(service.batcher, "max_texts", 3):
+            results = await asyncio.gather(*(
+                service.translate_text(text, "en", "es") for text in ("one", "two", "three", "four")
+            ))
+        
+        assert [r["translated_text"] for r in results] == ["ONE", "TWO", "THREE", "FOUR"]
+        assert [call.kwargs["data"]["text"] for call in mock_post.await_args_list] == [["one", "two", "three"], ["four"]]
+        assert service.batcher.get_metrics()["largest_batch"] == 3
+    
     def test_get_target_language(self):
         """Test automatic target language detection."""
         service = TranslationService()
@@ -0,0 +1,184 @@
+"""
+Unit tests for the session-scoped streaming decoder.
+"""
+import asyncio
+import shutil
+import struct
+import subprocess
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.core import streaming_decoder
+from app.core.streaming_decoder import SessionDecoder, StreamClock, StreamingDecoderPool, _starts_new_stream
+
+
+def ogg_page(granule: int, packet: bytes) -> bytes:
+    """One Ogg page holding a single packet (CRC left at zero)."""
+    return b"OggS\x00\x00" + struct.pack("<qIII", granule, 1, 0, 0) + bytes([1, len(packet)]) + packet
+
+
+def fake_decoder(output_delays):
+    """SessionDecoder on a fake ffmpeg that emits 0.1s of PCM after each of the given delays per write."""
+    decoder = SessionDecoder("s1", "ogg")
+    decoder._process = MagicMock(returncode=None)
+    decoder._process.stdin.drain = AsyncMock()
+
+    async def emit():
+        for delay in output_delays:
+            await asyncio.sleep(delay)
+            decoder._pcm.extend(b"\x00" * 3200)
+            decoder._decoded_bytes += 3200
+            decoder._output_event.set()
+    decoder._process.stdin.write.side_effect = lambda chunk: asyncio.ensure_future(emit())
+    return decoder
+
+
+def test_starts_new_stream():
+    """Test detection of container headers at the start of a chunk."""
+    assert _starts_new_stream(b"\x1a\x45\xdf\xa3" + b"\x00" * 8)
+    assert _starts_new_stream(b"OggS\x00\x02" + b"\x00" * 8)
+    assert not _starts_new_stream(b"OggS\x00\x00" + b"\x00" * 8)
+    assert not _starts_new_stream(b"\x1f\x43\xb6\x75" + b"\x00" * 8)  # WebM Cluster
+
+
+def test_stream_clock_follows_ogg_granules_across_chunks():
+    """Test that the clock reports the end of the last complete page, even when pages are split."""
+    head = ogg_page(0, b"OpusHead\x01\x01" + struct.pack("<H", 312) + b"\x80\xbb\x00\x00\x00\x00\x00")
+    stream = head + ogg_page(48312, b"\x00" * 40) + ogg_page(96312, b"\x00" * 40)
+    split = len(head) + 30  # Inside the first audio page
+
+    clock = StreamClock("ogg")
+    assert clock.feed(stream[:len(head)]) == 0.0
+    assert clock.feed(stream[len(head):split]) == 0.0
+    assert clock.feed(stream[split:]) == pytest.approx(2.0)
+    assert StreamClock("ogg").feed(b"not an ogg stream at all, no page sync") is None
+
+
+@pytest.mark.asyncio
+async def test_chunk_waits_for_the_audio_its_timestamps_promise():
+    """Test that output arriving after a long pause still belongs to its chunk when the timestamps say so."""
+    decoder = fake_decoder([0.005, 0.1])  # Second half is late, well past STREAM_DECODER_SETTLE_MS
+    decoder._clock.feed = MagicMock(return_value=0.2 + streaming_decoder.DECODER_DELAY_SECONDS)
+
+    pcm = await decoder.decode_chunk(b"chunk")
+
+    assert len(pcm) == 6400
+
+
+@pytest.mark.asyncio
+async def test_late_output_without_timestamps_moves_to_next_chunk():
+    """Test the settle fallback: output after the quiet period is returned with the next chunk, not lost."""
+    decoder = fake_decoder([0.005, 0.1])
+    decoder._clock.feed = MagicMock(return_value=None)
+
+    with patch.object(streaming_decoder.settings, "STREAM_DECODER_MAX_WAIT_MS", 200):
+        first = await decoder.decode_chunk(b"chunk 1")
+        await asyncio.sleep(0.15)
+        decoder._process.stdin.write.side_effect = None
+        second = await decoder.decode_chunk(b"chunk 2")
+
+    assert len(first) == 3200
+    assert len(second) == 3200
+
+
+@pytest.mark.asyncio
+async def test_pool_evicts_least_recently_used_session():
+    """Test that the pool never holds more than STREAM_DECODER_MAX_SESSIONS decoders."""
+    pool = StreamingDecoderPool()
+
+    with patch.object(streaming_decoder.settings, "STREAM_DECODER_MAX_SESSIONS", 2), \
+            patch.object(streaming_decoder.SessionDecoder, "start", new=AsyncMock()), \
+            patch.object(streaming_decoder.SessionDecoder, "close", new=AsyncMock()), \
+            patch.object(streaming_decoder.SessionDecoder, "is_alive", new=True):
+        for session_id in ("a", "b", "a", "c"):
+            await pool._get_decoder(session_id, "webm", b"\x00")
+
+        assert list(pool._sessions) == ["a", "c"]
+        await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_swept_without_further_requests():
+    """Test that the background sweep closes a decoder nobody accesses any more."""
+    pool = StreamingDecoderPool()
+
+    with patch.object(streaming_decoder.settings, "STREAM_DECODER_IDLE_TIMEOUT_SECONDS", 0.05), \
+            patch.object(streaming_decoder.SessionDecoder, "start", new=AsyncMock()), \
+            patch.object(streaming_decoder.SessionDecoder, "close", new=AsyncMock()) as mock_close, \
+            patch.object(streaming_decoder.SessionDecoder, "is_alive", new=True):
+        await pool._get_decoder("idle", "webm", b"\x00")
+        await asyncio.sleep(0.2)
+
+    assert len(pool) == 0
+    mock_close.assert_awaited_once()
+    assert pool._sweeper.done()
+
+
+@pytest.mark.asyncio
+async def test_old_chunk_index_is_never_fed_again():
+    """Test that a chunk index at or below the last one is replayed or refused, never written to ffmpeg."""
+    decoder = fake_decoder([0.005])
+    decoder._clock.feed = MagicMock(return_value=None)
+
+    with patch.object(streaming_decoder.settings, "STREAM_DECODER_SETTLE_MS", 20):
+        first = await decoder.decode_chunk(b"chunk 5", chunk_index=5)
+        replay = await decoder.decode_chunk(b"chunk 5", chunk_index=5)
+        with pytest.raises(Exception, match="chunk 4 arrived after chunk 5"):
+            await decoder.decode_chunk(b"chunk 4", chunk_index=4)
+
+    assert replay == first
+    assert decoder._process.stdin.write.call_count == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+async def test_decode_consecutive_webm_chunks():
+    """Test that continuation chunks (no WebM header) decode through the session decoder."""
+    webm = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "sine=f=220:d=4",
+            "-c:a", "libopus", "-f", "webm", "-live", "1", "-cluster_time_limit", "1000", "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    parts = [webm[i * len(webm) // 4:(i + 1) * len(webm) // 4] for i in range(4)]
+
+    pool = StreamingDecoderPool()
+    clock = StreamClock("webm")
+    total_seconds = 0.0
+    for index, part in enumerate(parts):
+        wav = await pool.decode_chunk("session-1", part, "audio/webm", is_final=index == 3)
+        assert wav[:4] == b"RIFF"
+        total_seconds += (len(wav) - 44) / 32000
+        # Each chunk carries the audio up to its last complete block
+        assert total_seconds == pytest.approx(clock.feed(part), abs=0.05)
+
+    assert len(pool) == 0
+    assert total_seconds == pytest.approx(4.0, abs=0.05)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+async def test_retried_webm_chunk_does_not_break_the_session():
+    """Test that re-sending a continuation chunk replays its audio and leaves the next chunks intact."""
+    webm = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "sine=f=220:d=4",
+            "-c:a", "libopus", "-f", "webm", "-live", "1", "-cluster_time_limit", "1000", "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    parts = [webm[i * len(webm) // 4:(i + 1) * len(webm) // 4] for i in range(4)]
+
+    pool = StreamingDecoderPool()
+    seconds = {}
+    for index in (0, 1, 1, 2, 3):
+        wav = await pool.decode_chunk("session-1", parts[index], "audio/webm", is_final=index == 3, chunk_index=index)
+        seconds.setdefault(index, []).append((len(wav) - 44) / 32000)
+
+    assert seconds[1][0] == seconds[1][1]
+    assert seconds[2][0] > 0.5
+    assert sum(values[0] for values in seconds.values()) == pytest.approx(4.0, abs=0.05)
@@ -0,0 +1,144 @@
+"""
+Unit tests for the upstream guard (concurrency limit and circuit breaker).
+"""
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from app.core.upstream_guard import UpstreamGuard, UpstreamUnavailableError
+from app.modules.translation.service import TranslationService
+
+
+def make_guard(**overrides) -> UpstreamGuard:
+    options = dict(
+        max_in_flight=2,
+        max_queue=1,
+        queue_timeout_seconds=1.0,
+        failure_rate_threshold=0.5,
+        slow_call_seconds=10.0,
+        window_size=10,
+        min_calls=4,
+        open_seconds=30.0,
+    )
+    options.update(overrides)
+    return UpstreamGuard("test", **options)
+
+
+def status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://upstream.test")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status_code, request=request))
+
+
+async def fail(guard: UpstreamGuard, error: Exception):
+    with pytest.raises(type(error)):
+        async with guard.call():
+            raise error
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_failures_and_fails_fast():
+    """Test that 5xx failures open the circuit while client errors do not count."""
+    guard = make_guard()
+
+    for _ in range(4):
+        await fail(guard, status_error(400))
+    assert guard.state == "closed"
+
+    for _ in range(4):
+        await fail(guard, status_error(503))
+    assert guard.state == "open"
+
+    with pytest.raises(UpstreamUnavailableError) as exc_info:
+        async with guard.call():
+            pytest.fail("call admitted while the circuit is open")
+    assert exc_info.value.status_code == 503
+    assert int(exc_info.value.headers["Retry-After"]) > 0
+    assert guard.get_state()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_or_reopens_circuit():
+    """Test that after the open period one probe decides the circuit state."""
+    guard = make_guard(min_calls=1, open_seconds=0.05)
+
+    await fail(guard, status_error(500))
+    assert guard.state == "open"
+    await asyncio.sleep(0.06)
+
+    await fail(guard, httpx.ConnectError("refused"))
+    assert guard.state == "open" and guard.times_opened == 2
+    await asyncio.sleep(0.06)
+
+    async with guard.call():
+        assert guard.state == "half_open"
+        with pytest.raises(UpstreamUnavailableError):  # Only one probe at a time
+            async with guard.call():
+                pass
+    assert guard.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_record_no_outcome():
+    """Test that a cancelled probe keeps the circuit half-open and cancelled calls do not count as successes."""
+    guard = make_guard(min_calls=1, open_seconds=0.05)
+    await fail(guard, status_error(500))
+    await asyncio.sleep(0.06)
+
+    async def hang():
+        async with guard.call():
+            await asyncio.sleep(10)
+
+    probe = asyncio.create_task(hang())
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert guard.state == "half_open"
+    assert guard.in_flight == 0
+
+    async with guard.call():  # The next call is the probe
+        pass
+    assert guard.state == "closed"
+
+    slow = asyncio.create_task(hang())
+    await asyncio.sleep(0.01)
+    slow.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await slow
+    assert len(guard._outcomes) == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_queue_is_bounded():
+    """Test that callers beyond max_in_flight + max_queue are rejected at once."""
+    guard = make_guard()
+    release = asyncio.Event()
+
+    async def hold():
+        async with guard.call():
+            await release.wait()
+
+    holders = [asyncio.create_task(hold()) for _ in range(3)]  # 2 in flight, 1 waiting
+    await asyncio.sleep(0.01)
+    assert guard.in_flight == 2 and guard.waiting == 1
+
+    with pytest.raises(UpstreamUnavailableError):
+        async with guard.call():
+            pass
+
+    release.set()
+    await asyncio.gather(*holders)
+    assert guard.in_flight == 0 and guard.waiting == 0
+    assert guard.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_translation_passes_rejection_through():
+    """Test that the service surfaces the guard's 503 instead of wrapping it."""
+    service = TranslationService()
+    service.guard = make_guard()
+    service.guard._open()
+
+    with patch.object(service, "_get_client") as mock_client, pytest.raises(UpstreamUnavailableError):
+        await service.translate_text("hola", "es")
+    mock_client.return_value.post.assert_not_called()
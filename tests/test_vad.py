@@ -0,0 +1,84 @@
+"""
+Unit tests for energy-based voice activity detection.
+"""
+import numpy as np
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from app.core.audio_utils import encode_wav, parse_wav_header
+from app.core.vad import detect_speech, split_at_silence, trim_silence
+from app.main import app
+
+
+def _tone_with_silence(lead: float, tone: float, trail: float) -> np.ndarray:
+    """int16 signal: silence, a 220 Hz tone, silence (16kHz)."""
+    t = np.arange(int(tone * 16000)) / 16000
+    voiced = (0.3 * 32767 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    return np.concatenate([
+        np.zeros(int(lead * 16000), dtype=np.int16),
+        voiced,
+        np.zeros(int(trail * 16000), dtype=np.int16),
+    ])
+
+
+def test_trim_leading_and_trailing_silence():
+    """Test that silence is trimmed down to the configured padding."""
+    wav, trim = trim_silence(encode_wav(_tone_with_silence(1.0, 0.5, 1.5)))
+
+    assert trim.has_speech
+    assert trim.original_seconds == 3.0
+    assert trim.leading_silence_seconds == 0.8
+    assert trim.trailing_silence_seconds == 1.3
+    assert parse_wav_header(wav).data_size == int(0.9 * 16000) * 2
+
+
+def test_fully_voiced_chunk_is_returned_as_is(sample_wav_data):
+    """Test that nothing is copied when there is no silence to trim."""
+    wav, trim = trim_silence(sample_wav_data)
+
+    assert wav is sample_wav_data
+    assert trim.voiced_ratio == 1.0
+
+
+def test_low_level_noise_is_not_speech():
+    """Test that background noise below the threshold reports no speech."""
+    noise = np.random.default_rng(0).normal(0, 50, 32000).astype(np.int16)  # about -56 dBFS
+
+    trim = detect_speech(noise)
+
+    assert not trim.has_speech
+    assert trim.trimmed_seconds == 0.0
+
+
+@patch("app.main.translation_service.translate_text", new_callable=AsyncMock)
+@patch("app.main.emotion_detection_service.detect_emotion", new_callable=AsyncMock)
+@patch("app.main.speech_to_text_service.transcribe_audio", new_callable=AsyncMock)
+def test_pre_process_silent_chunk_skips_upstream_calls(mock_stt, mock_emotion, mock_translation):
+    """Test that a silent chunk returns a no-speech response without any upstream call."""
+    silent = encode_wav(np.zeros(16000, dtype=np.int16))
+
+    response = TestClient(app).post(
+        "/api/pre-process-chunk",
+        files={"audio": ("chunk.wav", silent, "audio/wav")},
+        data={"chunk_index": "0"},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["speech_detected"] is False
+    assert data["silence_trim"]["original_seconds"] == 1.0
+    mock_stt.assert_not_called()
+    mock_emotion.assert_not_called()
+    mock_translation.assert_not_called()
+
+
+def test_split_at_silence_cuts_in_pauses():
+    """Test that long audio is cut inside the pauses nearest the target length."""
+    samples = np.concatenate([_tone_with_silence(0.0, 2.7, 0.3) for _ in range(4)])  # 12 s, pause every 3 s
+
+    segments = split_at_silence(samples, 16000, target_seconds=4.0, search_seconds=2.0)
+
+    assert segments[0][0] == 0 and segments[-1][1] == samples.size
+    assert all(a[1] == b[0] for a, b in zip(segments, segments[1:]))
+    assert len(segments) == 4
+    for _, cut in segments[:-1]:
+        assert not samples[cut:cut + 320].any()  # the cut frame is silent